@@ -78,23 +78,23 @@ async def resolve_entity(context: AppContext, client: TelegramClient, entity_res
 
     cache_key = f"entity:{entity_resolvable}"
 
-    cached_entity = await context.cache.get(cache_key)
-    if isinstance(cached_entity, (User, Chat, Channel)):
-        logger.debug(f"Entity keshdan olindi: {entity_resolvable}")
-        return cached_entity
-
-    try:
-        entity = await retry_telegram_api_call(client.get_entity, entity_resolvable)
-        if isinstance(entity, (User, Chat, Channel)):
-            await context.cache.set(cache_key, entity, ttl=3600)
-            logger.debug(f"Entity API'dan olindi va keshga saqlandi: {entity_resolvable}")
-            return entity
-    except (ValueError, TypeError) as e:
-        logger.debug(f"Entity topilmadi (ID/username: {entity_resolvable}): {e}")
-    except Exception as e:
-        logger.error(f"resolve_entity da kutilmagan xato (ID/username: {entity_resolvable}): {e}")
+    async def fetch_entity() -> Optional[Entity]:
+        try:
+            entity = await retry_telegram_api_call(client.get_entity, entity_resolvable)
+            if isinstance(entity, (User, Chat, Channel)):
+                logger.debug(f"Entity API'dan olindi va keshga saqlandi: {entity_resolvable}")
+                return entity
+        except (ValueError, TypeError) as e:
+            logger.debug(f"Entity topilmadi (ID/username: {entity_resolvable}): {e}")
+        except Exception as e:
+            logger.error(f"resolve_entity da kutilmagan xato (ID/username: {entity_resolvable}): {e}")
+        return None
 
-    return None
+    # Bir xabarlar oqimidagi bir xil so'rovlar (log_text, media_logger) bitta API chaqiruvini kutadi
+    entity = await context.cache.get_or_compute(
+        cache_key, fetch_entity, ttl=3600, condition=lambda e: isinstance(e, (User, Chat, Channel))
+    )
+    return entity if isinstance(entity, (User, Chat, Channel)) else None
 
 
 
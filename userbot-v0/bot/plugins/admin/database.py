@@ -5,19 +5,26 @@ admin plaginlari.
 """
 
 import asyncio
-import csv
 import html
 import io
-import json
+import shlex
+import tempfile
+import time
+from datetime import datetime
 from pathlib import Path
 
 from loguru import logger
 from telethon.tl.custom import Message
 
 from core.app_context import AppContext
+from core.adhoc_query import STOP_REASONS, cancel_queries, get_active_queries, is_read_query, open_readonly_connection, run_adhoc_query
+from core.archive import list_archives, month_schema, open_archive_session, resolve_months
+from core.exceptions import QueryInterruptedError
+from core.index_advisor import IndexAdvisor
+from core.table_export import export_table
 from bot.decorators import userbot_cmd
 from bot.lib.auth import admin_only, owner_only
-from bot.lib.utils import humanbytes
+from bot.lib.utils import RaiseArgumentParser, humanbytes
 
 from bot.lib.ui import (
     PaginationHelper,
@@ -28,15 +35,53 @@ from bot.lib.ui import (
     format_as_table,
 )
 
+# Shundan kam qatorli natija xabarda jadval sifatida, ko'pi CSV fayl sifatida yuboriladi
+QUERY_PREVIEW_ROWS = 50
+# So'rov natijasi shu hajmdan oshsa xotiradan diskdagi vaqtinchalik faylga o'tadi
+QUERY_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
 
 @userbot_cmd(command="db query", description="Xavfsiz rejimda SQL so'rovini bajaradi.")
 @owner_only
 async def db_query_handler(event: Message, context: AppContext):
+    """
+    .db query SELECT * FROM task_logs LIMIT 10
+    .db query --timeout 60 SELECT count(*) FROM logged_media
+    .db query --archive 2026-07..2026-09 SELECT ... FROM archive_task_logs
+    O'qish so'rovlari alohida, faqat o'qish uchun ulanishda vaqt/qadam byudjeti bilan bajariladi.
+    Bajarilayotgan so'rovni to'xtatish: .db cancel [ID]
+    """
     if not event.text: return
 
     query = event.text.split(maxsplit=2)[2] if len(event.text.split()) > 2 else ""
+    archive_spec = None
+    timeout = float(context.config.get("DB_QUERY_TIMEOUT_SECONDS", 15))
+    while query.startswith(("--archive", "--timeout")):
+        parts = query.split(maxsplit=2)
+        if len(parts) < 3:
+            query = ""
+            break
+        if parts[0] == "--archive":
+            archive_spec = parts[1]
+        else:
+            try:
+                timeout = max(float(parts[1]), 0.1)
+            except ValueError:
+                return await event.edit(format_error("<code>--timeout</code> soniyalarda son bo'lishi kerak."), parse_mode='html')
+        query = parts[2]
     if not query:
         return await event.edit(format_error("Bajarish uchun SQL so'rovini kiriting."), parse_mode='html')
+    if archive_spec:
+        return await _run_archive_query(event, context, archive_spec, query, timeout)
+    if is_read_query(query):
+        await event.edit("<code>🔄 So'rov bajarilmoqda...</code>", parse_mode='html')
+        try:
+            async with open_readonly_connection(context.db) as conn:
+                await _stream_query_result(event, context, conn, query, timeout, title="🔍 So'rov Natijasi", filename="query_result")
+        except Exception as e:
+            logger.error(f"Error executing SQL query: {e}. Query: {query}")
+            await event.edit(format_error(f"SQL so'rovida xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
+        return
 
     is_dangerous = any(k in query.upper() for k in ["UPDATE", "DELETE", "DROP", "INSERT", "ALTER", "TRUNCATE"])
     if is_dangerous:
@@ -45,87 +90,203 @@ async def db_query_handler(event: Message, context: AppContext):
 
     await event.edit("<code>🔄 So'rov bajarilmoqda...</code>", parse_mode='html')
     try:
-        if query.upper().strip().startswith("SELECT"):
-            rows = await context.db.fetchall(query)
-            if not rows:
-                return await event.edit("<b>✅ So'rov bajarildi, lekin natija qaytarmadi.</b>", parse_mode='html')
-            
-            headers = list(rows[0].keys())
-            # Barcha qiymatlarni stringga o'tkazamiz
-            table_data = [[str(item) for item in row.values()] for row in rows]
-            response_text = format_as_table(headers, table_data)
-            title = f"<b>🔍 So'rov Natijasi ({len(rows)} qator):</b>\n"
-        else:
-            rows_affected = await context.db.execute(query)
-            response_text = f"<b>Ta'sir qilgan qatorlar soni:</b> <code>{rows_affected}</code>"
-            title = "<b>⚙️ So'rov Bajarildi</b>\n\n"
-
-        await send_as_file_if_long(event, title + response_text, filename="query_result.txt", parse_mode='html')
+        rows_affected = await context.db.execute(query)
+        response_text = f"<b>Ta'sir qilgan qatorlar soni:</b> <code>{rows_affected}</code>"
+        await send_as_file_if_long(event, "<b>⚙️ So'rov Bajarildi</b>\n\n" + response_text, filename="query_result.txt", parse_mode='html')
     except Exception as e:
         logger.error(f"Error executing SQL query: {e}. Query: {query}")
         await event.edit(format_error(f"SQL so'rovida xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
-        
-        
 
-@userbot_cmd(command="db export", description="Jadvalni JSON yoki CSV formatida eksport qiladi.")
-@admin_only
-async def db_export_handler(event: Message, context: AppContext):
-    if not event.text: return
 
-    parts = event.text.split()
-    if len(parts) < 3:
-        return await event.edit(format_error("<b>Format:</b> <code>.db export &lt;jadval_nomi&gt; [--format csv/json]</code>"), parse_mode='html')
+async def _stream_query_result(event: Message, context: AppContext, conn, query: str, timeout: float, *, title: str, filename: str):
+    """
+    So'rovni `run_adhoc_query` bilan bajaradi: natija CSV sifatida `QUERY_SPOOL_MAX_BYTES` dan
+    oshganda diskka o'tadigan vaqtinchalik faylga qismlab yoziladi, kichik natija
+    jadval sifatida xabarda, kattasi fayl sifatida yuboriladi. Byudjet tugasa yoki so'rov bekor
+    qilinsa shu paytgacha o'qilgan qatorlar fayli yuboriladi.
+    """
+    file_stream = tempfile.SpooledTemporaryFile(max_size=QUERY_SPOOL_MAX_BYTES, mode="w+b")
+    try:
+        buffer = io.TextIOWrapper(file_stream, encoding='utf-8', newline='')
+        interrupted = None
+        try:
+            result = await run_adhoc_query(
+                conn, query, buffer,
+                timeout=timeout,
+                max_steps=int(context.config.get("DB_QUERY_MAX_STEPS", 100_000_000)),
+                max_rows=int(context.config.get("DB_QUERY_MAX_ROWS", 100_000)),
+                preview_rows=QUERY_PREVIEW_ROWS,
+            )
+            rows, elapsed = result.rows, result.elapsed_ms / 1000
+        except QueryInterruptedError as e:
+            interrupted, rows, elapsed = e, e.rows, e.elapsed
+        finally:
+            await asyncio.to_thread(buffer.flush)
+            buffer.detach()
+
+        if interrupted:
+            message = f"⏹ So'rov to'xtatildi: {STOP_REASONS.get(interrupted.reason, interrupted.reason)} ({elapsed:.1f} s, {rows} qator o'qildi)."
+            if not rows or not event.client:
+                return await event.edit(format_error(html.escape(message)), parse_mode='html')
+            caption = f"<b>{html.escape(message)}</b>\nQisman natija."
+        elif not rows:
+            return await event.edit("<b>✅ So'rov bajarildi, lekin natija qaytarmadi.</b>", parse_mode='html')
+        elif rows <= QUERY_PREVIEW_ROWS:
+            table_data = [[str(item) for item in row] for row in result.preview]
+            header = f"<b>{title} ({rows} qator, {elapsed:.2f} s):</b>\n"
+            return await send_as_file_if_long(event, header + format_as_table(result.columns, table_data), filename=f"{filename}.txt", parse_mode='html')
+        else:
+            suffix = " — qatorlar chegarasi, natija qisqartirildi" if result.truncated else ""
+            caption = f"<b>{title}:</b> <code>{rows}</code> qator, {elapsed:.2f} s{suffix}"
+        if not event.client: return
 
-    table_name = parts[2]
-    file_format = "json"
-    if "--format" in parts and len(parts) > parts.index("--format") + 1:
-        file_format = parts[parts.index("--format") + 1].lower()
+        size = file_stream.tell()
+        file_stream.seek(0)
+        # Fayl Telegram'ga qismlab yuklanadi: diskdagi vaqtinchalik fayl to'liq xotiraga o'qilmaydi
+        uploaded = await event.client.upload_file(file_stream, file_name=f"{filename}.csv", file_size=size)
+        await event.client.send_file(event.chat_id, uploaded, caption=caption, reply_to=event.id, parse_mode='html')
+        await event.delete()
+    finally:
+        file_stream.close()
 
-    if file_format not in ["json", "csv"]:
-        return await event.edit(format_error("Noto'g'ri eksport formati. 'json' yoki 'csv' ni tanlang."), parse_mode='html')
 
-    await event.edit(f"<code>🔄 '{html.escape(table_name)}' jadvalidan ma'lumotlar eksport qilinmoqda...</code>", parse_mode='html')
+@userbot_cmd(command="db cancel", description="Bajarilayotgan .db query so'rovini to'xtatadi.")
+@owner_only
+async def db_cancel_handler(event: Message, context: AppContext):
+    """
+    .db cancel      # Barcha faol so'rovlarni to'xtatish
+    .db cancel 3    # Faqat #3 so'rovni to'xtatish
+    """
+    parts = (event.text or "").split()
+    query_id = None
+    if len(parts) > 2:
+        if not parts[2].isdigit():
+            return await event.edit(format_error("So'rov ID raqam bo'lishi kerak."), parse_mode='html')
+        query_id = int(parts[2])
+
+    active = get_active_queries()
+    if not active:
+        return await event.edit("<b>ℹ️ Bajarilayotgan so'rov yo'q.</b>", parse_mode='html')
+    cancelled = await cancel_queries(query_id)
+    if not cancelled:
+        lines = [format_error(f"#{query_id} so'rovi topilmadi. Faol so'rovlar:")]
+        lines.extend(f"• <code>#{q.query_id}</code> ({q.elapsed:.1f} s): <code>{html.escape(q.sql[:80])}</code>" for q in active)
+        return await event.edit("\n".join(lines), parse_mode='html')
+    await event.edit(format_success(f"To'xtatildi: {', '.join(f'#{i}' for i in cancelled)}"), parse_mode='html')
+
+
+async def _run_archive_query(event: Message, context: AppContext, archive_spec: str, query: str, timeout: float):
+    """So'rovni oylik arxivlar ATTACH qilingan, faqat o'qish uchun ochilgan alohida ulanishda bajaradi."""
     try:
-        if not table_name.isidentifier():
-            return await event.edit(format_error("Noto'g'ri jadval nomi."), parse_mode='html')
+        months = resolve_months(context.db, archive_spec)
+    except ValueError as e:
+        return await event.edit(format_error(html.escape(str(e))), parse_mode='html')
+    if not months:
+        return await event.edit(format_error("Arxivlar topilmadi. Ro'yxat: <code>.db archive</code>"), parse_mode='html')
 
-        rows = await context.db.fetchall(f'SELECT * FROM "{table_name}"')
-        if not rows:
-            return await event.edit(format_error(f"'{html.escape(table_name)}' jadvali bo'sh yoki mavjud emas."), parse_mode='html')
+    await event.edit(f"<code>🔄 {len(months)} ta oylik arxiv ulanmoqda...</code>", parse_mode='html')
+    try:
+        async with open_archive_session(context.db, months) as conn:
+            title = f"🗄 Arxiv so'rovi natijasi ({html.escape(', '.join(months))})"
+            await _stream_query_result(event, context, conn, query, timeout, title=title, filename="archive_query_result")
+    except ValueError as e:
+        return await event.edit(format_error(html.escape(str(e))), parse_mode='html')
+    except Exception as e:
+        logger.error(f"Arxiv so'rovida xatolik: {e}. Query: {query}")
+        return await event.edit(format_error(f"SQL so'rovida xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
 
-        data_to_export = [dict(row) for row in rows]
-        buffer = io.StringIO()
 
-        if file_format == "json":
-            json.dump(data_to_export, buffer, indent=2, ensure_ascii=False)
-        elif file_format == "csv":
-            writer = csv.DictWriter(buffer, fieldnames=data_to_export[0].keys())
-            writer.writeheader()
-            writer.writerows(data_to_export)
+@userbot_cmd(command="db archive", description="Oylik arxiv fayllari ro'yxatini ko'rsatadi.")
+@admin_only
+async def db_archive_handler(event: Message, context: AppContext):
+    archives = list_archives(context.db)
+    if not archives:
+        return await event.edit("<b>🗄 Arxivlar hali yaratilmagan.</b>", parse_mode='html')
+
+    lines = ["<b>🗄 Oylik arxivlar:</b>"]
+    for archive in archives:
+        state = "🗜 siqilgan" if archive["compressed"] else "✍️ ochiq"
+        lines.append(f"• <code>{archive['month']}</code> ({month_schema(archive['month'])}) — {humanbytes(archive['size'])}, {state}")
+    lines.append(
+        "\n<i>So'rov:</i> <code>.db query --archive 2026-07..2026-09 SELECT * FROM archive_task_logs LIMIT 10</code>"
+        "\n<i>Oy sxemalari ham mavjud:</i> <code>archive_YYYY_MM.&lt;jadval&gt;</code>"
+    )
+    await event.edit("\n".join(lines), parse_mode='html')
 
-        buffer.seek(0)
-        file_stream = io.BytesIO(buffer.read().encode('utf-8'))
-        file_stream.name = f"{table_name}_export.{file_format}"
 
-        if not event.client: return
+@userbot_cmd(command="db export", description="Jadvalni JSON, JSON Lines yoki CSV formatida eksport qiladi.")
+@admin_only
+async def db_export_handler(event: Message, context: AppContext):
+    """
+    .db export task_logs
+    .db export task_logs --format csv --gzip
+    .db export afk_mentions --format jsonl --columns chat_id,message_text --where "chat_id = -100123"
+    """
+    if not event.text: return
+    usage = (
+        "<b>Format:</b> <code>.db export &lt;jadval_nomi&gt; [--format csv/json/jsonl] "
+        "[--columns a,b] [--where SHART] [--gzip | --zstd]</code>"
+    )
 
-        await event.client.send_file(
-            event.chat_id, file_stream,
-            caption=f"📄 <b>{html.escape(table_name)}</b> jadvali. Format: {file_format.upper()}",
-            reply_to=event.id, parse_mode='html' # <-- QO'SHILDI
+    parser = RaiseArgumentParser(prog=".db export")
+    parser.add_argument('table')
+    parser.add_argument('--format', dest='file_format', default='json')
+    parser.add_argument('--columns', default=None)
+    parser.add_argument('--where', default=None)
+    parser.add_argument('--gzip', dest='compression', action='store_const', const='gzip')
+    parser.add_argument('--zstd', dest='compression', action='store_const', const='zstd')
+    try:
+        args = parser.parse_args(shlex.split(event.text.split(maxsplit=2)[2] if len(event.text.split()) > 2 else ""))
+    except ValueError as e:
+        return await event.edit(format_error(f"Argument xatosi: {html.escape(str(e))}\n\n{usage}"), parse_mode='html')
+
+    table_name = args.table
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+    await event.edit(f"<code>🔄 '{html.escape(table_name)}' jadvalidan ma'lumotlar eksport qilinmoqda...</code>", parse_mode='html')
+    try:
+        result = await export_table(
+            context.db, table_name,
+            fmt=args.file_format.lower(), columns=columns, where=args.where, compression=args.compression,
+            chunk_size=int(context.config.get("DB_EXPORT_CHUNK_ROWS", 1000)),
         )
-        await event.delete()
+    except ValueError as e:
+        return await event.edit(format_error(html.escape(str(e))), parse_mode='html')
     except Exception as e:
-        logger.error(f"DB Export error: {e}. Table: {table_name}, Format: {file_format}")
-        await event.edit(format_error(f"Eksport qilishda xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
-        
-        
+        logger.error(f"DB Export error: {e}. Table: {table_name}, Format: {args.file_format}")
+        return await event.edit(format_error(f"Eksport qilishda xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
+
+    with result.file:
+        if result.rows == 0:
+            return await event.edit(format_error(f"'{html.escape(table_name)}' jadvalida mos yozuvlar topilmadi."), parse_mode='html')
+        if not event.client: return
+        try:
+            # Fayl Telegram'ga qismlab yuklanadi: diskdagi vaqtinchalik fayl to'liq xotiraga o'qilmaydi
+            uploaded = await event.client.upload_file(result.file, file_name=result.filename, file_size=result.size_bytes)
+            details = f"{result.rows} qator, {humanbytes(result.size_bytes)}"
+            if args.where:
+                details += f", shart: <code>{html.escape(args.where)}</code>"
+            await event.client.send_file(
+                event.chat_id, uploaded,
+                caption=f"📄 <b>{html.escape(table_name)}</b> jadvali. Format: {args.file_format.upper()} ({details})",
+                force_document=True, reply_to=event.id, parse_mode='html'
+            )
+            await event.delete()
+        except Exception as e:
+            logger.error(f"DB Export upload error: {e}. Table: {table_name}")
+            await event.edit(format_error(f"Eksport faylini yuborishda xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
+
+
 @userbot_cmd(command="db stats", description="Ma'lumotlar bazasi haqida statistika.")
 @admin_only
 async def db_stats_handler(event: Message, context: AppContext):
+    """
+    .db stats          # Taxminiy qatorlar soni (sqlite_stat1), natija keshlanadi
+    .db stats --exact  # Aniq count(*) lar (o'qish pulida parallel)
+    """
+    exact = "--exact" in (event.text or "").split()
     await event.edit("<code>🔄 Ma'lumotlar bazasi statistikasi hisoblanmoqda...</code>")
 
-    stats = await context.db.db_stats()
+    stats = await context.db.db_stats(exact=exact)
     if "error" in stats:
         return await event.edit(format_error(stats['error']))
 
@@ -138,9 +299,76 @@ async def db_stats_handler(event: Message, context: AppContext):
         "",
     ]
 
+    if pool := stats.get('read_pool'):
+        response_lines.extend([
+            "<b>📚 O'qish puli:</b>",
+            f" • Ulanishlar: <code>{pool['available']}/{pool['size']}</code> bo'sh",
+            f" • Kutish (o'rtacha/maks): <code>{pool['avg_wait_ms']:.2f}/{pool['max_wait_ms']:.2f} ms</code>",
+            "",
+        ])
+
+    if queue := stats.get('write_queue'):
+        response_lines.extend([
+            "<b>📝 Yozuvlar navbati:</b>",
+            f" • Kutilmoqda: <code>{queue['pending']}</code>, yozilgan: <code>{queue['flushed']}</code> ({queue['batches']} paket)",
+            f" • Xatolar: <code>{queue['failed']}</code>, kutishlar: <code>{queue['backpressure_waits']}</code>",
+            "",
+        ])
+
+    if storage := stats.get('storage'):
+        response_lines.extend([
+            "<b>🧩 Sahifalar:</b>",
+            f" • auto_vacuum: <code>{storage['auto_vacuum']}</code>, sahifalar: <code>{storage['page_count']}</code>",
+            f" • Bo'sh: <code>{storage['freelist_count']}</code> ({storage['free_ratio']:.1%}, {storage['free_bytes'] / 1024:.1f} KB)",
+            "",
+        ])
+
+    if wal := stats.get('wal'):
+        checkpoints = ", ".join(f"{mode}: {count}" for mode, count in wal['checkpoints'].items() if count) or "yo'q"
+        wal_lines = [
+            "<b>🪵 WAL:</b>",
+            f" • Hajmi: <code>{humanbytes(wal['wal_bytes'])}</code> / byudjet <code>{humanbytes(wal['budget_bytes'])}</code> (maks: {humanbytes(wal['max_wal_bytes'])})",
+            f" • Checkpoint'lar: <code>{checkpoints}</code>, busy: <code>{wal['busy']}</code>, xatolar: <code>{wal['errors']}</code>",
+            f" • To'liq bo'lmagan: <code>{wal['starved_runs']}</code> (ketma-ket {wal['consecutive_starved']}), eng uzoq o'qish: <code>{wal['longest_read_seconds']:.1f} s</code>",
+        ]
+        if last := wal.get('last_checkpoint'):
+            wal_lines.append(f" • Oxirgisi: <code>{last['mode']}</code> {datetime.fromtimestamp(last['at']):%H:%M:%S}, {last['checkpointed_frames']}/{last['log_frames']} freym")
+        response_lines.extend([*wal_lines, ""])
+
+    if cache := stats.get('cache'):
+        lookups = cache['total_hits'] + cache['total_misses']
+        hit_rate = cache['total_hits'] / lookups if lookups else 0.0
+        response_lines.append(
+            f"<b>🧠 Kesh:</b> <code>{humanbytes(cache.get('total_bytes', 0))}</code>, hit rate <code>{hit_rate:.1%}</code>,"
+            f" birlashtirilgan <code>{cache.get('total_coalesced', 0)}</code>, eskirgan hit <code>{cache.get('total_stale_hits', 0)}</code>"
+        )
+        for name, ns in sorted(cache.get('namespaces', {}).items(), key=lambda item: item[1]['bytes'], reverse=True):
+            limit = f" / {humanbytes(ns['max_bytes'])}" if ns['max_bytes'] else ""
+            response_lines.append(
+                f" • <code>{name}</code>: {ns['entries']}/{ns['max_entries']} ta, {humanbytes(ns['bytes'])}{limit},"
+                f" hit {ns['hit_rate']:.1%}, chiqarilgan {ns['evictions']}, eskirgan {ns['expirations']}"
+            )
+        response_lines.append("")
+
+    if (shards := stats.get('shards')) is not None:
+        total_shard_bytes = sum(shard['file_size_bytes'] for shard in shards)
+        response_lines.append(f"<b>🗂 Akkaunt shardlari:</b> <code>{len(shards)}</code> ta, jami <code>{total_shard_bytes / 1024 / 1024:.2f} MB</code>")
+        response_lines.extend(
+            f" • <code>{shard['account_id']}</code>: {shard['file_size_bytes'] / 1024:.1f} KB"
+            for shard in sorted(shards, key=lambda s: s['file_size_bytes'], reverse=True)[:10]
+        )
+        response_lines.append("")
+
+    if meta := stats.get('table_stats'):
+        source = "aniq" if meta['exact'] else "taxminiy"
+        age = f"keshdan, {int(time.time() - meta['collected_at'])} s oldin" if meta.get('cached') else f"{meta['duration_ms']:.0f} ms"
+        response_lines.append(f"<i>Qatorlar soni: {source} ({age}). Aniq hisob: <code>.db stats --exact</code></i>\n")
+
     table_lines = [f"<b>Jadvallar ({len(stats['tables'])}):</b>"]
     for table in stats['tables']:
-        table_lines.append(f"• <code>{table['name']}</code> - {table['row_count']} ta yozuv")
+        row_count = "?" if table['row_count'] is None else f"{'' if table['row_count_exact'] else '~'}{table['row_count']}"
+        size = f", {humanbytes(table['size_bytes'])}" if table.get('size_bytes') is not None else ""
+        table_lines.append(f"• <code>{table['name']}</code> - {row_count} ta yozuv{size}")
         if table['indexes']:
             table_lines.append(f"  └ Indekslar: {', '.join(f'<code>{idx}</code>' for idx in table['indexes'])}")
 
@@ -155,12 +383,127 @@ async def db_stats_handler(event: Message, context: AppContext):
     await pagination.start()
 
 
+@userbot_cmd(command="db profile", description="So'rovlar profili: son, p50/p95/p99 kechikish, qatorlar.")
+@admin_only
+async def db_profile_handler(event: Message, context: AppContext):
+    """
+    .db profile              # Umumiy vaqt bo'yicha eng og'ir so'rovlar
+    .db profile p95_ms       # Boshqa ko'rsatkich bo'yicha saralash
+    .db profile reset        # Profilni tozalash
+    """
+    args = (event.text or "").split()[2:]
+    if args and args[0] == "reset":
+        context.db.reset_query_profile(slowlog=False)
+        return await event.edit(format_success("So'rovlar profili tozalandi."), parse_mode='html')
+
+    sort_by = args[0] if args else "total_ms"
+    try:
+        profile = context.db.get_query_profile(sort_by=sort_by, limit=15)
+    except ValueError as e:
+        return await event.edit(format_error(html.escape(str(e))), parse_mode='html')
+
+    if not profile:
+        return await event.edit("<b>ℹ️ Hali profil ma'lumotlari yig'ilmagan.</b>", parse_mode='html')
+
+    summary = context.db.get_query_profile_summary()
+    lines = [
+        f"<b>⏱️ So'rovlar profili</b> (saralash: <code>{html.escape(sort_by)}</code>)",
+        f"Jami: <code>{summary['queries']}</code> so'rov, <code>{summary['statements']}</code> xil, "
+        f"<code>{summary['total_ms']:.0f} ms</code>, lock qayta urinishlari: <code>{summary['lock_retries']}</code>",
+        "",
+    ]
+    for item in profile:
+        lines.append(f"<pre>{html.escape(item['statement'][:300])}</pre>")
+        lines.append(
+            f" • {item['count']} marta, jami <code>{item['total_ms']:.1f}</code> ms, "
+            f"p50/p95/p99: <code>{item['p50_ms']:.2f}/{item['p95_ms']:.2f}/{item['p99_ms']:.2f}</code> ms"
+        )
+        lines.append(f" • Qatorlar: <code>{item['rows']}</code>, lock qayta urinishlari: <code>{item['lock_retries']}</code>")
+    await send_as_file_if_long(event, "\n".join(lines), filename="db_profile.txt", parse_mode='html')
+
+
+@userbot_cmd(command="db slowlog", description="Sekin so'rovlar jurnalini EXPLAIN QUERY PLAN bilan ko'rsatadi.")
+@admin_only
+async def db_slowlog_handler(event: Message, context: AppContext):
+    """
+    .db slowlog          # Oxirgi sekin so'rovlar
+    .db slowlog clear    # Jurnalni tozalash
+    """
+    args = (event.text or "").split()[2:]
+    if args and args[0] == "clear":
+        context.db.clear_slow_queries()
+        return await event.edit(format_success("Sekin so'rovlar jurnali tozalandi."), parse_mode='html')
+
+    entries = context.db.get_slow_queries(limit=20)
+    if not entries:
+        return await event.edit("<b>✅ Sekin so'rovlar qayd etilmagan.</b>", parse_mode='html')
+
+    lines = [f"<b>🐢 Sekin so'rovlar ({len(entries)}):</b>", ""]
+    for entry in entries:
+        at = datetime.fromtimestamp(entry['at']).strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f"<b>{entry['duration_ms']:.1f} ms</b> — <code>{at}</code>")
+        lines.append(f"<pre>{html.escape(entry['sql'][:500])}</pre>")
+        lines.append(f" • Parametrlar: <code>{html.escape(entry['params'])}</code>")
+        for step in entry['plan'] or ["(reja hali olinmagan)"]:
+            lines.append(f"   └ <code>{html.escape(str(step))}</code>")
+        lines.append("")
+    await send_as_file_if_long(event, "\n".join(lines), filename="db_slowlog.txt", parse_mode='html')
+
+
+@userbot_cmd(command="db advise", description="So'rov rejalariga qarab yetishmayotgan indekslarni taklif qiladi.")
+@owner_only
+async def db_advise_handler(event: Message, context: AppContext):
+    """
+    .db advise          # Takliflar ro'yxati (profilga asoslanadi, .db profile)
+    .db advise --write  # Takliflarni data/migrations ga yangi migratsiya sifatida yozish
+    """
+    write = "--write" in (event.text or "").split()
+    await event.edit("<code>🔄 So'rov rejalari tahlil qilinmoqda...</code>", parse_mode='html')
+
+    advisor = IndexAdvisor(context.db)
+    try:
+        recommendations = await advisor.analyze()
+    except Exception as e:
+        logger.error(f"DB advise error: {e}", exc_info=True)
+        return await event.edit(format_error(f"Tahlilda xatolik:\n<code>{html.escape(str(e))}</code>"), parse_mode='html')
+
+    if not recommendations:
+        return await event.edit("<b>✅ Og'ir so'rovlarda indekssiz skanerlash topilmadi.</b>", parse_mode='html')
+
+    lines = [f"<b>💡 Indeks takliflari ({len(recommendations)}):</b>", ""]
+    for rec in recommendations:
+        kind = "qoplovchi" if rec.covering else "oddiy"
+        lines.append(f"<pre>{html.escape(rec.sql)}</pre>")
+        lines.append(
+            f" • {kind}, jadval: <code>{rec.row_count}</code> qator, {rec.calls} chaqiruv, "
+            f"<code>{rec.total_ms:.1f} ms</code> → ~<code>{rec.estimated_saving_ms:.1f} ms</code> tejash"
+        )
+        for statement in rec.statements[:2]:
+            lines.append(f"   └ <code>{html.escape(statement[:150])}</code>")
+
+    if write:
+        migration = advisor.write_migration(recommendations)
+        lines.extend(["", format_success(f"Migratsiya yozildi: <code>{html.escape(migration.name)}</code>. Keyingi ishga tushirishda qo'llaniladi.")])
+    else:
+        lines.extend(["", "<i>Migratsiya yaratish uchun: <code>.db advise --write</code></i>"])
+    await send_as_file_if_long(event, "\n".join(lines), filename="db_advise.txt", parse_mode='html')
+
+
 @userbot_cmd(command="db backup", description="Ma'lumotlar bazasining zaxira nusxasini yaratadi.")
 @owner_only
 async def db_backup_handler(event: Message, context: AppContext):
+    """
+    .db backup            # Bot to'xtamagan holda onlayn zaxira
+    .db backup --gzip     # Onlayn zaxirani gzip bilan siqish
+    .db backup --offline  # Ulanishni yopib, faylni to'g'ridan-to'g'ri nusxalash
+    """
+    parts = (event.text or "").split()
+    online = "--offline" not in parts
+    compress = True if "--gzip" in parts else None
+
     await event.edit("<code>💽 Zaxira nusxa yaratilmoqda...</code>", parse_mode='html')
     try:
-        backup_path = await context.db.create_backup()
+        backup_path = await context.db.create_backup(online=online, compress=compress)
         if not backup_path:
             return await event.edit(format_error("Zaxira nusxa yaratib bo'lmadi."), parse_mode='html')
 
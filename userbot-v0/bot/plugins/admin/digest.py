@@ -45,28 +45,31 @@ async def generate_digest_report(context: AppContext, client: TelegramClient, **
     
     three_days_ago_dt = datetime.now() - timedelta(days=1)
     
-    try:
-        total_media_res = await context.db.fetchone(
-            "SELECT COUNT(id) as c FROM logged_media WHERE account_id=? AND timestamp >= ?",
-            (account_id, three_days_ago_dt)
-        )
-        total_media_count = total_media_res['c'] if total_media_res else 0
+    # Soatlik yig'ma jadvaldan o'qiladi (xom logged_media qatorlari allaqachon o'chirilgan bo'lishi mumkin)
+    since_bucket = three_days_ago_dt.strftime('%Y-%m-%d %H:00:00')
 
-        most_active_chat_res = await context.db.fetchone(
-            "SELECT source_chat_id, COUNT(id) as media_count FROM logged_media "
-            "WHERE account_id=? AND timestamp >= ? "
+    try:
+        total_media_count = await context.db.fetch_val(
+            "SELECT COALESCE(SUM(media_count), 0) as c FROM logged_media_hourly WHERE account_id=? AND bucket >= ?",
+            (account_id, since_bucket)
+        ) or 0
+
+        most_active_chat_id = await context.db.fetchone(
+            "SELECT source_chat_id, SUM(media_count) as media_count FROM logged_media_hourly "
+            "WHERE account_id=? AND bucket >= ? "
             "GROUP BY source_chat_id ORDER BY media_count DESC LIMIT 1",
-            (account_id, three_days_ago_dt)
+            (account_id, since_bucket),
+            row_mode="scalar"
         )
         
         most_active_chat = "<i>(aniqlanmadi)</i>"
-        if most_active_chat_res and most_active_chat_res['source_chat_id']:
+        if most_active_chat_id:
             try:
-                entity = await resolve_entity(context, client, int(most_active_chat_res['source_chat_id']))
+                entity = await resolve_entity(context, client, int(most_active_chat_id))
                 most_active_chat = get_display_name(entity) if entity else "Noma'lum chat"
             except Exception as e:
                 logger.warning(f"Eng faol chat nomini olib bo'lmadi: {e}")
-                most_active_chat = f"ID: {most_active_chat_res['source_chat_id']}"
+                most_active_chat = f"ID: {most_active_chat_id}"
 
     except Exception as e:
         logger.exception(f"Hisobot uchun statistikani DB'dan olishda xato: {e}")
@@ -29,6 +29,7 @@ DELETED_MAP_NAMESPACE: str = "log_text:del_map"
 PM_LOGGING_MARKER: int = 0
 DELETE_BATCH_WINDOW: float = 2.5  # O'chirilgan xabarlarni guruhlash uchun kutish vaqti
 LARGE_TEXT_THRESHOLD: int = 3900 # Faylga yuborish uchun chegara
+JOURNAL_INSERT_SQL: str = "INSERT INTO message_journal (account_id, chat_id, message_id, sender_id, event, text) VALUES (?, ?, ?, ?, ?, ?)"
 
 # --- Global o'zgaruvchilar (faqat shu modul uchun) ---
 deleted_ids_batch: Dict[int, Set[int]] = defaultdict(set)
@@ -53,6 +54,16 @@ async def _send_to_log_channel(context: AppContext, client: TelegramClient, text
     except Exception:
         logger.exception(f"Log kanaliga ({log_channel_id}) yuborishda kutilmagan xatolik.")
 
+async def _journal_message(context: AppContext, account_id: int, chat_id: int, message_id: int, sender_id: Optional[int], event: str, text: str) -> None:
+    """
+    Xabarni `.search` uchun jurnalga yozadi. Yozuv navbat orqali partiyalarda saqlanadi,
+    FTS indeksi esa `system.search_index_sync` vazifasida yangilanadi — qabul qilish yo'li sekinlashmaydi.
+    """
+    try:
+        await context.db.enqueue_write(JOURNAL_INSERT_SQL, (account_id, chat_id, message_id, sender_id, event, text))
+    except Exception:
+        logger.exception(f"Xabarni jurnalga yozishda xato (msg_id={message_id}).")
+
 def _generate_diff_html(text1: str, text2: str) -> str:
     dmp = diff_match_patch()
     diffs = dmp.diff_main(str(text1 or ""), str(text2 or ""))
@@ -86,15 +97,14 @@ async def _get_log_header(context: AppContext, client: TelegramClient, peer_id:
 
 
 async def _should_log(context: AppContext, account_id: int, chat_id: int, user_id: Optional[int], is_private: bool) -> bool:
-    ignored_users = await context.db.fetchall("SELECT user_id FROM text_log_ignored_users WHERE account_id = ?", (account_id,))
-    if user_id and user_id in {u['user_id'] for u in ignored_users}:
+    if user_id and await context.db.get_settings_row("text_log_ignored_users", account_id, user_id):
         return False
         
-    specific_setting = await context.db.fetchone("SELECT is_enabled FROM text_log_settings WHERE account_id = ? AND chat_id = ?", (account_id, chat_id))
+    specific_setting = await context.db.get_settings_row("text_log_settings", account_id, chat_id)
     if specific_setting is not None:
         return bool(specific_setting['is_enabled'])
         
-    pm_enabled = await context.db.fetchone("SELECT is_enabled FROM text_log_settings WHERE account_id = ? AND chat_id = ?", (account_id, PM_LOGGING_MARKER))
+    pm_enabled = await context.db.get_settings_row("text_log_settings", account_id, PM_LOGGING_MARKER)
     return is_private and bool(pm_enabled and pm_enabled['is_enabled'])
 
 # ===== HODISA ISHLOVCHILARI =====
@@ -119,6 +129,7 @@ async def on_new_message_handler(event: events.NewMessage.Event, context: AppCon
     try:
         await context.cache.set(f"{account_id}:{event.chat_id}:{msg.id}", {"text": msg.text, "sender": msg.sender_id}, namespace=MSG_CACHE_NAMESPACE, ttl=LOG_CACHE_TTL)
         await context.cache.set(f"{account_id}:{msg.id}", event.chat_id, namespace=DELETED_MAP_NAMESPACE, ttl=LOG_CACHE_TTL)
+        await _journal_message(context, account_id, event.chat_id, msg.id, msg.sender_id, "new", msg.text)
         header = await _get_log_header(context, client, event.chat_id, msg.sender_id)
         log_body = f"{header}\n<a href='{msg.link}'>Yangi xabar keldi:</a>\n<blockquote>{html.escape(msg.text)}</blockquote>"
         await _send_to_log_channel(context, client, log_body)
@@ -152,6 +163,7 @@ async def on_message_edited_handler(event: events.MessageEdited.Event, context:
 
         old_text, new_text = cached_data['text'], msg.text
         if old_text == new_text: return
+        await _journal_message(context, account_id, event.chat_id, msg.id, msg.sender_id, "edit", new_text)
 
         header = await _get_log_header(context, client, event.chat_id, msg.sender_id)
         diff_html = _generate_diff_html(old_text, new_text)
@@ -214,6 +226,7 @@ async def process_deleted_batch(context: AppContext, account_id: int):
             if not await _should_log(context, account_id, chat_id, sender_id, chat_id > 0):
                 continue
             
+            await _journal_message(context, account_id, chat_id, msg_id, sender_id, "delete", cached_data.get('text', ''))
             header = await _get_log_header(context, client, chat_id, sender_id)
             message_text = html.escape(cached_data.get('text', ''))
             log_parts.append(f"{header}\n<blockquote>{message_text}</blockquote>")
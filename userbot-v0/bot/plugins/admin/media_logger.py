@@ -42,12 +42,12 @@ async def _should_log_media(context: AppContext, event: events.NewMessage.Event)
     if not account_id:
         return None
 
-    settings = await context.db.fetchone("SELECT * FROM media_logger_account_settings WHERE account_id = ?", (account_id,))
+    settings = await context.db.get_settings_row("media_logger_account_settings", account_id)
     log_channel_id = settings.get("log_channel_id") if settings else None
     if not log_channel_id:
         return None
 
-    chat_setting = await context.db.fetchone("SELECT is_enabled FROM media_log_chat_settings WHERE account_id = ? AND chat_id = ?", (account_id, event.chat_id))
+    chat_setting = await context.db.get_settings_row("media_log_chat_settings", account_id, event.chat_id)
     
     should_log = False
     if chat_setting is not None:
@@ -134,7 +134,7 @@ async def _download_and_resend(context: AppContext, msg: Message, sender: User,
 async def _log_media_to_db(context: AppContext, acc_id: int, msg: Message):
     """Media haqidagi ma'lumotni ma'lumotlar bazasiga yozadi."""
     m_type = msg.file.mime_type if msg.file else "unknown"
-    await context.db.execute(
+    await context.db.enqueue_write(
         "INSERT INTO logged_media (account_id, source_chat_id, sender_id, media_type, file_name, file_size) VALUES (?, ?, ?, ?, ?, ?)",
         (acc_id, msg.chat_id, msg.sender_id, m_type, getattr(msg.file, 'name', 'N/A'), getattr(msg.file, 'size', 0)),
     )
@@ -0,0 +1,117 @@
+# bot/plugins/admin/search.py
+"""
+Log qilingan xabarlar jurnali, eslatmalar va AFK paytidagi eslatmalar bo'yicha
+FTS5 to'liq matnli qidiruv plagini (reyting, ajratib ko'rsatish, kursorli sahifalash).
+"""
+
+import html
+import shlex
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from telethon.tl.custom import Message
+
+from core.app_context import AppContext
+from core.search_index import HIGHLIGHT_END, HIGHLIGHT_START, SEARCH_SOURCES, encode_cursor, search, sync_all
+from bot.decorators import userbot_cmd
+from bot.lib.auth import admin_only
+from bot.lib.telegram import get_account_id
+from bot.lib.ui import format_error, send_as_file_if_long
+from bot.lib.utils import RaiseArgumentParser
+
+SOURCE_ICONS: Dict[str, str] = {"journal": "💬", "afk": "💤", "notes": "📝"}
+EVENT_LABELS: Dict[str, str] = {"new": "yangi", "edit": "tahrirlangan", "delete": "o'chirilgan", "mention": "AFK eslatma"}
+# Qidiruvdan oldin indeksga qo'shiladigan partiyalar chegarasi (qolgani fon vazifasida)
+SYNC_MAX_BATCHES: int = 10
+
+
+def _highlight_html(snippet: Optional[str]) -> str:
+    """snippet() belgilarini xavfsiz HTML <b> teglariga almashtiradi."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_END, "</b>")
+
+
+def _message_link(chat_id: Optional[int], message_id: Optional[int]) -> Optional[str]:
+    if not chat_id or not message_id or not str(chat_id).startswith("-100"):
+        return None
+    return f"https://t.me/c/{str(chat_id)[4:]}/{message_id}"
+
+
+def _format_result(index: int, row: Dict[str, Any]) -> str:
+    icon = SOURCE_ICONS.get(row["source"], "🔎")
+    label = EVENT_LABELS.get(row["label"], row["label"]) if row["source"] != "notes" else f"#{row['label']}"
+    meta = [f"<i>{html.escape(str(label))}</i>"]
+    if row.get("chat_id"):
+        chat = f"<code>{row['chat_id']}</code>"
+        if link := _message_link(row["chat_id"], row.get("message_id")):
+            chat = f"<a href='{link}'>{chat}</a>"
+        meta.append(chat)
+    if row.get("sender_id"):
+        meta.append(f"<a href='tg://user?id={row['sender_id']}'>{row['sender_id']}</a>")
+    if row.get("created_at"):
+        meta.append(html.escape(str(row["created_at"])))
+    return f"<b>{index}.</b> {icon} {' · '.join(meta)}\n<blockquote>{_highlight_html(row['snippet'])}</blockquote>"
+
+
+@userbot_cmd(command="search", description="Log qilingan xabarlar, eslatmalar va AFK eslatmalari bo'yicha qidiradi.")
+@admin_only
+async def search_handler(event: Message, context: AppContext):
+    """
+    .search salom dunyo
+    .search "aniq ibora" --in journal --chat -1001234567890
+    .search hisob* OR invoice --limit 20
+    .search salom --after <kursor>
+    """
+    if not event.text or not event.client: return
+    args_str = event.text.split(maxsplit=1)[1] if len(event.text.split()) > 1 else ""
+
+    parser = RaiseArgumentParser(prog=".search")
+    parser.add_argument('query', nargs='+')
+    parser.add_argument('--in', dest='sources', default=None)
+    parser.add_argument('--chat', type=int, default=None)
+    parser.add_argument('--after', default=None)
+    parser.add_argument('--limit', type=int, default=10)
+
+    try:
+        args = parser.parse_args(shlex.split(args_str, posix=False))
+    except ValueError as e:
+        sources_help = ", ".join(SEARCH_SOURCES)
+        return await event.edit(format_error(f"Argument xatosi: {html.escape(str(e))}\n\nFoydalanish: <code>.search &lt;so'rov&gt; [--in {sources_help}] [--chat ID] [--after KURSOR] [--limit N]</code>"))
+
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()] if args.sources else None
+    if sources and (unknown := [s for s in sources if s not in SEARCH_SOURCES]):
+        return await event.edit(format_error(f"Noma'lum manba: <code>{html.escape(', '.join(unknown))}</code>. Mumkin: <code>{', '.join(SEARCH_SOURCES)}</code>"))
+    limit = min(max(args.limit, 1), 50)
+    query = " ".join(args.query)
+
+    account_id = await get_account_id(context, event.client)
+    if not account_id:
+        return await event.edit(format_error("Akkaunt ID'sini aniqlab bo'lmadi."))
+
+    await event.edit("<code>🔎 Qidirilmoqda...</code>")
+    try:
+        # Navbatdagi va hali indekslanmagan so'nggi xabarlar ham natijaga kirsin
+        await context.db.flush_writes()
+        await sync_all(await context.db.database_for(account_id), batch_size=int(context.config.get("DB_SEARCH_INDEX_BATCH_SIZE", 500)), max_batches=SYNC_MAX_BATCHES)
+        rows = await search(context.db, query, account_id, sources=sources, chat_id=args.chat, after=args.after, limit=limit)
+    except ValueError as e:
+        return await event.edit(format_error(html.escape(str(e))))
+    except Exception as e:
+        logger.exception(f"Qidiruvda xatolik: {query}")
+        return await event.edit(format_error(f"Qidiruvda xatolik: <code>{html.escape(str(e))}</code>"))
+
+    if not rows:
+        suffix = " (boshqa natija yo'q)" if args.after else ""
+        return await event.edit(f"🔎 <code>{html.escape(query)}</code> bo'yicha hech narsa topilmadi{suffix}.")
+
+    lines = [f"<b>🔎 Qidiruv:</b> <code>{html.escape(query)}</code>\n"]
+    lines.extend(_format_result(i, row) for i, row in enumerate(rows, start=1))
+    if len(rows) == limit:
+        next_args = [html.escape(query)]
+        if args.sources: next_args.append(f"--in {html.escape(args.sources)}")
+        if args.chat is not None: next_args.append(f"--chat {args.chat}")
+        if args.limit != 10: next_args.append(f"--limit {limit}")
+        next_args.append(f"--after {encode_cursor(rows[-1])}")
+        lines.append(f"\n<b>➡️ Keyingi sahifa:</b>\n<code>.search {' '.join(next_args)}</code>")
+
+    await send_as_file_if_long(event, "\n\n".join(lines), filename="search_results.txt", parse_mode='html')
@@ -249,3 +249,53 @@ async def tasks_log_handler(event: Message, context: AppContext):
 
     pagination = PaginationHelper(context=context, items=lines, title="📜 Vazifalar Bajarilishi Jurnali", origin_event=event)
     await pagination.start()
+
+
+@userbot_cmd(command="tasks stats", description="Vazifalar bo'yicha kunlik yig'ma statistika.")
+@admin_only
+async def tasks_stats_handler(event: Message, context: AppContext):
+    """
+    .tasks stats              # Oxirgi 7 kun
+    .tasks stats --days 30
+    .tasks stats system.cleanup_db
+    """
+    if not event.text:
+        return
+
+    args_str = event.text.split(maxsplit=2)[2] if len(event.text.split()) > 2 else ""
+    parser = RaiseArgumentParser(prog=".tasks stats")
+    parser.add_argument('task_key', nargs='?', default=None, help="Filtrlash uchun vazifa nomi")
+    parser.add_argument('--days', type=int, default=7, help="Necha kunlik statistika")
+
+    try:
+        args = parser.parse_args(shlex.split(args_str))
+    except ValueError as e:
+        return await event.edit(format_error(f"Argument xatosi: {e}"), parse_mode='html')
+
+    await context.db.flush_writes()
+    query = (
+        "SELECT task_key, SUM(runs) AS runs, SUM(success_count) AS ok, SUM(failure_count) AS failed, "
+        "SUM(timeout_count) AS timeouts, SUM(total_duration_ms) AS total_ms, MAX(max_duration_ms) AS max_ms "
+        "FROM task_logs_daily WHERE bucket >= date('now', 'localtime', ?)"
+    )
+    params: list = [f"-{max(args.days - 1, 0)} days"]
+    if args.task_key:
+        query += " AND task_key LIKE ?"
+        params.append(f"%{args.task_key}%")
+    query += " GROUP BY task_key ORDER BY runs DESC"
+
+    rows = await context.db.fetchall(query, tuple(params))
+    if not rows:
+        return await event.edit("<b>📊 Bu davr uchun statistika topilmadi.</b>", parse_mode='html')
+
+    lines = []
+    for row in rows:
+        avg_ms = row['total_ms'] / row['runs'] if row['runs'] else 0
+        lines.append(
+            f"<b>{html.escape(row['task_key'])}</b>: {row['runs']} marta "
+            f"(✅ {row['ok']} / ❌ {row['failed']} / ⏳ {row['timeouts']}), "
+            f"o'rtacha <code>{avg_ms:.0f}ms</code>, maks <code>{row['max_ms']:.0f}ms</code>"
+        )
+
+    pagination = PaginationHelper(context=context, items=lines, title=f"📊 Vazifalar statistikasi ({args.days} kun)", origin_event=event)
+    await pagination.start()
@@ -33,8 +33,8 @@ async def _should_reply_afk(context: AppContext, event: events.NewMessage.Event)
     if not account_id: return None
 
     logger.debug(f"[AFK_CHECK] AccID {account_id} uchun AFK holati tekshirilmoqda...")
-    afk_settings = await context.db.fetchone("SELECT * FROM afk_settings WHERE account_id = ? AND is_afk = 1", (account_id,))
-    if not afk_settings:
+    afk_settings = await context.db.get_settings_row("afk_settings", account_id)
+    if not afk_settings or not afk_settings.get("is_afk"):
         logger.debug("[AFK_CHECK] AFK rejimi aktiv emas.")
         return None
     logger.debug(f"[AFK_CHECK] AFK sozlamalari topildi: {dict(afk_settings)}")
@@ -90,7 +90,7 @@ async def afk_response_handler(event: events.NewMessage.Event, context: AppConte
             else:
                 await event.reply(f"Sizga <b>{mentions_count + 1}-marta</b> eslatilmoqda, men hozir bandman (<b>AFK</b>).", parse_mode='html')
 
-        await context.db.execute(
+        await context.db.enqueue_write(
             "INSERT INTO afk_mentions (afk_account_id, chatter_id, chat_id, message_id, message_text) VALUES (?, ?, ?, ?, ?)",
             (account_id, sender.id, event.chat_id, event.id, event.text or "[Media]")
         )
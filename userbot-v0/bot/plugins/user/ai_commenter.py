@@ -67,7 +67,7 @@ async def _check_and_generate_comment(event: Message, context: AppContext, accou
         await event.reply(answer)
         
         _last_comment_time[channel_id] = datetime.now()
-        await context.db.execute(
+        await context.db.enqueue_write(
             "INSERT INTO ai_usage_stats (userbot_account_id, stat_date, call_count) VALUES (?, ?, 1) "
             "ON CONFLICT(userbot_account_id, stat_date) DO UPDATE SET call_count = call_count + 1",
             (account_id, datetime.now().strftime("%Y-%m-%d"))
@@ -180,9 +180,15 @@ async def stats_cmd(event: Message, context: AppContext):
     account_id = await get_account_id(context, event.client)
     if not account_id: return await event.edit(format_error("Akkaunt ID topilmadi."), parse_mode='html')
 
-    today = datetime.now().strftime("%Y-%m-%d")
-    today_stat = await context.db.fetchone("SELECT call_count FROM ai_usage_stats WHERE userbot_account_id = ? AND stat_date = ?", (account_id, today))
-    total_stat = await context.db.fetchone("SELECT SUM(call_count) as total FROM ai_usage_stats WHERE userbot_account_id = ?", (account_id,))
+    await context.db.flush_writes()
+    now = datetime.now()
+    today_stat = await context.db.fetchone("SELECT call_count FROM ai_usage_stats WHERE userbot_account_id = ? AND stat_date = ?", (account_id, now.strftime("%Y-%m-%d")))
+    hour_stat = await context.db.fetchone("SELECT call_count FROM ai_usage_hourly WHERE userbot_account_id = ? AND bucket = ?", (account_id, now.strftime("%Y-%m-%d %H:00:00")))
+    total_stat = await context.db.fetchone("SELECT call_count as total FROM ai_usage_totals WHERE userbot_account_id = ?", (account_id,))
     
-    await event.edit(f"<b>📊 AI Commenter Statistikasi:</b>\n- Bugun: {code(today_stat['call_count'] if today_stat else 0)}\n- Jami: {code(total_stat['total'] if total_stat else 0)}", parse_mode='html')
+    await event.edit(
+        f"<b>📊 AI Commenter Statistikasi:</b>\n- Shu soatda: {code(hour_stat['call_count'] if hour_stat else 0)}\n"
+        f"- Bugun: {code(today_stat['call_count'] if today_stat else 0)}\n- Jami: {code(total_stat['total'] if total_stat else 0)}",
+        parse_mode='html'
+    )
 
@@ -70,10 +70,7 @@ async def welcome_event_handler(event: events.ChatAction.Event, context: AppCont
     account_id = await get_account_id(context, event.client)
     if not account_id: return
     
-    settings = await context.db.fetchone(
-        "SELECT * FROM group_settings WHERE userbot_account_id = ? AND chat_id = ?",
-        (account_id, event.chat_id)
-    )
+    settings = await context.db.get_settings_row("group_settings", account_id, event.chat_id)
     if not settings: return
 
     if settings.get('clean_service_messages') and (event.user_joined or event.user_left or event.user_kicked):
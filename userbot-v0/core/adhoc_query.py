@@ -0,0 +1,174 @@
+import asyncio
+import csv
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, TextIO, Tuple
+
+import aiosqlite
+from loguru import logger
+
+from .exceptions import QueryError, QueryInterruptedError
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+# Progress handler har shuncha SQLite VM instruksiyasida chaqiriladi
+PROGRESS_STEPS = 1000
+# Faqat o'qiydigan so'rovlar shu kalit so'zlar bilan boshlanadi (qolganlari yozuvchi ulanishda bajariladi)
+READ_QUERY_PREFIXES = ("SELECT", "WITH", "EXPLAIN", "VALUES")
+
+STOP_REASONS = {
+    "timeout": "vaqt chegarasi tugadi",
+    "steps": "VM qadamlari chegarasi tugadi",
+    "cancelled": "bekor qilindi",
+}
+
+_query_ids = itertools.count(1)
+_active_queries: Dict[int, "AdhocQuery"] = {}
+
+
+def is_read_query(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(READ_QUERY_PREFIXES)
+
+
+@dataclass
+class AdhocQuery:
+    """Bajarilayotgan qo'lda yozilgan so'rov: byudjet, progress va bekor qilish holati."""
+    query_id: int
+    sql: str
+    timeout: float
+    max_steps: int
+    started_at: float = field(default_factory=time.monotonic)
+    rows: int = 0
+    steps: int = 0
+    stop_reason: Optional[str] = None
+    _conn: Optional[aiosqlite.Connection] = field(default=None, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def _check_budget(self) -> bool:
+        if self.stop_reason is None:
+            if self.timeout and self.elapsed > self.timeout:
+                self.stop_reason = "timeout"
+            elif self.max_steps and self.steps > self.max_steps:
+                self.stop_reason = "steps"
+        return self.stop_reason is not None
+
+    def _progress(self) -> int:
+        # SQLite ishchi oqimida chaqiriladi; nol bo'lmagan qiymat so'rovni to'xtatadi (sqlite3_interrupt)
+        self.steps += PROGRESS_STEPS
+        return 1 if self._check_budget() else 0
+
+    async def cancel(self) -> None:
+        """So'rovni to'xtatadi: sqlite3 interrupt() ishchi oqimini kutmasdan chaqiriladi."""
+        self.stop_reason = self.stop_reason or "cancelled"
+        if self._conn is not None:
+            await self._conn.interrupt()
+
+
+@dataclass
+class AdhocResult:
+    columns: List[str]
+    rows: int
+    preview: List[Tuple[Any, ...]]
+    truncated: bool
+    elapsed_ms: float
+    steps: int
+
+
+def get_active_queries() -> List[AdhocQuery]:
+    return sorted(_active_queries.values(), key=lambda q: q.query_id)
+
+
+async def cancel_queries(query_id: Optional[int] = None) -> List[int]:
+    """Berilgan (yoki barcha) faol so'rovlarni bekor qiladi va bekor qilingan ID larni qaytaradi."""
+    targets = [q for q in get_active_queries() if query_id is None or q.query_id == query_id]
+    for query in targets:
+        await query.cancel()
+    return [q.query_id for q in targets]
+
+
+@asynccontextmanager
+async def open_readonly_connection(db: "AsyncDatabase") -> AsyncIterator[aiosqlite.Connection]:
+    """Asosiy bazaga alohida, faqat o'qish uchun ulanish (umumiy yozuvchi va o'qish pulidan mustaqil)."""
+    if not db.db_path:
+        raise QueryError("Ma'lumotlar bazasi yo'li sozlanmagan.")
+    conn = await aiosqlite.connect(f"{db.db_path.resolve().as_uri()}?mode=ro", uri=True, timeout=5)
+    try:
+        await conn.execute("PRAGMA query_only = ON")
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def run_adhoc_query(
+    conn: aiosqlite.Connection,
+    sql: str,
+    sink: Optional[TextIO] = None,
+    *,
+    timeout: float = 15,
+    max_steps: int = 0,
+    max_rows: int = 0,
+    preview_rows: int = 50,
+    batch_size: int = 500,
+) -> AdhocResult:
+    """
+    So'rovni `conn` da bajaradi va natijani `sink` ga CSV sifatida qismlab yozadi (xotirada
+    faqat birinchi `preview_rows` ta qator saqlanadi). Progress handler `timeout` soniya yoki
+    `max_steps` VM qadamidan keyin so'rovni to'xtatadi; `cancel_queries` ham shu yo'l bilan ishlaydi.
+    Byudjet tugasa yoki bekor qilinsa `QueryInterruptedError` (qisman natija soni bilan) ko'tariladi.
+    `max_rows` dan ortiq qator bo'lsa o'qish to'xtatiladi va natija `truncated` deb belgilanadi.
+    CSV kodlash va `sink` ga yozish (u diskdagi fayl bo'lishi mumkin) ishchi oqimda bajariladi.
+    """
+    query = AdhocQuery(query_id=next(_query_ids), sql=sql, timeout=timeout, max_steps=max_steps, _conn=conn)
+    _active_queries[query.query_id] = query
+    writer = csv.writer(sink) if sink is not None else None
+    columns: List[str] = []
+    preview: List[Tuple[Any, ...]] = []
+    truncated = False
+    await conn.set_progress_handler(query._progress, PROGRESS_STEPS)
+    try:
+        async with conn.execute(sql) as cursor:
+            columns = [d[0] for d in cursor.description or ()]
+            if writer and columns:
+                await asyncio.to_thread(writer.writerow, columns)
+            while rows := await cursor.fetchmany(batch_size):
+                # Aynan `max_rows` ta qatorli natija qisqartirilgan emas: chegaradan keyin qator kelsagina
+                if max_rows and query.rows + len(rows) > max_rows:
+                    rows = rows[:max_rows - query.rows]
+                    truncated = True
+                rows = [tuple(row) for row in rows]
+                if len(preview) < preview_rows:
+                    preview.extend(rows[:preview_rows - len(preview)])
+                if writer and rows:
+                    await asyncio.to_thread(writer.writerows, rows)
+                query.rows += len(rows)
+                if truncated or query._check_budget():
+                    break
+        if query.stop_reason:
+            raise QueryInterruptedError(query.stop_reason, rows=query.rows, elapsed=query.elapsed)
+    except aiosqlite.OperationalError as e:
+        if query.stop_reason:
+            raise QueryInterruptedError(query.stop_reason, rows=query.rows, elapsed=query.elapsed) from e
+        raise
+    finally:
+        _active_queries.pop(query.query_id, None)
+        try:
+            await conn.set_progress_handler(None, 0)
+        except aiosqlite.Error:
+            pass
+
+    logger.debug(f"Ad-hoc so'rov #{query.query_id}: {query.rows} qator, {query.elapsed * 1000:.1f} ms, ~{query.steps} VM qadam.")
+    return AdhocResult(
+        columns=columns,
+        rows=query.rows,
+        preview=preview,
+        truncated=truncated,
+        elapsed_ms=round(query.elapsed * 1000, 3),
+        steps=query.steps,
+    )
@@ -0,0 +1,276 @@
+import asyncio
+import gzip
+import re
+import shutil
+import sqlite3
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+# Arxiv fayli: `<archive_dir>/<baza nomi>.<YYYY-MM>.db`; yopilgan oylar `.db.gz` ko'rinishida siqiladi
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+UNDATED_MONTH = "undated"
+SOURCE_ROWID_COLUMN = "source_rowid"
+
+
+def month_schema(month: str) -> str:
+    """ATTACH qilingan arxiv sxemasining nomi: `2026-09` -> `archive_2026_09`."""
+    return "archive_" + month.replace("-", "_")
+
+
+def max_attached_months() -> int:
+    """Bitta sessiyada ATTACH qilish mumkin bo'lgan arxivlar soni (SQLITE_LIMIT_ATTACHED, odatda 10)."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    finally:
+        conn.close()
+
+
+def _readonly_uri(path: Path) -> str:
+    # as_uri() `?`, `#` va `%` belgilarini kodlaydi; f"file:{path}" ularda buziladi
+    return f"{path.resolve().as_uri()}?mode=ro"
+
+
+def _archive_prefix(db: "AsyncDatabase") -> str:
+    return f"{db.db_path.stem}."
+
+
+def archive_path(db: "AsyncDatabase", month: str, compressed: bool = False) -> Path:
+    return db.archive_dir / f"{_archive_prefix(db)}{month}.db{'.gz' if compressed else ''}"
+
+
+def list_archives(db: "AsyncDatabase") -> List[Dict[str, Any]]:
+    """Bazaga tegishli oylik arxivlar: oy, fayl, siqilganmi va hajmi (oy bo'yicha tartiblangan)."""
+    if not db.db_path or not db.archive_dir.is_dir():
+        return []
+    prefix = _archive_prefix(db)
+    archives: Dict[str, Dict[str, Any]] = {}
+    for path in db.archive_dir.glob(f"{prefix}*.db*"):
+        name = path.name[len(prefix):]
+        month, _, suffix = name.partition(".")
+        if suffix not in ("db", "db.gz") or not (_MONTH_RE.match(month) or month == UNDATED_MONTH):
+            continue
+        # Qayta ochilgan (siqilmagan) fayl siqilganidan ustun turadi
+        if month in archives and suffix == "db.gz":
+            continue
+        archives[month] = {"month": month, "path": path, "compressed": suffix == "db.gz", "size": path.stat().st_size}
+    return [archives[month] for month in sorted(archives)]
+
+
+def resolve_months(db: "AsyncDatabase", spec: str) -> List[str]:
+    """
+    `.db query --archive` qiymatini oylar ro'yxatiga aylantiradi:
+    `all`, `2026-09`, `2026-07,2026-09` yoki `2026-07..2026-09` (faqat mavjud arxivlar).
+    """
+    available = [a["month"] for a in list_archives(db)]
+    months: List[str] = []
+    for part in (p.strip() for p in spec.split(",") if p.strip()):
+        if part == "all":
+            months.extend(available)
+        elif ".." in part:
+            start, _, end = part.partition("..")
+            months.extend(m for m in available if start <= m <= end and m != UNDATED_MONTH)
+        elif part in available:
+            months.append(part)
+        else:
+            raise ValueError(f"'{part}' oyi uchun arxiv topilmadi. Mavjud: {', '.join(available) or 'yo`q'}")
+    return list(dict.fromkeys(months))
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _reopen_month_sync(path: Path, compressed_path: Path) -> None:
+    """Yopilgan oyga kechikkan qatorlar kelsa, siqilgan arxiv yana yoziladigan faylga ochiladi."""
+    if path.exists() or not compressed_path.exists():
+        return
+    with gzip.open(compressed_path, "rb") as f_in, open(path, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    compressed_path.unlink()
+
+
+def _append_rows_sync(path: Path, compressed_path: Path, table: str, date_column: str, columns: List[str], rows: List[Tuple]) -> None:
+    """
+    Qatorlarni oylik arxiv fayliga qo'shadi. `(source_rowid, date_column)` noyob, shuning uchun
+    qatorlar arxivga yozilib, asosiy bazadan hali o'chirilmagan holatda qayta ishga tushirish takror yozmaydi.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _reopen_month_sync(path, compressed_path)
+    conn = sqlite3.connect(path)
+    try:
+        column_defs = ", ".join(_quote(c) for c in columns)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({SOURCE_ROWID_COLUMN} INTEGER NOT NULL, {column_defs})")
+        # Asosiy jadvalga keyinroq qo'shilgan ustunlar arxivda ham paydo bo'lsin
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+        conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'ux_{table}_source')} ON {_quote(table)} ({SOURCE_ROWID_COLUMN}, {_quote(date_column)})"
+        )
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {_quote(table)} ({SOURCE_ROWID_COLUMN}, {column_defs}) VALUES ({placeholders})",
+                rows,
+            )
+    finally:
+        conn.close()
+
+
+def _seal_month_sync(path: Path, compressed_path: Path) -> None:
+    """Oy yopiladi: fayl VACUUM bilan zichlanadi va gzip ga siqiladi (keyin faqat o'qiladi)."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    with open(path, "rb") as f_in, gzip.open(compressed_path, "wb", compresslevel=9) as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    path.unlink()
+
+
+def _materialize_sync(archive: Dict[str, Any], target_dir: Path) -> Path:
+    if not archive["compressed"]:
+        return archive["path"]
+    target = target_dir / archive["path"].name.removesuffix(".gz")
+    with gzip.open(archive["path"], "rb") as f_in, open(target, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    return target
+
+
+async def archive_table_rows(db: "AsyncDatabase", table_name: str, date_column: str, archive_days: int, batch_size: int, pause: float) -> int:
+    """
+    `archive_days` kundan eski qatorlarni oylik arxiv fayllariga ko'chiradi. Har partiya avval arxivga
+    yoziladi, so'ng asosiy bazadan qisqa tranzaksiyada o'chiriladi; jonli baza kichik qoladi.
+    """
+    cutoff = await db.fetch_val("SELECT date('now', ?)", (f"-{archive_days} days",))
+    columns = [row["name"] for row in await db.fetchall(f"PRAGMA table_info('{table_name}')")]
+    select_columns = ", ".join(_quote(c) for c in columns)
+
+    moved = 0
+    last_rowid = 0
+    while True:
+        # (oy, source_rowid, ustunlar...) — arxivga yoziladigan tuple to'g'ridan-to'g'ri olinadi
+        rows = await db.fetchall(
+            f"SELECT coalesce(strftime('%Y-%m', {date_column}), '{UNDATED_MONTH}'), rowid, {select_columns} "
+            f"FROM {table_name} WHERE rowid > ? AND {date_column} < ? ORDER BY rowid LIMIT ?",
+            (last_rowid, cutoff, batch_size),
+            row_mode="tuple",
+        )
+        if not rows:
+            break
+
+        by_month: Dict[str, List[Tuple]] = {}
+        for row in rows:
+            by_month.setdefault(row[0], []).append(row[1:])
+        for month, month_rows in by_month.items():
+            await asyncio.to_thread(
+                _append_rows_sync, archive_path(db, month), archive_path(db, month, compressed=True),
+                table_name, date_column, columns, month_rows,
+            )
+
+        upper_rowid = rows[-1][1]
+        moved += await db.execute(
+            f"DELETE FROM {table_name} WHERE rowid > ? AND rowid <= ? AND {date_column} < ?",
+            (last_rowid, upper_rowid, cutoff),
+        )
+        last_rowid = upper_rowid
+        logger.debug(f"🗄 '{table_name}': {moved} ta qator arxivga ko'chirildi (rowid <= {last_rowid}).")
+        await asyncio.sleep(pause)
+    return moved
+
+
+def _shift_month(month: str, delta: int) -> str:
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def open_month_before(max_archive_days: int, now: Optional[datetime] = None) -> str:
+    """Eng uzoq saqlanadigan jadval hali qator qo'shishi mumkin bo'lgan eng eski oy (undan oldingilari yopiladi)."""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=max_archive_days)).strftime("%Y-%m")
+
+
+async def seal_archives(db: "AsyncDatabase", before_month: str) -> int:
+    """`before_month` dan oldingi ochiq oylik arxivlarni siqadi."""
+    sealed = 0
+    for archive in list_archives(db):
+        month = archive["month"]
+        if archive["compressed"] or month == UNDATED_MONTH or month >= before_month:
+            continue
+        await asyncio.to_thread(_seal_month_sync, archive["path"], archive_path(db, month, compressed=True))
+        sealed += 1
+        logger.info(f"🗜 {month} arxivi yopildi va siqildi.")
+    return sealed
+
+
+def prune_archives(db: "AsyncDatabase", keep_months: int, now: Optional[datetime] = None) -> int:
+    """`keep_months` oydan eski arxiv fayllarini o'chiradi. keep_months <= 0 bo'lsa hammasi saqlanadi."""
+    if keep_months <= 0:
+        return 0
+    oldest_kept = _shift_month((now or datetime.now(timezone.utc)).strftime("%Y-%m"), -keep_months)
+    removed = 0
+    for archive in list_archives(db):
+        if archive["month"] != UNDATED_MONTH and archive["month"] < oldest_kept:
+            archive["path"].unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+@asynccontextmanager
+async def open_archive_session(db: "AsyncDatabase", months: Sequence[str]) -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Asosiy bazaga faqat o'qish uchun alohida ulanish ochib, tanlangan oylik arxivlarni `archive_YYYY_MM`
+    sxemalari sifatida ATTACH qiladi. Siqilgan arxivlar vaqtinchalik katalogga ochiladi va sessiya
+    yopilganda o'chiriladi. Har bir arxivlangan jadval uchun barcha oylarni birlashtiruvchi
+    `archive_<jadval>` vaqtinchalik ko'rinishi yaratiladi. SQLite bitta ulanishga cheklangan sondagi
+    bazani ATTACH qiladi (`max_attached_months`), undan ko'p oy so'ralsa ValueError.
+    """
+    limit = max_attached_months()
+    if len(months) > limit:
+        raise ValueError(
+            f"Bitta so'rovda ko'pi bilan {limit} oylik arxiv ulanadi, {len(months)} ta so'raldi. "
+            "Oylar oralig'ini qisqartiring."
+        )
+    archives = {a["month"]: a for a in list_archives(db)}
+    with tempfile.TemporaryDirectory(prefix="archive_") as tmp_dir:
+        conn = await aiosqlite.connect(_readonly_uri(db.db_path), uri=True)
+        conn.row_factory = aiosqlite.Row
+        try:
+            table_columns: Dict[str, List[List[str]]] = {}
+            table_schemas: Dict[str, List[str]] = {}
+            for month in months:
+                if month not in archives:
+                    raise ValueError(f"'{month}' oyi uchun arxiv topilmadi.")
+                path = await asyncio.to_thread(_materialize_sync, archives[month], Path(tmp_dir))
+                schema = month_schema(month)
+                await conn.execute(f"ATTACH DATABASE ? AS {schema}", (_readonly_uri(path),))
+                async with conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'") as cursor:
+                    tables = [row[0] for row in await cursor.fetchall()]
+                for table in tables:
+                    async with conn.execute(f"PRAGMA {schema}.table_info({_quote(table)})") as cursor:
+                        table_columns.setdefault(table, []).append([row[1] for row in await cursor.fetchall()])
+                    table_schemas.setdefault(table, []).append(schema)
+
+            for table, schemas in table_schemas.items():
+                # Oylar orasida ustunlar farq qilishi mumkin: faqat umumiy ustunlar birlashtiriladi
+                common = [c for c in table_columns[table][0] if all(c in cols for cols in table_columns[table][1:])]
+                column_list = ", ".join(_quote(c) for c in common)
+                union = " UNION ALL ".join(f"SELECT {column_list} FROM {schema}.{_quote(table)}" for schema in schemas)
+                await conn.execute(f"CREATE TEMP VIEW {_quote(f'archive_{table}')} AS {union}")
+            yield conn
+        finally:
+            await conn.close()
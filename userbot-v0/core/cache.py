@@ -1,13 +1,17 @@
 # userbot-v0/core/cache.py faylining to'liq va yangilangan versiyasi
 
 import asyncio
+import itertools
+import math
 import pickle
+import sys
+import time
 from functools import wraps
 from pathlib import Path
-from typing import Any, Callable, Coroutine, Dict, Generic, Optional, TypeVar, cast, Hashable
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Generic, List, NamedTuple, Optional, Tuple, TypeVar, cast, Hashable
 
 import aiofiles
-from cachetools import LRUCache, TTLCache
+from cachetools import Cache, TLRUCache, TTLCache
 from loguru import logger
 
 from .config import BASE_DIR
@@ -21,100 +25,319 @@ VT = TypeVar('VT')
 CACHE_FILE_PATH = BASE_DIR / "data" / "cache.pkl"
 
 
+class _Entry(NamedTuple):
+    """
+    Keshdagi qiymat va uning muddati tugaydigan vaqt (`expires_at`, unix vaqt; None - muddatsiz).
+    Vaqt mutlaq bo'lgani uchun diskdan yuklash yoki makonni qayta qurish muddatni uzaytirmaydi.
+    `stale_at` (unix vaqt) berilgan bo'lsa, undan keyin qiymat eskirgan hisoblanadi, lekin
+    `expires_at` gacha fonda yangilanish paytida berib turiladi (stale-while-revalidate).
+    """
+    value: Any
+    expires_at: Optional[float]
+    stale_at: Optional[float] = None
+
+    @property
+    def stale(self) -> bool:
+        return self.stale_at is not None and time.time() >= self.stale_at
+
+
+def _entry_expiry(key: Hashable, entry: _Entry, now: float) -> float:
+    return math.inf if entry.expires_at is None else entry.expires_at
+
+
+# approx_sizeof katta to'plamlarda shuncha elementni o'lchaydi
+_SIZER_SAMPLE = 100
+
+
+def approx_sizeof(value: Any, depth: int = 3) -> int:
+    """
+    Qiymatning taxminiy xotira hajmi (bayt): `sys.getsizeof` + `depth` qavatgacha ichki elementlar.
+    Katta to'plamlarda faqat birinchi `_SIZER_SAMPLE` ta element o'lchanib, qolgani shunga qarab baholanadi.
+    """
+    size = sys.getsizeof(value, 64)
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        children: Any = list(itertools.islice(itertools.chain.from_iterable(value.items()), 2 * _SIZER_SAMPLE))
+        total = 2 * len(value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        children, total = list(itertools.islice(value, _SIZER_SAMPLE)), len(value)
+    elif hasattr(value, "__dict__"):
+        children = list(vars(value).values())
+        total = len(children)
+    else:
+        return size
+    if not children:
+        return size
+    measured = sum(approx_sizeof(child, depth - 1) for child in children)
+    return size + measured * total // len(children)
+
+
+class NamespaceStore(TLRUCache):
+    """
+    Bitta nomlar makoni: yozuv bo'yicha TTL (muddatlar heap'da), yozuvlar soni va taxminiy bayt
+    chegarasi. Chegaradan oshganda eng kam ishlatilgan yozuvlar chiqariladi. `sizer` qiymat
+    hajmini baholaydi (standart: `approx_sizeof`).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, sizer: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizer = sizer or approx_sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        # Taymer unix vaqt: `_Entry.expires_at` bilan bir xil soat (monotonic qayta ishga tushganda nolga qaytadi)
+        super().__init__(maxsize=max_bytes or math.inf, ttu=_entry_expiry, timer=time.time, getsizeof=self._entry_size)
+
+    def _entry_size(self, entry: _Entry) -> int:
+        return self._sizer(entry.value)
+
+    def __setitem__(self, key: Hashable, value: _Entry) -> None:
+        super().__setitem__(key, value)
+        # TLRUCache.__len__ har safar expire() qiladi; bu yerda expire hozirgina bajarilgan
+        while Cache.__len__(self) > self.max_entries:
+            self.popitem()
+
+    def popitem(self) -> Any:
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time: Optional[float] = None) -> Any:
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": int(self.currsize),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+        }
+
+
+def _store_items(store: Any) -> List[Tuple[Hashable, _Entry]]:
+    """
+    Har qanday (joriy yoki eski TTLCache/LRUCache) do'kondagi muddati o'tmagan yozuvlarni `_Entry`
+    ko'rinishida qaytaradi. Eski do'konlarda yozuv bo'yicha muddat yo'q: hozirdan boshlab do'kon TTL'i olinadi.
+    """
+    now = time.time()
+    expires_at = now + float(store.ttl) if isinstance(store, TTLCache) else None
+    items = [(key, value if isinstance(value, _Entry) else _Entry(value, expires_at)) for key, value in list(store.items())]
+    return [(key, entry) for key, entry in items if entry.expires_at is None or entry.expires_at > now]
+
+
 class CacheManager(Generic[VT]):
     """
     Asinxron, TTL va LRU siyosatlarini qo'llab-quvvatlaydigan, nomlar makoniga
     ega, diskka saqlanadigan markazlashtirilgan kesh menejeri.
+    Har bir yozuv o'z TTL'iga ega: bitta makonda turli muddatli qiymatlar bir-birini o'chirmaydi.
     """
 
     def __init__(self, config_manager: 'ConfigManager'):
         self._config = config_manager
         self._default_max_size: int = self._config.get("CACHE_DEFAULT_MAX_SIZE", 512)
         self._default_ttl: Optional[int] = self._config.get("CACHE_DEFAULT_TTL", 300)
-        self._stores: Dict[str, LRUCache | TTLCache] = {}
+        self._default_max_bytes: int = self._config.get("CACHE_DEFAULT_MAX_BYTES", 0) or 0
+        # Nomlar makoni bo'yicha chegaralar: {"ns": {"max_entries": N, "max_bytes": B}} + ixtiyoriy sizer
+        self._namespace_limits: Dict[str, Dict[str, Any]] = {
+            namespace: dict(limits) for namespace, limits in (self._config.get("CACHE_NAMESPACE_LIMITS") or {}).items()
+        }
+        self._stores: Dict[str, NamespaceStore] = {}
+        # (namespace, key) -> qiymatni hisoblayotgan yagona vazifa (single-flight)
+        self._inflight: Dict[Tuple[str, Hashable], "asyncio.Task[Any]"] = {}
         self._lock = asyncio.Lock()
         self._hits = 0
         self._misses = 0
         logger.info(f"CacheManager ishga tayyor. Standart hajm: {self._default_max_size}, TTL: {self._default_ttl}s")
 
-    async def _get_store(self, namespace: str, ttl: Optional[int] = -1) -> LRUCache | TTLCache:
-        async with self._lock:
-            current_store = self._stores.get(namespace)
-            effective_ttl = self._default_ttl if ttl == -1 else ttl
-
-            is_new_store = current_store is None
-            is_ttl_to_lru = isinstance(current_store, TTLCache) and effective_ttl is None
-            is_lru_to_ttl = isinstance(current_store, LRUCache) and effective_ttl is not None
-
-            if is_new_store or is_ttl_to_lru or is_lru_to_ttl:
-                if is_ttl_to_lru:
-                    logger.warning(f"'{namespace}' uchun kesh turi TTLCache'dan LRUCache'ga o'zgartirilmoqda.")
-                    self._stores[namespace] = LRUCache(maxsize=self._default_max_size)
-                elif is_lru_to_ttl:
-                    logger.warning(f"'{namespace}' uchun kesh turi LRUCache'dan TTLCache'ga o'zgartirilmoqda.")
-                    self._stores[namespace] = TTLCache(
-                        maxsize=self._default_max_size,
-                        ttl=float(effective_ttl if effective_ttl is not None else 300)
-                    )
-                else:
-                    if effective_ttl is not None:
-                        self._stores[namespace] = TTLCache(
-                            maxsize=self._default_max_size,
-                            ttl=float(effective_ttl)
-                        )
-                    else:
-                        self._stores[namespace] = LRUCache(maxsize=self._default_max_size)
-            
-            elif isinstance(current_store, TTLCache) and effective_ttl is not None and current_store.ttl != effective_ttl:
-                self._stores[namespace] = TTLCache(maxsize=self._default_max_size, ttl=effective_ttl)
-
-            return self._stores[namespace]
+    def _get_store(self, namespace: str) -> NamespaceStore:
+        """
+        Nomlar makonini qaytaradi (kerak bo'lsa yaratadi).
+        Sinxron: event loop bitta oqimda ishlaydi, shuning uchun await'siz bo'lim o'z-o'zidan atomar.
+        """
+        store = self._stores.get(namespace)
+        if store is None:
+            store = self._stores[namespace] = self._new_store(namespace)
+        return store
 
-    async def get(self, key: Hashable, namespace: str = "default", default: Any = None) -> Optional[VT]:
-        if namespace not in self._stores:
-            self._misses += 1
-            return default
-        store = await self._get_store(namespace)
-        async with self._lock:
-            value = store.get(key)
-            if value is not None:
-                self._hits += 1
-                return cast(VT, value)
+    def _new_store(self, namespace: str, items: Optional[List[Tuple[Hashable, _Entry]]] = None) -> NamespaceStore:
+        limits = self._namespace_limits.get(namespace, {})
+        store = NamespaceStore(
+            max_entries=limits.get("max_entries") or self._default_max_size,
+            max_bytes=limits.get("max_bytes", self._default_max_bytes) or 0,
+            sizer=limits.get("sizer"),
+        )
+        for key, entry in items or ():
+            self._put(store, key, entry)
+        return store
+
+    @staticmethod
+    def _put(store: NamespaceStore, key: Hashable, entry: _Entry) -> None:
+        try:
+            store[key] = entry
+        except KeyError:
+            # Muddati allaqachon tugagan (ttl <= 0) yangi yozuv: saqlanmaydi
+            pass
+        except ValueError:
+            # Bitta qiymat makonning bayt chegarasidan katta: keshlanmaydi
+            store.rejected += 1
+            store.pop(key, None)
+
+    def configure_namespace(
+        self,
+        namespace: str,
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizer: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        """
+        Nomlar makoni chegaralarini o'rnatadi (None - standart qiymat). Makon mavjud bo'lsa,
+        yozuvlar yangi chegaralar bilan qayta joylanadi (sig'maganlari LRU tartibida chiqariladi).
+        """
+        limits = {"max_entries": max_entries, "max_bytes": max_bytes if max_bytes is not None else self._default_max_bytes}
+        if sizer is not None:
+            limits["sizer"] = sizer
+        self._namespace_limits[namespace] = limits
+        if (store := self._stores.get(namespace)) is not None:
+            self._stores[namespace] = self._new_store(namespace, _store_items(store))
+
+    # get/set/delete/exists ichida await yo'q: umumiy qulfsiz, bir-birini kutmasdan bajariladi.
+    # Qulf faqat diskka saqlash/yuklash snapshot'lari uchun.
+    def _lookup(self, key: Hashable, namespace: str, allow_stale: bool = False) -> Optional[_Entry]:
+        store = self._stores.get(namespace)
+        entry = store.get(key) if store is not None else None
+        hit = entry is not None and entry.value is not None and (allow_stale or not entry.stale)
+        if hit:
+            self._hits += 1
+        else:
             self._misses += 1
-            return default
-            
-    async def set(self, key: Hashable, value: VT, namespace: str = "default", ttl: Optional[int] = -1) -> None:
-        store = await self._get_store(namespace, ttl)
-        async with self._lock:
-            store[key] = value
-            
+        if store is not None:
+            if hit:
+                store.hits += 1
+            else:
+                store.misses += 1
+        return entry if hit else None
+
+    async def get(self, key: Hashable, namespace: str = "default", default: Any = None) -> Optional[VT]:
+        entry = self._lookup(key, namespace)
+        return cast(VT, entry.value) if entry is not None else default
+
+    async def set(
+        self, key: Hashable, value: VT, namespace: str = "default", ttl: Optional[int] = -1, stale_ttl: Optional[int] = None
+    ) -> None:
+        """
+        `ttl` faqat shu yozuvga tegishli: -1 standart TTL, None muddatsiz (faqat LRU bo'yicha chiqariladi).
+        `stale_ttl` berilsa, yozuv `ttl` dan keyin yana shuncha soniya eskirgan holda saqlanadi
+        (`get` uni ko'rmaydi, `get_or_compute` esa fonda yangilash paytida beradi).
+        """
+        effective_ttl = self._default_ttl if ttl == -1 else ttl
+        now = time.time()
+        if effective_ttl is None:
+            entry = _Entry(value, None)
+        elif stale_ttl:
+            entry = _Entry(value, now + effective_ttl + stale_ttl, now + effective_ttl)
+        else:
+            entry = _Entry(value, now + effective_ttl)
+        self._put(self._get_store(namespace), key, entry)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[VT]],
+        namespace: str = "default",
+        ttl: Optional[int] = -1,
+        stale_ttl: Optional[int] = None,
+        condition: Optional[Callable[[Any], bool]] = None,
+    ) -> VT:
+        """
+        Keshdagi qiymatni qaytaradi, bo'lmasa `compute()` natijasini saqlab qaytaradi.
+        Bir kalit uchun parallel o'tkazib yuborishlar bitta hisoblashni kutadi (single-flight);
+        hisoblash alohida vazifada bajariladi, shuning uchun kutayotganlardan biri bekor qilinsa ham
+        qolganlari natijani oladi. `stale_ttl` bilan eskirgan qiymat darhol qaytariladi va bitta fon
+        yangilanishi ishga tushadi. `condition` natijani keshlash kerakligini aniqlaydi.
+        """
+        store = self._get_store(namespace)  # o'tkazib yuborishlar ham makon statistikasiga tushsin
+        entry = self._lookup(key, namespace, allow_stale=stale_ttl is not None)
+        if entry is not None:
+            if entry.stale:
+                store.stale_hits += 1
+                if (namespace, key) not in self._inflight:
+                    store.refreshes += 1
+                    self._start_flight(key, compute, namespace, ttl, stale_ttl, condition)
+            return cast(VT, entry.value)
+
+        task = self._inflight.get((namespace, key))
+        if task is not None:
+            store.coalesced += 1
+        else:
+            task = self._start_flight(key, compute, namespace, ttl, stale_ttl, condition)
+        return await asyncio.shield(task)
+
+    def _start_flight(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[VT]],
+        namespace: str,
+        ttl: Optional[int],
+        stale_ttl: Optional[int],
+        condition: Optional[Callable[[Any], bool]],
+    ) -> "asyncio.Task[VT]":
+        async def fill() -> VT:
+            result = await compute()
+            if condition is None or condition(result):
+                await self.set(key, result, namespace, ttl, stale_ttl=stale_ttl)
+            return result
+
+        flight_key = (namespace, key)
+        task = asyncio.ensure_future(fill())
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda t: self._finish_flight(flight_key, t))
+        return task
+
+    def _finish_flight(self, flight_key: Tuple[str, Hashable], task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        # Fon yangilanishi xatosini hech kim kutmasligi mumkin: "never retrieved" ogohlantirishisiz logga yoziladi
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.debug(f"Kesh qiymatini hisoblashda xato ('{flight_key[0]}'): {error!r}")
+
     async def delete(self, key: Hashable, namespace: str = "default") -> bool:
-        if namespace not in self._stores: return False
-        store = await self._get_store(namespace)
-        async with self._lock:
-            if key in store:
-                del store[key]
-                return True
+        store = self._stores.get(namespace)
+        if store is None or key not in store:
             return False
+        del store[key]
+        return True
 
     async def exists(self, key: Hashable, namespace: str = "default") -> bool:
-        if namespace not in self._stores: return False
-        store = await self._get_store(namespace)
-        async with self._lock:
-            return key in store
+        store = self._stores.get(namespace)
+        return store is not None and key in store
 
     async def clear_namespace(self, namespace: str) -> bool:
-        async with self._lock:
-            if namespace in self._stores:
-                del self._stores[namespace]
-                return True
-            return False
+        return self._stores.pop(namespace, None) is not None
 
     async def clear_all(self) -> None:
-        async with self._lock:
-            self._stores.clear()
-            self._hits = 0
-            self._misses = 0
+        self._stores.clear()
+        self._hits = 0
+        self._misses = 0
 
     async def load_from_disk(self) -> None:
         if not CACHE_FILE_PATH.exists():
@@ -123,16 +346,36 @@ class CacheManager(Generic[VT]):
             async with aiofiles.open(CACHE_FILE_PATH, 'rb') as f:
                 pickled_data = await f.read()
                 data = await asyncio.to_thread(pickle.loads, pickled_data)
+            stores = data.get('_stores', {})
+            # Yangi format: har bir nomlar makoni alohida pickle qilingan
+            stores = {ns: (await asyncio.to_thread(pickle.loads, store) if isinstance(store, bytes) else store) for ns, store in stores.items()}
+            # Do'konlar joriy chegaralar bilan qayta quriladi; eski formatdagi do'kon ham yozuvlar ro'yxatiga aylanadi
+            stores = {ns: self._new_store(ns, items if isinstance(items, list) else _store_items(items)) for ns, items in stores.items()}
             async with self._lock:
-                self._stores = data.get('_stores', {})
+                self._stores = stores
         except Exception as e:
             logger.error(f"Keshni diskdan yuklashda xatolik: {e}", exc_info=True)
             await self.clear_all()
 
+    async def _snapshot(self) -> Dict[str, bytes]:
+        """
+        Har bir nomlar makonini event loop'da (await'siz, ya'ni o'zgarmas holatda) alohida pickle qiladi.
+        Oqimda butun lug'atni pickle qilish parallel yozuvlar bilan to'qnashardi.
+        """
+        snapshot: Dict[str, bytes] = {}
+        for namespace, store in list(self._stores.items()):
+            try:
+                snapshot[namespace] = pickle.dumps(_store_items(store))
+            except Exception as e:
+                logger.debug(f"'{namespace}' kesh makoni diskka saqlanmadi (pickle qilib bo'lmadi): {e}")
+            await asyncio.sleep(0)
+        return snapshot
+
     async def save_to_disk(self) -> None:
         CACHE_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
         try:
-            data_to_save = {'_stores': self._stores, '_hits': self._hits, '_misses': self._misses}
+            async with self._lock:
+                data_to_save = {'_stores': await self._snapshot(), '_hits': self._hits, '_misses': self._misses}
             pickled_data = await asyncio.to_thread(pickle.dumps, data_to_save)
             async with aiofiles.open(CACHE_FILE_PATH, 'wb') as f:
                 await f.write(pickled_data)
@@ -150,8 +393,13 @@ class CacheManager(Generic[VT]):
         ttl: Optional[int] = -1,
         namespace: str = "default",
         condition: Optional[Callable[[Any], bool]] = None,
-        cache_key_fn: Optional[Callable[..., Hashable]] = None
+        cache_key_fn: Optional[Callable[..., Hashable]] = None,
+        stale_ttl: Optional[int] = None,
     ) -> Callable[[Callable[..., Coroutine[Any, Any, Any]]], Callable[..., Coroutine[Any, Any, Any]]]:
+        """
+        Korutina natijasini keshlaydi (`get_or_compute` orqali): parallel chaqiruvlar bitta
+        hisoblashni kutadi, `stale_ttl` berilsa eskirgan qiymat fonda yangilanadi.
+        """
         def decorator(func: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
             @wraps(func)
             async def wrapper(*args: Any, **kwargs: Any) -> Any:
@@ -162,19 +410,22 @@ class CacheManager(Generic[VT]):
                     logger.warning(f"Kesh kalitini yaratishda TypeError: '{func.__name__}' funksiyasi hashlanmaydigan argumentlarga ega. Keshlanish bekor qilindi.")
                     return await func(*args, **kwargs)
 
-                cached_value = await self.get(key, namespace)
-                if cached_value is not None:
-                    return cached_value
-
-                result = await func(*args, **kwargs)
-
-                if condition is None or condition(result):
-                    await self.set(key, result, namespace, ttl)
-                return result
+                return await self.get_or_compute(
+                    key, lambda: func(*args, **kwargs), namespace, ttl, stale_ttl=stale_ttl, condition=condition
+                )
             return wrapper
         return decorator
 
     async def get_stats(self) -> Dict[str, Any]:
-        async with self._lock:
-            return {"total_hits": self._hits, "total_misses": self._misses}
+        """Umumiy va nomlar makoni bo'yicha: yozuvlar, taxminiy bayt, hit rate, chiqarilganlar, birlashtirilganlar."""
+        namespaces = {namespace: store.stats() for namespace, store in self._stores.items()}
+        return {
+            "total_hits": self._hits,
+            "total_misses": self._misses,
+            "total_bytes": sum(ns["bytes"] for ns in namespaces.values()),
+            "total_coalesced": sum(ns["coalesced"] for ns in namespaces.values()),
+            "total_stale_hits": sum(ns["stale_hits"] for ns in namespaces.values()),
+            "inflight": len(self._inflight),
+            "namespaces": namespaces,
+        }
 
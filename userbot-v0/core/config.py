@@ -7,7 +7,7 @@ from loguru import logger
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, SecretStr, ValidationError, field_validator, model_validator
 
-from .db_whitelists import DB_TABLE_WHITELIST, DB_COLUMN_WHITELIST
+from .db_whitelists import DB_TABLE_WHITELIST, DB_COLUMN_WHITELIST, DB_SHARDED_TABLES
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,6 +35,8 @@ class StaticSettings(BaseSettings):
     LOG_FILE_PATH: Path = BASE_DIR / "logs" / "userbot.log"
     DB_TABLE_WHITELIST: List[str] = Field(default_factory=lambda: DB_TABLE_WHITELIST)
     DB_COLUMN_WHITELIST: Dict[str, List[str]] = Field(default_factory=lambda: DB_COLUMN_WHITELIST)
+    DB_SHARD_BY_ACCOUNT: bool = False
+    DB_SHARDED_TABLES: Dict[str, Optional[str]] = Field(default_factory=lambda: DB_SHARDED_TABLES)
     GEMINI_API_KEY: Optional[SecretStr] = None
     YANDEX_API_KEY: Optional[SecretStr] = None
     YANDEX_FOLDER_ID: Optional[str] = None
@@ -50,7 +52,46 @@ class StaticSettings(BaseSettings):
     PERSIST_INTERVAL_SECONDS: int = 3600
     CACHE_DEFAULT_MAX_SIZE: int = 512
     CACHE_DEFAULT_TTL: int = 300
+    CACHE_DEFAULT_MAX_BYTES: int = 4 * 1024 * 1024
+    CACHE_NAMESPACE_LIMITS: Dict[str, Dict[str, int]] = Field(
+        default_factory=lambda: {"ai_chat_sessions": {"max_entries": 100, "max_bytes": 8 * 1024 * 1024}},
+        description="Nomlar makoni bo'yicha kesh chegaralari: max_entries va max_bytes (0 - cheksiz).",
+    )
     DB_CLEANUP_DAYS: int = 7
+    DB_CLEANUP_BATCH_SIZE: int = 500
+    DB_CLEANUP_BATCH_PAUSE_MS: int = 50
+    DB_TASK_LOG_RETENTION_DAYS: int = 3
+    DB_ROLLUP_HOURLY_RETENTION_DAYS: int = 30
+    DB_READ_POOL_SIZE: int = 2
+    DB_WRITE_BATCH_INTERVAL_MS: int = 250
+    DB_WRITE_BATCH_SIZE: int = 200
+    DB_WRITE_QUEUE_MAX: int = 5000
+    DB_BULK_CHUNK_ROWS: int = 5000
+    DB_BACKUP_PAGES_PER_STEP: int = 256
+    DB_BACKUP_STEP_SLEEP_MS: int = 50
+    DB_BACKUP_COMPRESS: bool = False
+    DB_BACKUP_KEEP: int = 10
+    DB_VACUUM_MIN_FREE_RATIO: float = 0.1
+    DB_VACUUM_SLICE_PAGES: int = 256
+    DB_VACUUM_IDLE_SECONDS: int = 5
+    DB_VACUUM_MAX_SECONDS: int = 60
+    DB_WAL_CHECK_INTERVAL_SECONDS: int = 30
+    DB_WAL_BUDGET_MB: int = 64
+    DB_WAL_IDLE_SECONDS: int = 5
+    DB_WAL_CHECKPOINT_BUSY_MS: int = 1000
+    DB_STATS_CACHE_SECONDS: int = 300
+    DB_ANALYSIS_LIMIT: int = 1000
+    DB_QUERY_TIMEOUT_SECONDS: int = 15
+    DB_QUERY_MAX_STEPS: int = 100_000_000
+    DB_QUERY_MAX_ROWS: int = 100_000
+    DB_EXPORT_CHUNK_ROWS: int = 1000
+    DB_SLOW_QUERY_MS: int = 200
+    DB_SLOWLOG_SIZE: int = 50
+    DB_PROFILE_SAMPLES: int = 512
+    DB_SEARCH_INDEX_BATCH_SIZE: int = 500
+    DB_MESSAGE_JOURNAL_RETENTION_DAYS: int = 30
+    DB_ARCHIVE_ENABLED: bool = True
+    DB_ARCHIVE_KEEP_MONTHS: int = 12
     AI_CHAT_TTL_SECONDS: int = 3600
     RAG_SEARCH_RESULTS_COUNT: int = 5
     RAG_SEARCH_LANG: str = "uz"
@@ -1,9 +1,11 @@
 import asyncio
+import sqlite3
 from datetime import datetime
 import time
 from contextlib import asynccontextmanager
+from itertools import groupby
 from pathlib import Path
-from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, TypeVar, ParamSpec, AsyncGenerator, Hashable, TYPE_CHECKING
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Optional, Set, Tuple, TypeVar, ParamSpec, AsyncGenerator, Hashable, TYPE_CHECKING
 from functools import wraps
 
 import aiosqlite
@@ -16,19 +18,54 @@ if TYPE_CHECKING:
 
 
 from .exceptions import DatabaseError, DBConnectionError, QueryError
+from .db_whitelists import DB_SHARDED_TABLES
+from .query_profiler import QueryProfiler
+from .wal_manager import WAL_CHECKPOINT_MODES, WalManager
 from .db_utils import (
     _validate_table_name_util,
     _validate_column_names_util,
     _get_db_stats_util,
+    _get_table_stats_util,
     _run_migrations_util,
+    _schema_fingerprint_util,
     _run_initial_data_script_util,
-    _create_backup_util
+    _create_backup_util,
+    _create_online_backup_util,
+    _prune_backups_util,
+    _extract_read_tables_util,
+    _extract_write_tables_util,
+    _extract_view_ddl_util,
+    _shard_param_index_util,
+    _build_bulk_insert_sql_util,
+    _record_type_util,
+    _row_factory_util,
+    ROW_MODES,
 )
 
 
 P = ParamSpec("P")
 R = TypeVar("R")
 
+# Bitta so'rovdagi `?` parametrlari chegarasi (SQLITE_MAX_VARIABLE_NUMBER; 3.32.0 dan oldin 999)
+_SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+# Ko'p qatorli INSERT dagi qatorlar soni: juda uzun so'rovlarni kompilyatsiya qilish ham qimmat
+_BULK_ROWS_PER_STATEMENT = 100
+
+
+_AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+# Yozuvchi ulanishning odatdagi busy_timeout qiymati (aiosqlite.connect(timeout=10))
+_WRITER_BUSY_TIMEOUT_MS = 10000
+# Sozlamalar jadvalini yuklash davomida yozuv tushsa, shuncha martagacha darhol qayta yuklanadi
+_SETTINGS_LOAD_ATTEMPTS = 3
+
+
+def _int_setting(value: Any, default: int) -> int:
+    """Sozlama qiymatini butun songa o'giradi, noto'g'ri bo'lsa standart qiymatni qaytaradi."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
 
 def retry_on_lock(retries: int = 5, delay: float = 0.2) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
     def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
@@ -43,6 +80,10 @@ def retry_on_lock(retries: int = 5, delay: float = 0.2) -> Callable[[Callable[P,
                     error_message = str(e).lower()
                     if "locked" in error_message or "busy" in error_message:
                         if attempt < retries - 1:
+                            profiler = getattr(args[0], "_profiler", None) if args else None
+                            sql = args[1] if len(args) > 1 else kwargs.get("sql")
+                            if isinstance(profiler, QueryProfiler) and isinstance(sql, str):
+                                profiler.record_lock_retry(sql)
                             logger.warning(f"DB bloklandi ({error_message}). {delay:.2f} soniyadan so'ng qayta urinish ({attempt + 1}/{retries})...")
                             await asyncio.sleep(delay + (attempt * delay))
                         else:
@@ -51,6 +92,9 @@ def retry_on_lock(retries: int = 5, delay: float = 0.2) -> Callable[[Callable[P,
                     else:
                         logger.error(f"DB da tuzatib bo'lmaydigan operatsion xatolik: {e}", exc_info=True) 
                         raise QueryError(f"Unhandled operational error: {e}") from e
+                except QueryError:
+                    # Shardga yo'naltirilgan so'rov o'z qayta urinishlarini allaqachon bajargan
+                    raise
                 except Exception as e:
                     last_exception = e
                     logger.error(f"So'rovni bajarishda kutilmagan xatolik: {e}", exc_info=True) 
@@ -63,21 +107,105 @@ class AsyncDatabase:
     """
     Asinxron ma'lumotlar bazasi (SQLite) bilan ishlash uchun interfeys.
     """
-    def __init__(self, config_manager: 'ConfigManager', cache_manager: 'CacheManager'):
+    def __init__(self, config_manager: 'ConfigManager', cache_manager: 'CacheManager', shard_account_id: Optional[int] = None):
         self.db_path: Optional[Path] = None
         self.backup_dir = BASE_DIR / "data" / "backups" 
+        self.archive_dir = BASE_DIR / "data" / "archive"
         self.migrations_path = BASE_DIR / "data" / "migrations" 
         self.initial_data_path = BASE_DIR / "data" / "initial_data.sql" 
         self._conn: Optional[aiosqlite.Connection] = None
         self._lock = asyncio.Lock()
+
+        # Faqat o'qish uchun ulanishlar puli (WAL rejimida yozuvchini kutmaydi)
+        self._read_pool: Optional[asyncio.Queue[aiosqlite.Connection]] = None
+        self._read_conns: List[aiosqlite.Connection] = []
+        self._read_pool_stats: Dict[str, float] = {"acquisitions": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+        # Band o'qish ulanishlari: id(conn) -> olingan vaqt (monotonic); WAL starvation hisobotida ishlatiladi
+        self._active_reads: Dict[int, float] = {}
+
+        # Aniq tranzaksiya egasi: shu vazifaning o'qishlari yozuvchi ulanishda bajariladi
+        self._tx_lock = asyncio.Lock()
+        self._tx_owner: Optional[asyncio.Task] = None
         
         self._table_whitelist: Optional[List[str]] = None
         self._column_whitelist: Dict[str, List[str]] = {}
         self._config_manager = config_manager 
         self._cache_manager = cache_manager 
 
+        # db_queries keshi uchun jadval versiyalari: yozuv jadval versiyasini oshiradi va
+        # shu jadvalni o'qigan kesh kalitlari eskiradi. Epoch diskdan tiklangan keshni chetlatadi.
+        self._cache_epoch = time.time_ns()
+        self._table_versions: Dict[str, int] = {}
+        self._global_cache_version = 0
+        # O'qiydigan jadvallari aniqlanmagan so'rovlar (WITH, subselect, view) uchun umumiy versiya:
+        # har qanday yozuvda oshadi, shunda bunday natija hech qachon eskirgan holda qolmaydi
+        self._any_write_version = 0
+        self._view_names: Set[str] = set()
+        # Tranzaksiya ichida yozilgan jadvallar (None - noma'lum, global versiya): versiyalar faqat
+        # commit'dan keyin oshiriladi, aks holda parallel o'qish commit'dan oldingi ma'lumotni yangi kalitga yozadi
+        self._cache_pending: Optional[Set[str]] = set()
+
+        # Kechiktirilgan yozuvlar navbati (enqueue_write): bitta tranzaksiyada to'plab yoziladi
+        self._write_buffer: List[Tuple[str, Tuple]] = []
+        self._write_space = asyncio.Condition()
+        self._write_flush_event = asyncio.Event()
+        self._write_flush_lock = asyncio.Lock()
+        self._write_flusher: Optional[asyncio.Task] = None
+        self._write_queue_stats: Dict[str, int] = {"enqueued": 0, "flushed": 0, "batches": 0, "failed": 0, "backpressure_waits": 0}
+
+        # So'rovlar profilchisi va sekin so'rovlar jurnali
+        self._profiler = QueryProfiler(
+            slow_threshold_ms=_int_setting(config_manager.get("DB_SLOW_QUERY_MS", 200), 200),
+            slowlog_size=_int_setting(config_manager.get("DB_SLOWLOG_SIZE", 50), 50),
+            samples_per_statement=_int_setting(config_manager.get("DB_PROFILE_SAMPLES", 512), 512),
+        )
+        self._profiler_tasks: Set[asyncio.Task] = set()
+
+        # Oxirgi yozuv vaqti (monotonic): incremental_vacuum faqat bo'sh paytda ishlaydi
+        self._last_write_at = 0.0
+
+        # Fon WAL checkpointeri (connect() da ishga tushadi, close() da to'xtaydi)
+        self._wal_manager = WalManager(
+            self,
+            check_interval=_int_setting(config_manager.get("DB_WAL_CHECK_INTERVAL_SECONDS", 30), 30),
+            budget_bytes=_int_setting(config_manager.get("DB_WAL_BUDGET_MB", 64), 64) * 1024 * 1024,
+            idle_seconds=_int_setting(config_manager.get("DB_WAL_IDLE_SECONDS", 5), 5),
+            busy_timeout_ms=_int_setting(config_manager.get("DB_WAL_CHECKPOINT_BUSY_MS", 1000), 1000),
+        )
+
         # YANGI QATOR: Tozalash konfiguratsiyalarini saqlash uchun lug'at
         self._cleanup_configurations: Dict[str, str] = {} 
+        self._cleanup_retention_days: Dict[str, int] = {}
+        self._archive_tables: Set[str] = set()
+
+        # Sozlamalar jadvallari (register_settings_table): to'liq xotirada, birlamchi kalit bo'yicha.
+        # Yozuv jadvalni (yoki kalitning birinchi ustuni bo'yicha bir qismini) "eskirgan" deb belgilaydi,
+        # keyingi o'qish faqat shu qismni qayta yuklaydi. Tranzaksiya ichidagi belgilar commit'dan keyin qo'llanadi.
+        self._settings_keys: Dict[str, Tuple[str, ...]] = {}
+        self._settings_rows: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+        self._settings_stale: Dict[str, Optional[Set[Any]]] = {}
+        self._settings_pending: Dict[str, Optional[Set[Any]]] = {}
+        # Jadval bo'yicha yozuvlar avlodi: yuklash davomida o'zgarsa, yuklangan natija eskirgan bo'lishi mumkin
+        self._settings_generation: Dict[str, int] = {}
+        self._settings_lock = asyncio.Lock()
+        self._settings_stats: Dict[str, int] = {"hits": 0, "loads": 0, "rows_loaded": 0}
+
+        # Akkaunt bo'yicha sharding (DB_SHARD_BY_ACCOUNT): DB_SHARDED_TABLES dagi plagin jadvallari
+        # har bir akkaunt uchun alohida faylda, asosiy jadvallar esa shu (asosiy) faylda saqlanadi.
+        self.shard_account_id = shard_account_id
+        self.shards_dir: Optional[Path] = None
+        self._sharding_enabled = False
+        self._sharded_tables: Dict[str, Optional[str]] = {}
+        self._shards: Dict[int, "AsyncDatabase"] = {}
+        self._shard_lock = asyncio.Lock()
+        self._shard_index_cache: Dict[str, Optional[int]] = {}
+
+        # Jadvallar statistikasi keshi (DB_STATS_CACHE_SECONDS): `.db stats` jonli trafik bilan raqobatlashmasin
+        self._table_stats_cache: Optional[Dict[str, Any]] = None
+        self._table_stats_lock = asyncio.Lock()
+
+        # insert_many/upsert_many: (jadval, ustunlar, conflict, qatorlar) -> tayyor so'rov (whitelist bir marta tekshiriladi)
+        self._bulk_sql_cache: Dict[Tuple, str] = {}
 
     def configure(self, db_path: Path, table_whitelist: Optional[List[str]] = None, column_whitelist: Optional[Dict[str, List[str]]] = None): 
         if self.db_path and self.db_path != db_path:
@@ -85,9 +213,16 @@ class AsyncDatabase:
         self.db_path = db_path
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         
+        self._bulk_sql_cache.clear()
         self._table_whitelist = table_whitelist if table_whitelist is not None else self._config_manager.get("DB_TABLE_WHITELIST")
         self._column_whitelist = column_whitelist if column_whitelist is not None else (self._config_manager.get("DB_COLUMN_WHITELIST") or {})
 
+        self.shards_dir = db_path.parent / "shards"
+        self._sharding_enabled = self.shard_account_id is None and bool(self._config_manager.get("DB_SHARD_BY_ACCOUNT", False))
+        self._sharded_tables = self._config_manager.get("DB_SHARDED_TABLES") or DB_SHARDED_TABLES
+        if self._sharding_enabled:
+            logger.info(f"Akkaunt bo'yicha sharding yoqilgan: {len(self._sharded_tables)} ta jadval '{self.shards_dir}' dagi fayllarga yo'naltiriladi.")
+
         logger.info(f"Database Manager (Professional v2) '{self.db_path}' uchun sozlandi.")
         
     async def connect(self) -> None:
@@ -101,11 +236,14 @@ class AsyncDatabase:
 
             try:
                 self.db_path.parent.mkdir(parents=True, exist_ok=True)
-                self._conn = await aiosqlite.connect(self.db_path, timeout=10)
+                # isolation_level=None: har bir yozuv darhol commit qilinadi, shunda o'qish
+                # pulidagi ulanishlar uni ko'radi. Ko'p qadamli yozuvlar `transaction()` orqali.
+                self._conn = await aiosqlite.connect(self.db_path, timeout=10, isolation_level=None)
                 self._conn.row_factory = aiosqlite.Row
 
                 await self._conn.executescript(
                     """
+                    PRAGMA auto_vacuum = INCREMENTAL;
                     PRAGMA journal_mode=WAL;
                     PRAGMA foreign_keys = ON;
                     PRAGMA synchronous = NORMAL;
@@ -113,22 +251,76 @@ class AsyncDatabase:
                     PRAGMA temp_store = MEMORY;
                     """
                 )
+                if self._wal_manager.budget_bytes:
+                    # RESTART/TRUNCATE dan keyingi birinchi yozuv WAL faylini shu hajmgacha qisqartiradi
+                    await self._conn.execute(f"PRAGMA journal_size_limit = {self._wal_manager.budget_bytes}")
                 await self._initialize_database()
+                async with self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'") as cursor:
+                    self._view_names = {row[0].lower() for row in await cursor.fetchall()}
+                await self._open_read_pool()
+                self._wal_manager.start()
                 logger.success("Ma'lumotlar bazasi muvaffaqiyatli ulandi va sozlandi.")
                 
             except aiosqlite.Error as e:
                 logger.critical(f"DB ulanishida yoki sozlashda xatolik yuz berdi: {e}", exc_info=True) 
+                await self._close_read_pool()
                 self._conn = None
                 raise DBConnectionError(e) from e
 
+    async def _open_read_pool(self) -> None:
+        """`DB_READ_POOL_SIZE` ta faqat o'qish uchun ulanish ochadi. 0 bo'lsa pul o'chiriladi."""
+        if not self.db_path:
+            return
+        pool_size = max(0, _int_setting(self._config_manager.get("DB_READ_POOL_SIZE", 2), 2))
+        if pool_size == 0:
+            logger.debug("O'qish puli o'chirilgan (DB_READ_POOL_SIZE=0). Barcha so'rovlar yozuvchi ulanishda bajariladi.")
+            return
+
+        read_uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        for _ in range(pool_size):
+            conn = await aiosqlite.connect(read_uri, uri=True, timeout=10)
+            conn.row_factory = aiosqlite.Row
+            await conn.executescript(
+                """
+                PRAGMA query_only = ON;
+                PRAGMA cache_size = -4000;
+                PRAGMA temp_store = MEMORY;
+                """
+            )
+            self._read_conns.append(conn)
+            pool.put_nowait(conn)
+        self._read_pool = pool
+        logger.debug(f"{pool_size} ta faqat o'qish uchun ulanish ochildi.")
+
+    async def _close_read_pool(self) -> None:
+        self._read_pool = None
+        conns, self._read_conns = self._read_conns, []
+        for conn in conns:
+            try:
+                await conn.close()
+            except aiosqlite.Error as e:
+                logger.debug(f"O'qish ulanishini yopishda xatolik: {e}")
+
 
     async def close(self) -> None:
+        shards, self._shards = list(self._shards.values()), {}
+        for shard in shards:
+            await shard.close()
+        await self._stop_write_flusher()
+        await self._wal_manager.stop()
+        self._settings_rows.clear()
+        self._settings_stale.clear()
+        self._settings_pending.clear()
+        for task in list(self._profiler_tasks):
+            task.cancel()
         async with self._lock:
             if self._conn:
                 try:
                     await self._conn.executescript("PRAGMA wal_checkpoint(TRUNCATE);")
                 except aiosqlite.Error as e:
                     logger.warning(f"WAL checkpointni bajarishda xatolik: {e}")
+                await self._close_read_pool()
                 await self._conn.close()
                 self._conn = None
                 logger.info("Ma'lumotlar bazasi bilan ulanish yopildi.")
@@ -146,96 +338,581 @@ class AsyncDatabase:
         return self._conn
 
 
+    @property
+    def sharding_enabled(self) -> bool:
+        return self._sharding_enabled
+
+    def _shard_path(self, account_id: int) -> Path:
+        if not self.shards_dir:
+            raise DBConnectionError("Ma'lumotlar bazasi yo'li sozlanmagan. Dastlab `db.configure()` metodini chaqiring.")
+        return self.shards_dir / f"account_{account_id}.db"
+
+    async def shard_for(self, account_id: int) -> "AsyncDatabase":
+        """
+        Akkauntning shard bazasini qaytaradi, kerak bo'lsa yaratib ulaydi. Shard to'liq `AsyncDatabase`:
+        o'z yozuvchi ulanishi, o'qish puli va yozuvlar navbatiga ega, shuning uchun turli akkauntlarning
+        yozuvlari bir-birini kutmaydi. Migratsiyalar shardda ham qo'llanadi; profilchi umumiy.
+        """
+        shard = self._shards.get(account_id)
+        if shard is not None:
+            return shard
+        async with self._shard_lock:
+            if (shard := self._shards.get(account_id)) is not None:
+                return shard
+            shard = AsyncDatabase(self._config_manager, self._cache_manager, shard_account_id=account_id)
+            shard.migrations_path = self.migrations_path
+            shard.initial_data_path = self.initial_data_path
+            shard.backup_dir = self.backup_dir / "shards"
+            shard._profiler = self._profiler
+            shard._settings_keys = dict(self._settings_keys)
+            shard.configure(self._shard_path(account_id), self._table_whitelist, self._column_whitelist)
+            await shard.connect()
+            self._shards[account_id] = shard
+            logger.info(f"Akkaunt {account_id} uchun shard bazasi ulandi: {shard.db_path}")
+            return shard
+
+    async def database_for(self, account_id: int) -> "AsyncDatabase":
+        """Akkaunt plagin ma'lumotlari turgan baza: sharding yoqilgan bo'lsa shard, aks holda shu baza."""
+        return await self.shard_for(account_id) if self._sharding_enabled else self
+
+    async def get_shards(self) -> List["AsyncDatabase"]:
+        """Diskdagi barcha shard fayllarini ulab, ro'yxatini qaytaradi (texnik xizmat vazifalari uchun)."""
+        if not self._sharding_enabled or not self.shards_dir or not self.shards_dir.is_dir():
+            return list(self._shards.values())
+        for path in sorted(self.shards_dir.glob("account_*.db")):
+            account_id = path.stem.removeprefix("account_")
+            if account_id.lstrip("-").isdigit():
+                await self.shard_for(int(account_id))
+        return list(self._shards.values())
+
+    async def all_databases(self) -> List["AsyncDatabase"]:
+        """Asosiy baza va (sharding yoqilgan bo'lsa) barcha shardlar."""
+        return [self, *await self.get_shards()]
+
+    def _shard_param_index(self, sql: str) -> Optional[int]:
+        if sql not in self._shard_index_cache:
+            if len(self._shard_index_cache) >= 4096:
+                self._shard_index_cache.clear()
+            self._shard_index_cache[sql] = _shard_param_index_util(sql, self._sharded_tables)
+        return self._shard_index_cache[sql]
+
+    def _shard_key(self, sql: str, params: Any) -> Optional[int]:
+        """So'rov parametrlaridan shard kalitini (account_id) oladi; yo'naltirib bo'lmasa None."""
+        index = self._shard_param_index(sql)
+        if index is None or not isinstance(params, (tuple, list)) or index >= len(params):
+            return None
+        try:
+            return int(params[index])
+        except (TypeError, ValueError):
+            return None
+
+    async def _route(self, sql: str, params: Any) -> "AsyncDatabase":
+        """
+        Sharding yoqilgan bo'lsa so'rovni akkaunt shardiga yo'naltiradi. Kaliti topilmagan so'rovlar
+        (masalan, barcha akkauntlar bo'yicha tozalash) chaqirilgan bazaning o'zida bajariladi.
+        Tranzaksiya bitta faylni qamraydi: shard ichidagi ko'p qadamli yozuvlar uchun
+        `(await db.database_for(account_id)).transaction()` ishlating.
+        """
+        if not self._sharding_enabled:
+            return self
+        account_id = self._shard_key(sql, params)
+        return self if account_id is None else await self.shard_for(account_id)
+
+    @staticmethod
+    def _is_plain_select(sql: str) -> bool:
+        return sql.lstrip().upper().startswith("SELECT")
+
+    @asynccontextmanager
+    async def _read_connection(self, sql: str) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """
+        Oddiy SELECT so'rovlari uchun o'qish pulidan ulanish beradi.
+        Pul o'chirilgan bo'lsa yoki joriy vazifa tranzaksiya ichida bo'lsa
+        (commit qilinmagan o'zgarishlarni ko'rishi uchun) yozuvchi ulanish qaytariladi.
+        """
+        writer = await self._get_connection()
+        pool = self._read_pool
+        if pool is None or self._tx_owner is asyncio.current_task() or not self._is_plain_select(sql):
+            yield writer
+            return
+
+        started = time.perf_counter()
+        conn = await pool.get()
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._read_pool_stats["acquisitions"] += 1
+        self._read_pool_stats["total_wait_ms"] += wait_ms
+        self._read_pool_stats["max_wait_ms"] = max(self._read_pool_stats["max_wait_ms"], wait_ms)
+        self._active_reads[id(conn)] = time.monotonic()
+        try:
+            yield conn
+        finally:
+            self._active_reads.pop(id(conn), None)
+            pool.put_nowait(conn)
+
+    def get_read_pool_stats(self) -> Dict[str, Any]:
+        """O'qish puli hajmi va ulanish kutish vaqtlari statistikasi."""
+        acquisitions = int(self._read_pool_stats["acquisitions"])
+        total_wait_ms = self._read_pool_stats["total_wait_ms"]
+        return {
+            "size": len(self._read_conns),
+            "available": self._read_pool.qsize() if self._read_pool else 0,
+            "acquisitions": acquisitions,
+            "total_wait_ms": round(total_wait_ms, 3),
+            "avg_wait_ms": round(total_wait_ms / acquisitions, 3) if acquisitions else 0.0,
+            "max_wait_ms": round(self._read_pool_stats["max_wait_ms"], 3),
+        }
+
+    def longest_active_read_seconds(self) -> float:
+        """Hozir o'qish pulidan olingan ulanishlarning eng uzoq ushlab turilganining davomiyligi (soniya)."""
+        if not self._active_reads:
+            return 0.0
+        return time.monotonic() - min(self._active_reads.values())
+
+    @asynccontextmanager
+    async def _writer_lock(self) -> AsyncGenerator[None, None]:
+        """
+        Autocommit yozuvlar uchun `_tx_lock`: boshqa vazifaning ochiq BEGIN'iga qo'shilib ketmasin
+        (aks holda o'sha tranzaksiya rollback bo'lsa bu yozuvlar ham yo'qoladi). Tranzaksiya egasi
+        o'z ichidagi yozuvlar uchun qulfni qayta olmaydi.
+        """
+        if self._tx_owner is not None and self._tx_owner is asyncio.current_task():
+            yield
+            return
+        async with self._tx_lock:
+            yield
+
     @asynccontextmanager
     async def transaction(self) -> AsyncGenerator[aiosqlite.Cursor, None]:
         conn = await self._get_connection()
-        try:
+        current_task = asyncio.current_task()
+        if self._tx_owner is not None and self._tx_owner is current_task:
+            # Ichma-ich tranzaksiya tashqi tranzaksiyaning bir qismi bo'ladi.
             async with conn.cursor() as cursor:
                 yield cursor
-            await conn.commit()
-        except Exception:
-            await conn.rollback()
-            logger.error("Tranzaksiya xatolik bilan yakunlandi va o'zgarishlar bekor qilindi.", exc_info=True)
-            raise
+            return
+
+        async with self._tx_lock:
+            self._tx_owner = current_task
+            try:
+                await conn.execute("BEGIN")
+                async with conn.cursor() as cursor:
+                    yield cursor
+                await conn.commit()
+                self._apply_pending_cache_invalidation()
+            except asyncio.CancelledError:
+                # Vazifa bekor qilinsa (masalan, timeout) ochiq BEGIN ulanishda qolib ketmasin
+                await conn.rollback()
+                self._global_cache_version += 1
+                raise
+            except Exception:
+                await conn.rollback()
+                # Tranzaksiya ichida keshlangan natijalar bekor qilingan ma'lumotni ko'rgan bo'lishi mumkin
+                self._global_cache_version += 1
+                logger.error("Tranzaksiya xatolik bilan yakunlandi va o'zgarishlar bekor qilindi.", exc_info=True)
+                raise
+            finally:
+                self._tx_owner = None
+                # Rollback bo'lsa yig'ilgan jadvallar tashlanadi (global versiya allaqachon oshirilgan)
+                self._cache_pending = set()
+                self._apply_pending_settings_marks()
+
+    def _query_cache_key(self, kind: str, sql: str, params: Tuple, tables: Optional[List[str]]) -> str:
+        """Kesh kalitiga so'rov o'qiydigan jadvallarning joriy versiyalarini qo'shadi."""
+        if tables is not None:
+            read_tables: Optional[List[str]] = sorted(t.lower() for t in tables)
+        else:
+            # View orqali o'qilgan asosiy jadvallar noma'lum: umumiy versiyaga o'tiladi
+            read_tables = _extract_read_tables_util(sql)
+            if read_tables is not None and self._view_names.intersection(read_tables):
+                read_tables = None
+        if read_tables is None:
+            versions = f"*={self._any_write_version}"
+        else:
+            versions = ",".join(f"{t}={self._table_versions.get(t, 0)}" for t in read_tables)
+        return f"{kind}:{sql}:{params}:{self._cache_epoch}.{self._global_cache_version}:{versions}"
+
+    def _invalidate_query_cache(self, sql: str) -> None:
+        """
+        Yozuv so'rovi o'zgartirgan jadvallarga bog'liq kesh yozuvlarini eskirtiradi.
+        Tranzaksiya ichida jadvallar yig'iladi va versiyalar commit'dan keyin oshiriladi.
+        """
+        tables = _extract_write_tables_util(sql)
+        view_ddl = _extract_view_ddl_util(sql)
+        if view_ddl:
+            created, view_name = view_ddl
+            if created:
+                self._view_names.add(view_name)
+            else:
+                self._view_names.discard(view_name)
+        if self._tx_owner is not None:
+            if tables is None or self._cache_pending is None:
+                self._cache_pending = None
+            else:
+                self._cache_pending.update(tables)
+            return
+        self._bump_cache_versions(tables)
+
+    def _bump_cache_versions(self, tables: Optional[Iterable[str]]) -> None:
+        if tables is None:
+            self._global_cache_version += 1
+            return
+        tables = list(tables)
+        if tables:
+            self._any_write_version += 1
+        for table in tables:
+            self._table_versions[table] = self._table_versions.get(table, 0) + 1
+
+    def _apply_pending_cache_invalidation(self) -> None:
+        pending, self._cache_pending = self._cache_pending, set()
+        self._bump_cache_versions(pending)
+
+    def _query_cache_enabled(self, use_cache: bool) -> bool:
+        # Tranzaksiya egasi commit qilinmagan ma'lumotni ko'radi: uni keshdan o'qish ham, keshga yozish ham mumkin emas
+        return use_cache and (self._tx_owner is None or self._tx_owner is not asyncio.current_task())
+
+    def _observe_query(self, sql: str, params: Any, started: float, rows: int) -> None:
+        """So'rov vaqtini profilchiga yozadi; sekin so'rov uchun EXPLAIN QUERY PLAN fonda olinadi."""
+        duration_ms = (time.perf_counter() - started) * 1000
+        self._profiler.record(sql, duration_ms, rows)
+        if not self._profiler.is_slow(duration_ms) or sql.lstrip().upper().startswith("EXPLAIN"):
+            return
+        logger.warning(f"🐢 Sekin so'rov ({duration_ms:.1f} ms): {sql.strip()[:200]}")
+        entry = self._profiler.add_slow_query(sql, params, duration_ms)
+        task = asyncio.create_task(self._explain_slow_query(entry, sql, params))
+        self._profiler_tasks.add(task)
+        task.add_done_callback(self._profiler_tasks.discard)
+
+    async def _explain_slow_query(self, entry: Dict[str, Any], sql: str, params: Any) -> None:
+        try:
+            plan = await self.fetchall(f"EXPLAIN QUERY PLAN {sql}", tuple(params) if isinstance(params, (list, tuple)) else ())
+            entry["plan"] = [row.get("detail", "") for row in plan]
+        except Exception as e:
+            entry["plan"] = [f"EXPLAIN bajarilmadi: {e}"]
+
+    def get_query_profile(self, sort_by: str = "total_ms", limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        """Normallashtirilgan so'rovlar bo'yicha statistika (son, p50/p95/p99, qatorlar, lock qayta urinishlari)."""
+        return self._profiler.get_profile(sort_by=sort_by, limit=limit)
+
+    def get_query_profile_summary(self) -> Dict[str, Any]:
+        return self._profiler.get_summary()
+
+    def get_slow_queries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """`DB_SLOW_QUERY_MS` dan sekin so'rovlar jurnali, eng yangisi birinchi."""
+        return self._profiler.get_slowlog(limit=limit)
+
+    def clear_slow_queries(self) -> None:
+        self._profiler.clear_slowlog()
+
+    def reset_query_profile(self, slowlog: bool = True) -> None:
+        self._profiler.reset(slowlog=slowlog)
 
     @retry_on_lock()
     async def execute(self, sql: str, params: Tuple = ()) -> int:
+        if (target := await self._route(sql, params)) is not self:
+            return await target.execute(sql, params)
         logger.trace(f"EXECUTE SQL: {sql} | PARAMS: {params}")
         conn = await self._get_connection()
-        async with conn.execute(sql, params) as cursor:
-            return cursor.rowcount
+        async with self._writer_lock():
+            started = time.perf_counter()
+            async with conn.execute(sql, params) as cursor:
+                self._invalidate_query_cache(sql)
+                self._mark_settings_stale(sql, (params,))
+                self._last_write_at = time.monotonic()
+                self._observe_query(sql, params, started, cursor.rowcount)
+                return cursor.rowcount
 
-    @retry_on_lock()
     async def executemany(self, sql: str, params: List[Tuple]) -> int:
+        if self._sharding_enabled and self._shard_param_index(sql) is not None:
+            # Parametrlar to'plami akkauntlar bo'yicha guruhlanib, har biri o'z shardida bajariladi
+            groups: Dict[Optional[int], List[Tuple]] = {}
+            for item in params:
+                groups.setdefault(self._shard_key(sql, item), []).append(item)
+            total = 0
+            for account_id, items in groups.items():
+                target = self if account_id is None else await self.shard_for(account_id)
+                total += await target._executemany_local(sql, items)
+            return total
+        return await self._executemany_local(sql, params)
+
+    @retry_on_lock()
+    async def _executemany_local(self, sql: str, params: List[Tuple]) -> int:
         logger.trace(f"EXECUTEMANY SQL: {sql} | PARAMS_COUNT: {len(params)}")
         conn = await self._get_connection()
-        async with conn.executemany(sql, params) as cursor:
-            return cursor.rowcount
+        async with self._writer_lock():
+            started = time.perf_counter()
+            async with conn.executemany(sql, params) as cursor:
+                self._invalidate_query_cache(sql)
+                self._mark_settings_stale(sql, params)
+                self._last_write_at = time.monotonic()
+                self._observe_query(sql, params[0] if params else (), started, cursor.rowcount)
+                return cursor.rowcount
 
     @retry_on_lock()
     async def execute_insert(self, sql: str, params: Tuple = ()) -> Optional[int]:
+        if (target := await self._route(sql, params)) is not self:
+            return await target.execute_insert(sql, params)
         logger.trace(f"INSERT SQL: {sql} | PARAMS: {params}")
         conn = await self._get_connection()
-        async with conn.execute(sql, params) as cursor:
-            return cursor.lastrowid
+        async with self._writer_lock():
+            started = time.perf_counter()
+            async with conn.execute(sql, params) as cursor:
+                self._invalidate_query_cache(sql)
+                self._mark_settings_stale(sql, (params,))
+                self._last_write_at = time.monotonic()
+                self._observe_query(sql, params, started, cursor.rowcount)
+                return cursor.lastrowid
+
+
+    async def enqueue_write(self, sql: str, params: Tuple = ()) -> None:
+        """
+        Yozuvni navbatga qo'yadi. Navbat `DB_WRITE_BATCH_INTERVAL_MS` millisekundda yoki
+        `DB_WRITE_BATCH_SIZE` ta yozuv to'planganda bitta tranzaksiyada yoziladi.
+        Navbat `DB_WRITE_QUEUE_MAX` ga yetganda chaqiruvchi joy bo'shashini kutadi.
+        Sharding yoqilgan bo'lsa yozuv akkaunt shardining navbatiga tushadi.
+        """
+        if (target := await self._route(sql, params)) is not self:
+            return await target.enqueue_write(sql, params)
+        max_pending = max(1, _int_setting(self._config_manager.get("DB_WRITE_QUEUE_MAX", 5000), 5000))
+        batch_size = max(1, _int_setting(self._config_manager.get("DB_WRITE_BATCH_SIZE", 200), 200))
 
+        if len(self._write_buffer) >= max_pending:
+            self._write_queue_stats["backpressure_waits"] += 1
+            async with self._write_space:
+                while len(self._write_buffer) >= max_pending:
+                    self._write_flush_event.set()
+                    await self._write_space.wait()
+
+        self._write_buffer.append((sql, params))
+        self._write_queue_stats["enqueued"] += 1
+        if self._write_flusher is None or self._write_flusher.done():
+            self._write_flusher = asyncio.create_task(self._write_flusher_loop())
+        if len(self._write_buffer) >= batch_size:
+            self._write_flush_event.set()
+
+    async def _write_flusher_loop(self) -> None:
+        interval = max(1, _int_setting(self._config_manager.get("DB_WRITE_BATCH_INTERVAL_MS", 250), 250)) / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._write_flush_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._write_flush_event.clear()
+            try:
+                await self._flush_local_writes()
+            except Exception as e:
+                logger.error(f"Yozuvlar navbatini yozishda kutilmagan xatolik: {e}", exc_info=True)
+
+    async def _stop_write_flusher(self) -> None:
+        """Fon yozuvchisini to'xtatadi va navbatda qolgan yozuvlarni darhol yozadi."""
+        flusher, self._write_flusher = self._write_flusher, None
+        if flusher and not flusher.done():
+            flusher.cancel()
+            try:
+                await flusher
+            except asyncio.CancelledError:
+                pass
+        if self._write_buffer and self.is_connected():
+            await self._flush_local_writes()
+
+    async def flush_writes(self) -> int:
+        """
+        Navbatdagi barcha yozuvlarni bitta tranzaksiyada bajaradi (ochiq shardlarning navbatlari ham).
+        Muvaffaqiyatli yozilgan yozuvlar sonini qaytaradi (bajarilmaganlari `failed` statistikasida).
+        """
+        flushed = await self._flush_local_writes()
+        for shard in list(self._shards.values()):
+            flushed += await shard.flush_writes()
+        return flushed
+
+    async def _flush_local_writes(self) -> int:
+        async with self._write_flush_lock:
+            if not self._write_buffer:
+                return 0
+            batch, self._write_buffer = self._write_buffer, []
+            async with self._write_space:
+                self._write_space.notify_all()
+
+            failures = 0
+            try:
+                async with self.transaction():
+                    # Ketma-ket kelgan bir xil so'rovlar bitta executemany bilan bajariladi
+                    for sql, group in groupby(batch, key=lambda item: item[0]):
+                        await self._executemany_local(sql, [params for _, params in group])
+            except Exception as e:
+                logger.warning(f"{len(batch)} ta yozuvli paketni yozib bo'lmadi ({e}). Yozuvlar birma-bir qayta yozilmoqda...")
+                for sql, params in batch:
+                    try:
+                        await self.execute(sql, params)
+                    except Exception as item_error:
+                        failures += 1
+                        logger.error(f"Navbatdagi yozuv bajarilmadi: {item_error}. SQL: {sql}")
+
+            # Faqat muvaffaqiyatli bajarilgan yozuvlar "flushed" hisoblanadi
+            flushed = len(batch) - failures
+            self._write_queue_stats["flushed"] += flushed
+            self._write_queue_stats["failed"] += failures
+            self._write_queue_stats["batches"] += 1
+            return flushed
+
+    def get_write_queue_stats(self) -> Dict[str, Any]:
+        """Kechiktirilgan yozuvlar navbati statistikasi."""
+        return {"pending": len(self._write_buffer), **self._write_queue_stats}
 
     @retry_on_lock()
-    async def fetchone(self, sql: str, params: Tuple = (), *, use_cache: bool = False) -> Optional[Dict[str, Any]]:
+    async def fetchone(self, sql: str, params: Tuple = (), *, use_cache: bool = False, tables: Optional[List[str]] = None, row_mode: str = "dict") -> Optional[Any]:
+        """
+        Bitta qatorni qaytaradi. `row_mode`: "dict" (standart), "tuple", "record" (ustun nomlari
+        bilan namedtuple, har bir natija shakli uchun klass keshlanadi) yoki "scalar" (birinchi ustun).
+        """
+        if (target := await self._route(sql, params)) is not self:
+            return await target.fetchone(sql, params, use_cache=use_cache, tables=tables, row_mode=row_mode)
         logger.trace(f"FETCHONE SQL: {sql} | PARAMS: {params}")
+        self._check_row_mode(row_mode)
         cache_key: Optional[str] = None 
+        use_cache = self._query_cache_enabled(use_cache)
 
         if use_cache:
-            cache_key = f"fetchone:{sql}:{params}"
+            cache_key = self._query_cache_key(self._row_mode_kind("fetchone", row_mode), sql, params, tables)
             cached_result = await self._cache_manager.get(cache_key, namespace="db_queries") 
             if cached_result is not None:
-                return cached_result
+                return self._rows_from_cache(cached_result, row_mode, single=True)
         
-        conn = await self._get_connection()
-        async with conn.execute(sql, params) as cursor:
-            row = await cursor.fetchone()
-            result = dict(row) if row else None
-            if use_cache and result and cache_key: 
-                await self._cache_manager.set(cache_key, result, namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
-            return result
+        started = time.perf_counter()
+        async with self._read_connection(sql) as conn:
+            async with conn.execute(sql, params) as cursor:
+                if row_mode != "dict":
+                    cursor.row_factory = _row_factory_util(row_mode, cursor.description)
+                row = await cursor.fetchone()
+            result = (dict(row) if row else None) if row_mode == "dict" else row
+        self._observe_query(sql, params, started, 1 if row else 0)
+        if use_cache and result and cache_key: 
+            await self._cache_manager.set(cache_key, self._rows_to_cache(result, row_mode, single=True), namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
+        return result
 
     @retry_on_lock()
-    async def fetchall(self, sql: str, params: Tuple = (), *, use_cache: bool = False) -> List[Dict[str, Any]]:
+    async def fetchall(self, sql: str, params: Tuple = (), *, use_cache: bool = False, tables: Optional[List[str]] = None, row_mode: str = "dict") -> List[Any]:
+        """
+        Barcha qatorlarni qaytaradi. `row_mode` "dict" dan boshqa bo'lsa qatorlar SQLite oqimida
+        darhol kerakli shaklda yasaladi: "tuple", "record" (namedtuple) yoki "scalar" (birinchi ustun ro'yxati).
+        """
+        if (target := await self._route(sql, params)) is not self:
+            return await target.fetchall(sql, params, use_cache=use_cache, tables=tables, row_mode=row_mode)
         logger.trace(f"FETCHALL SQL: {sql} | PARAMS: {params}")
+        self._check_row_mode(row_mode)
         cache_key: Optional[str] = None 
+        use_cache = self._query_cache_enabled(use_cache)
 
         if use_cache:
-            cache_key = f"fetchall:{sql}:{params}"
+            cache_key = self._query_cache_key(self._row_mode_kind("fetchall", row_mode), sql, params, tables)
             cached_result = await self._cache_manager.get(cache_key, namespace="db_queries") 
             if cached_result is not None:
-                return cached_result
+                return self._rows_from_cache(cached_result, row_mode)
         
-        conn = await self._get_connection()
-        async with conn.execute(sql, params) as cursor:
-            rows = await cursor.fetchall()
-            result = [dict(row) for row in rows]
-            if use_cache and result and cache_key: 
-                await self._cache_manager.set(cache_key, result, namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
+        started = time.perf_counter()
+        async with self._read_connection(sql) as conn:
+            async with conn.execute(sql, params) as cursor:
+                if row_mode != "dict":
+                    cursor.row_factory = _row_factory_util(row_mode, cursor.description)
+                rows = await cursor.fetchall()
+            result = [dict(row) for row in rows] if row_mode == "dict" else list(rows)
+        self._observe_query(sql, params, started, len(rows))
+        if use_cache and result and cache_key: 
+            await self._cache_manager.set(cache_key, self._rows_to_cache(result, row_mode), namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
+        return result
+
+    @staticmethod
+    def _check_row_mode(row_mode: str) -> None:
+        if row_mode not in ROW_MODES:
+            raise QueryError(f"Noma'lum qator rejimi: {row_mode}. Mumkin: {', '.join(ROW_MODES)}")
+
+    @staticmethod
+    def _row_mode_kind(kind: str, row_mode: str) -> str:
+        return kind if row_mode == "dict" else f"{kind}:{row_mode}"
+
+    @staticmethod
+    def _rows_to_cache(result: Any, row_mode: str, single: bool = False) -> Any:
+        # namedtuple klasslari dinamik: kesh diskka pickle qilinishi uchun maydonlar va oddiy tuple saqlanadi
+        if row_mode != "record":
             return result
+        rows = [result] if single else result
+        return {"fields": rows[0]._fields, "rows": [tuple(row) for row in rows]}
+
+    @staticmethod
+    def _rows_from_cache(cached: Any, row_mode: str, single: bool = False) -> Any:
+        if row_mode != "record":
+            return cached
+        record = _record_type_util(tuple(cached["fields"]))
+        rows = [record._make(row) for row in cached["rows"]]
+        return rows[0] if single else rows
 
     @retry_on_lock()
-    async def fetch_val(self, sql: str, params: Tuple = (), *, use_cache: bool = False) -> Optional[Any]:
+    async def fetch_val(self, sql: str, params: Tuple = (), *, use_cache: bool = False, tables: Optional[List[str]] = None) -> Optional[Any]:
+        if (target := await self._route(sql, params)) is not self:
+            return await target.fetch_val(sql, params, use_cache=use_cache, tables=tables)
         logger.trace(f"FETCH_VAL SQL: {sql} | PARAMS: {params}")
         cache_key: Optional[str] = None 
+        use_cache = self._query_cache_enabled(use_cache)
 
         if use_cache:
-            cache_key = f"fetchval:{sql}:{params}"
+            cache_key = self._query_cache_key("fetchval", sql, params, tables)
             cached_result = await self._cache_manager.get(cache_key, namespace="db_queries") 
             if cached_result is not None:
                 return cached_result
         
-        conn = await self._get_connection()
-        async with conn.execute(sql, params) as cursor:
-            row = await cursor.fetchone()
+        started = time.perf_counter()
+        async with self._read_connection(sql) as conn:
+            async with conn.execute(sql, params) as cursor:
+                row = await cursor.fetchone()
             result = row[0] if row else None
-            if use_cache and result is not None and cache_key: 
-                await self._cache_manager.set(cache_key, result, namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
-            return result
+        self._observe_query(sql, params, started, 1 if row else 0)
+        if use_cache and result is not None and cache_key: 
+            await self._cache_manager.set(cache_key, result, namespace="db_queries", ttl=self._config_manager.get("CACHE_DEFAULT_TTL")) 
+        return result
+
+    async def iterate(
+        self,
+        sql: str,
+        params: Tuple = (),
+        *,
+        chunk_size: int = 500,
+        as_tuples: bool = False,
+        chunks: bool = False,
+        row_mode: Optional[str] = None,
+    ) -> AsyncGenerator[Any, None]:
+        """
+        So'rov natijasini `fetchmany` orqali bo'laklab qaytaradigan asinxron generator.
+        Katta jadvallarni xotiraga to'liq yuklamasdan qayta ishlash uchun.
+
+        Args:
+            chunk_size (int): Bir martada o'qiladigan qatorlar soni.
+            as_tuples (bool): Qatorlarni lug'at o'rniga tuple sifatida qaytarish (`row_mode="tuple"` bilan bir xil).
+            chunks (bool): Qatorlarni birma-bir emas, `chunk_size` lik ro'yxatlar sifatida qaytarish.
+            row_mode (Optional[str]): "dict", "tuple", "record" yoki "scalar" (qarang: `fetchall`).
+
+        Erta to'xtatilganda ulanish darhol bo'shashi uchun `contextlib.aclosing` bilan ishlating.
+        """
+        if (target := await self._route(sql, params)) is not self:
+            async for item in target.iterate(sql, params, chunk_size=chunk_size, as_tuples=as_tuples, chunks=chunks, row_mode=row_mode):
+                yield item
+            return
+        logger.trace(f"ITERATE SQL: {sql} | PARAMS: {params} | CHUNK: {chunk_size}")
+        row_mode = row_mode or ("tuple" if as_tuples else "dict")
+        self._check_row_mode(row_mode)
+        try:
+            async with self._read_connection(sql) as conn:
+                async with conn.execute(sql, params) as cursor:
+                    if row_mode != "dict":
+                        cursor.row_factory = _row_factory_util(row_mode, cursor.description)
+                    while rows := await cursor.fetchmany(chunk_size):
+                        if row_mode == "dict":
+                            rows = [dict(row) for row in rows]
+                        if chunks:
+                            yield rows
+                        else:
+                            for row in rows:
+                                yield row
+        except aiosqlite.Error as e:
+            logger.error(f"So'rov natijasini o'qishda xatolik: {e}", exc_info=True)
+            raise QueryError(f"Iterate failed: {e}") from e
 
     def clear_cache(self):
         asyncio.create_task(self._cache_manager.clear_namespace("db_queries")) 
@@ -280,6 +957,73 @@ class AsyncDatabase:
         """
         return await self.execute_insert(sql, tuple(data.values()))
 
+    async def insert_many(self, table_name: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Ko'p qatorni partiyalab qo'shadi: whitelist va SQL har bir ustunlar to'plami uchun bir marta
+        tayyorlanadi, qatorlar ko'p qatorli `INSERT` larga (SQLite parametrlar chegarasida) bo'linadi
+        va har `DB_BULK_CHUNK_ROWS` qator bitta tranzaksiyada `executemany` bilan yoziladi.
+        Ta'sir qilgan qatorlar sonini qaytaradi.
+        """
+        return await self._write_many(table_name, rows, None)
+
+    async def upsert_many(self, table_name: str, rows: List[Dict[str, Any]], conflict_target: List[str]) -> int:
+        """`insert_many` ning `ON CONFLICT(...) DO UPDATE` varianti (`upsert` bilan bir xil semantika)."""
+        return await self._write_many(table_name, rows, tuple(conflict_target))
+
+    async def _write_many(self, table_name: str, rows: List[Dict[str, Any]], conflict_target: Optional[Tuple[str, ...]]) -> int:
+        # Ustunlari bir xil qatorlar bitta so'rov shakliga guruhlanadi
+        groups: Dict[Tuple[str, ...], List[Tuple]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+        total = 0
+        for columns, values in groups.items():
+            total += await self._write_many_group(table_name, columns, values, conflict_target)
+        return total
+
+    async def _write_many_group(self, table_name: str, columns: Tuple[str, ...], values: List[Tuple], conflict_target: Optional[Tuple[str, ...]]) -> int:
+        account_column = self._sharded_tables.get(table_name.lower()) if self._sharding_enabled else None
+        if account_column and account_column in columns:
+            # Qatorlar akkaunt shardlari bo'yicha taqsimlanadi
+            position = columns.index(account_column)
+            by_account: Dict[int, List[Tuple]] = {}
+            for row in values:
+                by_account.setdefault(int(row[position]), []).append(row)
+            total = 0
+            for account_id, account_rows in by_account.items():
+                shard = await self.shard_for(account_id)
+                total += await shard._write_many_group(table_name, columns, account_rows, conflict_target)
+            return total
+
+        chunk_rows = max(1, _int_setting(self._config_manager.get("DB_BULK_CHUNK_ROWS", 5000), 5000))
+        per_statement = max(1, min(_BULK_ROWS_PER_STATEMENT, _SQLITE_MAX_VARIABLES // len(columns), chunk_rows))
+        total = 0
+        for start in range(0, len(values), chunk_rows):
+            chunk = values[start:start + chunk_rows]
+            full = len(chunk) // per_statement * per_statement
+            async with self.transaction():
+                if full:
+                    sql = self._bulk_statement(table_name, columns, conflict_target, per_statement)
+                    params = [tuple(v for row in chunk[i:i + per_statement] for v in row) for i in range(0, full, per_statement)]
+                    total += await self._executemany_local(sql, params)
+                if full < len(chunk):
+                    # Qoldiq bir qatorli so'rov bilan yoziladi: keshda har xil uzunlikdagi so'rovlar ko'paymaydi
+                    sql = self._bulk_statement(table_name, columns, conflict_target, 1)
+                    total += await self._executemany_local(sql, chunk[full:])
+        return total
+
+    def _bulk_statement(self, table_name: str, columns: Tuple[str, ...], conflict_target: Optional[Tuple[str, ...]], rows_per_statement: int) -> str:
+        key = (table_name, columns, conflict_target, rows_per_statement)
+        sql = self._bulk_sql_cache.get(key)
+        if sql is None:
+            self._validate_table_name(table_name)
+            self._validate_column_names(table_name, list(columns))
+            if conflict_target is not None:
+                self._validate_column_names(table_name, list(conflict_target))
+            if len(self._bulk_sql_cache) >= 256:
+                self._bulk_sql_cache.clear()
+            sql = self._bulk_sql_cache[key] = _build_bulk_insert_sql_util(table_name, columns, rows_per_statement, conflict_target)
+        return sql
+
     async def vacuum(self):
         if not self.db_path:
             raise QueryError("VACUUM uchun ma'lumotlar bazasi yo'li topilmadi.")
@@ -293,6 +1037,8 @@ class AsyncDatabase:
         try:
             logger.debug("VACUUM uchun eksklyuziv ulanish ochilmoqda...")
             async with aiosqlite.connect(self.db_path) as temp_conn:
+                # Eski bazalar uchun migratsiya yo'li: auto_vacuum rejimi faqat VACUUM paytida o'zgaradi
+                await temp_conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
                 await temp_conn.execute("VACUUM")
                 await temp_conn.commit()
             logger.success("✅ VACUUM operatsiyasi muvaffaqiyatli yakunlandi.")
@@ -303,17 +1049,129 @@ class AsyncDatabase:
             if is_connected_before:
                 await self.connect()
 
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        """Sahifa va bo'sh sahifalar (freelist) statistikasi: qayta egallash foydali bo'lishini baholash uchun."""
+        auto_vacuum = await self.fetch_val("PRAGMA auto_vacuum")
+        page_size = await self.fetch_val("PRAGMA page_size") or 0
+        page_count = await self.fetch_val("PRAGMA page_count") or 0
+        freelist_count = await self.fetch_val("PRAGMA freelist_count") or 0
+        return {
+            "auto_vacuum": _AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "free_bytes": page_size * freelist_count,
+            "free_ratio": round(freelist_count / page_count, 4) if page_count else 0.0,
+        }
+
+    def seconds_since_last_write(self) -> float:
+        """Oxirgi `execute`/`executemany`/`execute_insert` dan beri o'tgan vaqt (soniya)."""
+        return time.monotonic() - self._last_write_at
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """
+        `PRAGMA incremental_vacuum(pages)` ni bajaradi va bo'shatilgan sahifalar sonini qaytaradi.
+        Faqat auto_vacuum=INCREMENTAL bo'lgan bazada ishlaydi; ulanish yopilmaydi.
+        """
+        if pages <= 0:
+            return 0
+        async with self._tx_lock:
+            conn = await self._get_connection()
+            before = await self.fetch_val("PRAGMA freelist_count") or 0
+            try:
+                # Pragma har bir qadamda bitta sahifa bo'shatadi; `execute` faqat bitta qadam
+                # bajaradi, executescript esa so'rovni oxirigacha yuritadi.
+                await conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            except aiosqlite.Error as e:
+                raise QueryError(f"Incremental vacuum failed: {e}") from e
+            after = await self.fetch_val("PRAGMA freelist_count") or 0
+        freed = max(before - after, 0)
+        logger.debug(f"incremental_vacuum({pages}): {freed} ta sahifa bo'shatildi, {after} ta qoldi.")
+        return freed
+
+    async def checkpoint(self, mode: str = "PASSIVE", busy_timeout_ms: Optional[int] = None) -> Tuple[int, int, int]:
+        """
+        `PRAGMA wal_checkpoint(mode)` ni bajaradi va (busy, WAL freymlari, ko'chirilgan freymlar) qaytaradi.
+        `busy_timeout_ms` berilsa RESTART/TRUNCATE o'quvchilarni shuncha kutadi, keyin busy bilan qaytadi.
+        """
+        mode = mode.upper()
+        if mode not in WAL_CHECKPOINT_MODES:
+            raise ValueError(f"Noma'lum checkpoint rejimi: {mode}. Mumkin: {', '.join(WAL_CHECKPOINT_MODES)}")
+        async with self._tx_lock:
+            conn = await self._get_connection()
+            try:
+                if busy_timeout_ms is not None:
+                    await conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+                async with conn.execute(f"PRAGMA wal_checkpoint({mode})") as cursor:
+                    row = await cursor.fetchone()
+            except aiosqlite.Error as e:
+                raise QueryError(f"WAL checkpoint failed: {e}") from e
+            finally:
+                if busy_timeout_ms is not None:
+                    await conn.execute(f"PRAGMA busy_timeout = {_WRITER_BUSY_TIMEOUT_MS}")
+        busy, log_frames, checkpointed = tuple(row)
+        return busy, log_frames, checkpointed
+
+    def get_wal_stats(self) -> Dict[str, Any]:
+        """WAL hajmi, byudjet, checkpoint'lar soni va starvation ko'rsatkichlari."""
+        return self._wal_manager.get_stats()
+
     async def _initialize_database(self):
         try:
+            # Tez yo'l: fayllar o'zgarmagan bo'lsa migratsiya/boshlang'ich ma'lumotlar tekshiruvi o'tkazib yuboriladi
+            fingerprint = _schema_fingerprint_util(self)
+            if await self.fetch_val("PRAGMA user_version") == fingerprint:
+                logger.info("Ma'lumotlar bazasi sxemasi o'zgarmagan (user_version mos). Migratsiyalar tekshiruvi o'tkazib yuborildi.")
+                return
+
             await _run_migrations_util(self)
             await _run_initial_data_script_util(self)
+            await self.execute(f"PRAGMA user_version = {fingerprint}")
             logger.success("Ma'lumotlar bazasi tayyor va barcha migratsiyalar qo'llanildi.")
         except Exception as e:
             logger.critical(f"Ma'lumotlar bazasini initsializatsiya qilishda halokatli xato: {e}", exc_info=True) 
             raise
 
-    async def db_stats(self) -> Dict[str, Any]:
-        return await _get_db_stats_util(self)
+    async def get_table_stats(self, exact: bool = False, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Jadvallar statistikasi (`_get_table_stats_util`), `DB_STATS_CACHE_SECONDS` davomida keshlanadi.
+        Keshdagi aniq natija taxminiy so'rovga ham beriladi; `exact=True` faqat aniq natijani qabul qiladi.
+        """
+        ttl = max(0, _int_setting(self._config_manager.get("DB_STATS_CACHE_SECONDS", 300), 300))
+        async with self._table_stats_lock:
+            cached = self._table_stats_cache
+            if (
+                not refresh and cached is not None
+                and time.time() - cached["collected_at"] < ttl
+                and (cached["exact"] or not exact)
+            ):
+                return {**cached, "cached": True}
+            result = await _get_table_stats_util(self, exact=exact)
+            self._table_stats_cache = result
+            return {**result, "cached": False}
+
+    async def analyze(self) -> None:
+        """
+        Qatorlar soni taxminlari (sqlite_stat1) va so'rov rejalashtiruvchisi uchun `ANALYZE`.
+        `analysis_limit` har bir indeksdan faqat namunani o'qiydi, katta bazada ham tez tugaydi.
+        """
+        limit = max(0, _int_setting(self._config_manager.get("DB_ANALYSIS_LIMIT", 1000), 1000))
+        async with self._tx_lock:
+            conn = await self._get_connection()
+            try:
+                await conn.executescript(f"PRAGMA analysis_limit = {limit}; ANALYZE;")
+            except aiosqlite.Error as e:
+                raise QueryError(f"ANALYZE failed: {e}") from e
+        self._table_stats_cache = None
+
+    async def db_stats(self, exact: bool = False) -> Dict[str, Any]:
+        stats = await _get_db_stats_util(self, exact=exact)
+        if self._sharding_enabled:
+            stats["shards"] = [
+                {"account_id": shard.shard_account_id, "file_size_bytes": shard.db_path.stat().st_size if shard.db_path and shard.db_path.exists() else 0}
+                for shard in await self.get_shards()
+            ]
+        return stats
 
     async def log_task_execution(self, task_key: str, duration_ms: float, status: str, details: Optional[str] = None, run_at: Optional[float] = None):
         """Vazifaning bajarilish natijasini DBga yozadi."""
@@ -323,15 +1181,40 @@ class AsyncDatabase:
         """
         try:
             execution_time = datetime.fromtimestamp(run_at) if run_at is not None else datetime.now()
-            await self.execute(sql, (task_key, duration_ms, status, details, execution_time))
+            await self.enqueue_write(sql, (task_key, duration_ms, status, details, execution_time))
         except Exception as e:
             logger.critical(f"Vazifa '{task_key}' uchun log yozishda KRITIK xatolik: {e}", exc_info=True)
 
 
 
 
-    async def create_backup(self) -> Path:
-        return await _create_backup_util(self)
+    async def create_backup(self, online: bool = False, compress: Optional[bool] = None) -> Path:
+        """
+        Zaxira nusxa yaratadi va `DB_BACKUP_KEEP` dan eski nusxalarni o'chiradi.
+
+        Args:
+            online (bool): True bo'lsa ulanish yopilmaydi, SQLite backup API bilan
+                bosqichma-bosqich (`DB_BACKUP_PAGES_PER_STEP`, `DB_BACKUP_STEP_SLEEP_MS`) nusxalanadi.
+            compress (Optional[bool]): Onlayn nusxani gzip bilan siqish. None bo'lsa `DB_BACKUP_COMPRESS`.
+        """
+        if online:
+            if compress is None:
+                compress = bool(self._config_manager.get("DB_BACKUP_COMPRESS", False))
+            await self.flush_writes()
+            backup_file = await _create_online_backup_util(
+                self,
+                pages=_int_setting(self._config_manager.get("DB_BACKUP_PAGES_PER_STEP", 256), 256),
+                sleep_ms=_int_setting(self._config_manager.get("DB_BACKUP_STEP_SLEEP_MS", 50), 50),
+                compress=compress,
+            )
+        else:
+            backup_file = await _create_backup_util(self)
+
+        _prune_backups_util(self, _int_setting(self._config_manager.get("DB_BACKUP_KEEP", 10), 10))
+        # Har bir shard o'z fayliga alohida zaxiralanadi (shards/ papkasida, saqlash limiti har biriga alohida)
+        for shard in await self.get_shards():
+            await shard.create_backup(online=online, compress=compress)
+        return backup_file
 
     async def get_log_text_settings(self, chat_id: int) -> Optional[Dict[str, Any]]:
         return await self.fetchone("SELECT * FROM text_log_settings WHERE chat_id = ?", (chat_id,))
@@ -340,17 +1223,28 @@ class AsyncDatabase:
         return await self.insert("text_log_ignored_users", {"user_id": user_id})
 
 
-    def register_cleanup_table(self, table_name: str, date_column: str): 
+    def register_cleanup_table(self, table_name: str, date_column: str, retention_days: Optional[int] = None, archive: bool = False): 
         """
         Vaqtinchalik ma'lumotlar bazasi jadvallarini tozalash uchun ro'yxatdan o'tkazadi.
         
         Args:
             table_name (str): Tozalanadigan jadval nomi.
             date_column (str): Jadvaldagi sanani saqlovchi ustun nomi (yozuv eski ekanligini aniqlash uchun).
+            retention_days (Optional[int]): Shu jadval uchun saqlash muddati. Berilmasa `DB_CLEANUP_DAYS` ishlatiladi.
+            archive (bool): True bo'lsa (va `DB_ARCHIVE_ENABLED` yoqilgan bo'lsa) eski qatorlar o'chirilmaydi,
+                oylik arxiv fayllariga ko'chiriladi.
         """
         if table_name in self._cleanup_configurations:
             logger.warning(f"Jadval '{table_name}' allaqachon tozalash uchun ro'yxatdan o'tgan. Ustuni yangilanmoqda.")
         self._cleanup_configurations[table_name] = date_column
+        if retention_days is not None:
+            self._cleanup_retention_days[table_name] = retention_days
+        else:
+            self._cleanup_retention_days.pop(table_name, None)
+        if archive:
+            self._archive_tables.add(table_name)
+        else:
+            self._archive_tables.discard(table_name)
         logger.debug(f"Jadval '{table_name}' ({date_column} ustuni bilan) tozalash uchun ro'yxatdan o'tkazildi.")
 
     def get_cleanup_configurations(self) -> Dict[str, str]:
@@ -361,6 +1255,124 @@ class AsyncDatabase:
             Dict[str, str]: Jadval nomlari va ularning sana ustunlari xaritasi.
         """
         return self._cleanup_configurations.copy() # Xavfsiz nusxasini qaytarish
+
+    def get_cleanup_retention_days(self, table_name: str) -> Optional[int]:
+        """Jadval uchun alohida belgilangan saqlash muddati (kun) yoki None."""
+        return self._cleanup_retention_days.get(table_name)
+
+    def get_archive_tables(self) -> Set[str]:
+        """Eski qatorlari o'chirish o'rniga arxivga ko'chiriladigan jadvallar."""
+        return set(self._archive_tables)
+
+    def register_settings_table(self, table_name: str, key_columns: List[str]) -> None:
+        """
+        Kichik sozlamalar jadvalini xotirada saqlanadigan jadval sifatida ro'yxatdan o'tkazadi.
+        Jadval birinchi o'qishda to'liq yuklanadi va `key_columns` (birlamchi kalit) bo'yicha
+        `get_settings_row` orqali diskka murojaatsiz o'qiladi. Shu baza orqali qilingan yozuvlar
+        keshni yangilaydi; kalitning birinchi ustuni (odatda account_id) so'rovdan aniqlansa,
+        faqat o'sha qism qayta yuklanadi.
+        """
+        if not key_columns:
+            raise ValueError("Sozlamalar jadvali uchun kamida bitta kalit ustuni kerak.")
+        self._settings_keys[table_name.lower()] = tuple(key_columns)
+        self._settings_rows.pop(table_name.lower(), None)
+        for shard in self._shards.values():
+            shard.register_settings_table(table_name, key_columns)
+        logger.debug(f"Jadval '{table_name}' ({', '.join(key_columns)} kaliti bilan) sozlamalar keshi uchun ro'yxatdan o'tkazildi.")
+
+    async def get_settings_row(self, table_name: str, *key: Any) -> Optional[Dict[str, Any]]:
+        """Sozlamalar jadvalidan birlamchi kalit bo'yicha qatorning nusxasini qaytaradi (yo'q bo'lsa None)."""
+        target = await self._settings_target(table_name, key)
+        rows = await target._settings_table_rows(table_name.lower())
+        row = rows.get(tuple(key))
+        return dict(row) if row is not None else None
+
+    async def get_settings_rows(self, table_name: str, *key_prefix: Any) -> List[Dict[str, Any]]:
+        """Kalitning boshlang'ich qismi (masalan, faqat account_id) bo'yicha barcha qatorlar nusxasi."""
+        target = await self._settings_target(table_name, key_prefix)
+        rows = await target._settings_table_rows(table_name.lower())
+        size = len(key_prefix)
+        return [dict(row) for key, row in rows.items() if key[:size] == key_prefix]
+
+    def get_settings_cache_stats(self) -> Dict[str, Any]:
+        return {"tables": {t: len(r) for t, r in self._settings_rows.items()}, **self._settings_stats}
+
+    async def _settings_target(self, table_name: str, key: Tuple) -> "AsyncDatabase":
+        table = table_name.lower()
+        if table not in self._settings_keys:
+            raise QueryError(f"'{table_name}' sozlamalar jadvali sifatida ro'yxatdan o'tmagan.")
+        # Sharding yoqilgan bo'lsa jadval akkaunt shardida turadi (kalitning birinchi ustuni akkaunt)
+        if key and self._sharding_enabled and self._sharded_tables.get(table) == self._settings_keys[table][0]:
+            return await self.shard_for(int(key[0]))
+        return self
+
+    async def _settings_table_rows(self, table: str) -> Dict[Tuple, Dict[str, Any]]:
+        rows = self._settings_rows.get(table)
+        if rows is not None and table not in self._settings_stale:
+            self._settings_stats["hits"] += 1
+            return rows
+        async with self._settings_lock:
+            rows = self._settings_rows.get(table)
+            if rows is not None and table not in self._settings_stale:
+                return rows
+            key_columns = self._settings_keys[table]
+            for _ in range(_SETTINGS_LOAD_ATTEMPTS):
+                # Belgi va avlod so'rovdan oldin olinadi: yuklash paytidagi yozuv yangi belgi qo'yadi
+                generation = self._settings_generation.get(table, 0)
+                scope = self._settings_stale.pop(table, None)
+                if rows is None or scope is None:
+                    fetched = await self.fetchall(f"SELECT * FROM {table}")
+                    rows = {}
+                else:
+                    placeholders = ", ".join("?" for _ in scope)
+                    fetched = await self.fetchall(f"SELECT * FROM {table} WHERE {key_columns[0]} IN ({placeholders})", tuple(scope))
+                    rows = {key: row for key, row in rows.items() if key[0] not in scope}
+                for row in fetched:
+                    rows[tuple(row[c] for c in key_columns)] = row
+                self._settings_rows[table] = rows
+                self._settings_stats["loads"] += 1
+                self._settings_stats["rows_loaded"] += len(fetched)
+                if self._settings_generation.get(table, 0) == generation:
+                    break
+                # Yuklash davomida yozuv tushdi: belgilangan qism darhol qayta yuklanadi
+                # (urinishlar tugasa belgi qoladi va keyingi o'qish yuklaydi)
+            return rows
+
+    def _mark_settings_stale(self, sql: str, params_seq: Any) -> None:
+        """
+        Yozuv so'rovi tegadigan sozlamalar jadvallarini (iloji bo'lsa faqat kalit qismini) eskirgan deb belgilaydi.
+        Hali yuklanmagan (yoki hozir yuklanayotgan) jadvallar ham belgilanadi.
+        """
+        if not self._settings_keys:
+            return
+        tables = _extract_write_tables_util(sql)
+        if tables is None:
+            tables = list(self._settings_keys)
+        in_transaction = self._tx_owner is not None
+        marks = self._settings_pending if in_transaction else self._settings_stale
+        for table in tables:
+            if table not in self._settings_keys:
+                continue
+            if not in_transaction:
+                self._settings_generation[table] = self._settings_generation.get(table, 0) + 1
+            index = _shard_param_index_util(sql, {table: self._settings_keys[table][0]})
+            scope = marks.get(table, set()) if table in marks else set()
+            if index is None or scope is None:
+                marks[table] = None
+                continue
+            for params in params_seq:
+                if not isinstance(params, (tuple, list)) or index >= len(params):
+                    scope = None
+                    break
+                scope.add(params[index])
+            marks[table] = scope
+
+    def _apply_pending_settings_marks(self) -> None:
+        for table, scope in self._settings_pending.items():
+            self._settings_generation[table] = self._settings_generation.get(table, 0) + 1
+            current = self._settings_stale.get(table, set()) if table in self._settings_stale else set()
+            self._settings_stale[table] = None if scope is None or current is None else current | scope
+        self._settings_pending.clear()
     
     async def __aenter__(self):
         """Asinxron kontekst menejeriga kirish."""
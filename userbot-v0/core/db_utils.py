@@ -1,9 +1,15 @@
 import asyncio
+from collections import namedtuple
 from datetime import datetime
+from functools import lru_cache
+import gzip
+import hashlib
+import re
 import shutil
+import sqlite3
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
 
 import aiosqlite
 from loguru import logger
@@ -16,6 +22,31 @@ if TYPE_CHECKING:  # pragma: no cover
 
 from .exceptions import DatabaseError, QueryError
 
+_READ_TABLES_RE = re.compile(r'\b(FROM|JOIN)\b', re.IGNORECASE)
+# FROM ro'yxati elementi: `jadval` yoki `sxema.jadval` (qo'shtirnoq/backtick/[] ichida bo'lishi mumkin)
+_FROM_ITEM_RE = re.compile(r'\s*["`\[]?(\w+)["`\]]?(?:\s*\.\s*["`\[]?(\w+)["`\]]?)?')
+# FROM ro'yxatini tugatadigan belgilar va kalit so'zlar (qavs ichidagi vergullar hisobga olinmaydi)
+_FROM_LIST_TOKEN_RE = re.compile(
+    r'[(),;]|\b(?:WHERE|GROUP|HAVING|ORDER|LIMIT|WINDOW|UNION|EXCEPT|INTERSECT|RETURNING)\b', re.IGNORECASE
+)
+_CTE_RE = re.compile(r'\bWITH\b', re.IGNORECASE)
+_VIEW_DDL_RE = re.compile(
+    r'^\s*(CREATE|DROP)\s+(?:TEMP(?:ORARY)?\s+)?VIEW(?:\s+IF(?:\s+NOT)?\s+EXISTS)?\s+["`\[]?(\w+)', re.IGNORECASE
+)
+_WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM'
+    r'|(?:CREATE|DROP|ALTER)\s+TABLE(?:\s+IF(?:\s+NOT)?\s+EXISTS)?)\s+["`\[]?(\w+)',
+    re.IGNORECASE,
+)
+_READ_ONLY_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN")
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+# sqlite_master.sql bo'yicha jadval turi: virtual (FTS5 va h.k.) va WITHOUT ROWID jadvallar
+_VIRTUAL_TABLE_RE = re.compile(r'^\s*CREATE\s+VIRTUAL\s+TABLE\b', re.IGNORECASE)
+_WITHOUT_ROWID_RE = re.compile(r'\)\s*(?:STRICT\s*,\s*)?WITHOUT\s+ROWID\s*(?:,\s*STRICT\s*)?;?\s*$', re.IGNORECASE)
+
+# fetchone/fetchall/iterate natija shakllari: lug'at (standart), tuple, namedtuple yozuv, birinchi ustun qiymati
+ROW_MODES = ("dict", "tuple", "record", "scalar")
+
 # --- _run_cache_cleanup_util funksiyasi butunlay olib tashlandi ---
 
 
@@ -36,7 +67,65 @@ def _validate_column_names_util(table_name: str, column_names: List[str], column
                 raise QueryError(f"Ruxsat etilmagan ustun nomi: {col} for table {table_name}")
 
 
-async def _get_db_stats_util(db_instance: "AsyncDatabase") -> Dict[str, Any]:
+def _from_list_item_starts(sql: str, pos: int) -> List[int]:
+    """FROM dan keyingi ro'yxatning har bir (vergul bilan ajratilgan) elementi boshlanish pozitsiyalari."""
+    starts = [pos]
+    depth = 0
+    for token in _FROM_LIST_TOKEN_RE.finditer(sql, pos):
+        text = token.group(0)
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0:
+            if text != ",":
+                break
+            starts.append(token.end())
+    return starts
+
+
+def _extract_read_tables_util(sql: str) -> Optional[List[str]]:
+    """
+    SELECT so'rovi o'qiydigan jadvallar (FROM ro'yxatining barcha elementlari va JOIN) nomlarini qaytaradi.
+    Jadvallarni ishonchli aniqlab bo'lmasa (WITH/CTE, FROM/JOIN dagi subselect, tanilmagan element) None qaytaradi.
+    """
+    masked = _mask_sql_literals_util(sql)
+    if _CTE_RE.search(masked):
+        return None
+    tables = set()
+    for keyword in _READ_TABLES_RE.finditer(masked):
+        if keyword.group(1).upper() == "JOIN":
+            starts = [keyword.end()]
+        else:
+            starts = _from_list_item_starts(masked, keyword.end())
+        for start in starts:
+            item = _FROM_ITEM_RE.match(masked, start)
+            if not item:
+                return None
+            tables.add((item.group(2) or item.group(1)).lower())
+    return sorted(tables)
+
+
+def _extract_write_tables_util(sql: str) -> Optional[List[str]]:
+    """
+    So'rov o'zgartiradigan jadvallarni qaytaradi.
+    O'qish so'rovlari uchun bo'sh ro'yxat, jadvalni aniqlab bo'lmasa None qaytaradi.
+    """
+    if sql.lstrip().upper().startswith(_READ_ONLY_PREFIXES):
+        return []
+    match = _WRITE_TABLE_RE.match(sql)
+    return [match.group(1).lower()] if match else None
+
+
+def _extract_view_ddl_util(sql: str) -> Optional[Tuple[bool, str]]:
+    """CREATE VIEW uchun (True, nom), DROP VIEW uchun (False, nom), boshqa so'rovlar uchun None."""
+    match = _VIEW_DDL_RE.match(sql)
+    return (match.group(1).upper() == "CREATE", match.group(2).lower()) if match else None
+
+
+async def _get_db_stats_util(db_instance: "AsyncDatabase", exact: bool = False) -> Dict[str, Any]:
     if not db_instance.db_path:
         logger.warning("DB statistikasini olishda xatolik: Ma'lumotlar bazasi yo'li sozlanmagan.")
         return {"error": "Ma'lumotlar bazasi yo'li sozlanmagan."}
@@ -55,23 +144,16 @@ async def _get_db_stats_util(db_instance: "AsyncDatabase") -> Dict[str, Any]:
             pragma_results[name] = await db_instance.fetch_val(sql)
         stats["pragmas"] = pragma_results
 
-        tables_info = []
-        tables = await db_instance.fetchall("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-        for table in tables:
-            table_name = table['name']
-            row_count = await db_instance.fetch_val(f'SELECT count(*) FROM "{table_name}"')
-            indexes = await db_instance.fetchall(f"PRAGMA index_list('{table_name}')")
-            
-            # TUZATISH: `dbstat` ga bog'liq bo'lgan va xatolik berayotgan qatorlar olib tashlandi.
-            tables_info.append({
-                "name": table_name,
-                "row_count": row_count,
-                "indexes": [idx['name'] for idx in indexes]
-            })
-
+        table_stats = await db_instance.get_table_stats(exact=exact)
+        tables_info = table_stats["tables"]
         stats["tables"] = tables_info
+        stats["table_stats"] = {k: v for k, v in table_stats.items() if k != "tables"}
         stats["table_count"] = len(tables_info)
-        stats["total_rows"] = sum(t.get("row_count", 0) for t in tables_info)
+        stats["total_rows"] = sum(t.get("row_count") or 0 for t in tables_info)
+        stats["read_pool"] = db_instance.get_read_pool_stats()
+        stats["write_queue"] = db_instance.get_write_queue_stats()
+        stats["storage"] = await db_instance.get_storage_stats()
+        stats["wal"] = db_instance.get_wal_stats()
         
         if hasattr(db_instance, '_cache_manager'):
             stats["cache"] = await db_instance._cache_manager.get_stats()
@@ -81,6 +163,205 @@ async def _get_db_stats_util(db_instance: "AsyncDatabase") -> Dict[str, Any]:
         stats["error"] = str(e)
     return stats
 
+async def _get_table_stats_util(db_instance: "AsyncDatabase", exact: bool = False) -> Dict[str, Any]:
+    """
+    Jadvallar ro'yxati, qatorlar soni, indekslar va (dbstat mavjud bo'lsa) bayt hajmi.
+    Jadval/indekslar sqlite_master dan bitta so'rovda olinadi; virtual (FTS5) jadvallar va ularning
+    shadow jadvallari ko'rsatilmaydi. Qatorlar soni `ANALYZE` natijasi (sqlite_stat1) dan taxminiy
+    olinadi; unda yo'q jadvallar uchun rowid oralig'i ishlatiladi (WITHOUT ROWID jadvallar uchun
+    taxmin yo'q). `exact=True` bo'lsa barcha `count(*)` lar o'qish pulida parallel bajariladi.
+    """
+    started = time.perf_counter()
+    master = await db_instance.fetchall("SELECT type, name, tbl_name, sql FROM sqlite_master WHERE type IN ('table', 'index')", row_mode="tuple")
+    virtual = [name for kind, name, _, sql in master if kind == "table" and _VIRTUAL_TABLE_RE.match(sql or "")]
+    table_names = [
+        name for kind, name, _, sql in master
+        if kind == "table" and not name.startswith("sqlite_") and name not in virtual
+        and not any(name.startswith(f"{vtab}_") for vtab in virtual)
+    ]
+    without_rowid = {name for kind, name, _, sql in master if kind == "table" and _WITHOUT_ROWID_RE.search(sql or "")}
+    indexes: Dict[str, List[str]] = {}
+    for kind, name, tbl_name, _ in master:
+        if kind == "index" and tbl_name in table_names:
+            indexes.setdefault(tbl_name, []).append(name)
+
+    counts: Dict[str, Optional[int]] = {}
+    if exact:
+        results = await asyncio.gather(*(db_instance.fetch_val(f'SELECT count(*) FROM "{name}"') for name in table_names))
+        counts = dict(zip(table_names, results))
+    else:
+        if any(name == "sqlite_stat1" for _, name, _, _ in master):
+            # stat ustunining birinchi soni: jadval (yoki indeks) dagi taxminiy qatorlar soni
+            for tbl, stat in await db_instance.fetchall("SELECT tbl, stat FROM sqlite_stat1", row_mode="tuple"):
+                first = str(stat or "").split(" ", 1)[0]
+                if tbl in table_names and first.isdigit():
+                    counts[tbl] = max(counts.get(tbl) or 0, int(first))
+        missing = [name for name in table_names if name not in counts and name not in without_rowid]
+        results = await asyncio.gather(*(_estimate_rows_by_rowid_util(db_instance, name) for name in missing))
+        counts.update(zip(missing, results))
+
+    sizes: Dict[str, int] = {}
+    dbstat_available = True
+    try:
+        for name, tbl_name, pgsize in await db_instance.fetchall(
+            "SELECT s.name, m.tbl_name, s.pgsize FROM dbstat AS s JOIN sqlite_master AS m ON m.name = s.name WHERE s.aggregate = TRUE",
+            row_mode="tuple",
+        ):
+            sizes[tbl_name] = sizes.get(tbl_name, 0) + (pgsize or 0)
+    except QueryError as e:
+        # SQLite SQLITE_ENABLE_DBSTAT_VTAB siz yig'ilgan bo'lishi mumkin
+        dbstat_available = False
+        logger.debug(f"dbstat mavjud emas, jadval hajmlari hisoblanmaydi: {e}")
+
+    tables = [
+        {
+            "name": name,
+            "row_count": counts.get(name),
+            "row_count_exact": exact,
+            "size_bytes": sizes.get(name) if dbstat_available else None,
+            "indexes": indexes.get(name, []),
+        }
+        for name in table_names
+    ]
+    return {
+        "tables": tables,
+        "exact": exact,
+        "dbstat": dbstat_available,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        "collected_at": time.time(),
+    }
+
+
+async def _estimate_rows_by_rowid_util(db_instance: "AsyncDatabase", table_name: str) -> Optional[int]:
+    """rowid oralig'i bo'yicha taxminiy qatorlar soni (indeks bo'yicha ikki qidiruv, jadval skanerlanmaydi)."""
+    try:
+        row = await db_instance.fetchone(f'SELECT min(rowid), max(rowid) FROM "{table_name}"', row_mode="tuple")
+    except QueryError as e:
+        logger.debug(f"'{table_name}' uchun rowid bo'yicha taxmin olinmadi: {e}")
+        return None
+    low, high = row if row else (None, None)
+    return 0 if low is None else high - low + 1
+
+
+def _mask_sql_literals_util(sql: str) -> str:
+    """Satr literallari va izohlar ichini bo'shliq bilan almashtiradi (uzunlik saqlanadi), shunda `?` sanash ishonchli bo'ladi."""
+    return _SQL_LITERAL_RE.sub(lambda m: m.group(0)[0] + " " * (len(m.group(0)) - 1), sql)
+
+
+def _shard_param_index_util(sql: str, sharded_tables: Dict[str, Optional[str]]) -> Optional[int]:
+    """
+    So'rovni akkaunt shardiga yo'naltirish uchun `account_id` qiymati turgan parametr indeksini topadi.
+
+    So'rov faqat `sharded_tables` dagi jadvallarga murojaat qilsa va ulardan birining akkaunt ustuni
+    `ustun = ?` ko'rinishida (yoki INSERT ustunlar ro'yxatida `?` bilan) berilgan bo'lsa, o'sha `?` ning
+    tartib raqami qaytariladi. Asosiy (core) jadval ishtirok etsa yoki kalit topilmasa None.
+    """
+    read_tables = _extract_read_tables_util(sql)
+    if read_tables is None:
+        return None
+    tables = set(read_tables) | set(_extract_write_tables_util(sql) or [])
+    if not tables or any(t not in sharded_tables for t in tables):
+        return None
+
+    masked = _mask_sql_literals_util(sql)
+    candidates: List[int] = []
+    for table in tables:
+        column = sharded_tables[table]
+        if not column:
+            continue
+        insert = re.search(rf"\bINTO\s+[\"`\[]?{table}[\"`\]]?\s*\(([^)]*)\)\s*VALUES\s*\(", masked, re.IGNORECASE)
+        if insert and re.search(r"\)\s*,\s*\(", masked[insert.end():]):
+            # Ko'p qatorli VALUES: qatorlar turli akkauntlarga tegishli bo'lishi mumkin
+            return None
+        if insert:
+            columns = [c.strip().strip('"`[]').lower() for c in insert.group(1).split(",")]
+            if column in columns:
+                values_start = insert.end()
+                values = masked[values_start:].split(",")
+                position = columns.index(column)
+                if position < len(values) and values[position].strip().rstrip(")").strip() == "?":
+                    before = masked[:values_start].count("?") + sum(v.count("?") for v in values[:position])
+                    candidates.append(before)
+                    continue
+        for match in re.finditer(rf"\b(?:\w+\.)?{column}\s*(?:==?|\bIS\b)\s*\?", masked, re.IGNORECASE):
+            candidates.append(masked[:match.end()].count("?") - 1)
+            break
+    return min(candidates) if candidates else None
+
+
+def _build_bulk_insert_sql_util(table_name: str, columns: Sequence[str], rows_per_statement: int, conflict_target: Optional[Sequence[str]] = None) -> str:
+    """
+    `rows_per_statement` qatorli `INSERT ... VALUES (...), (...)` so'rovini yasaydi.
+    `conflict_target` berilsa, kalitdan boshqa ustunlar `excluded` qiymatlari bilan yangilanadi (UPSERT).
+    """
+    row_placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join([row_placeholders] * rows_per_statement)}"
+    if conflict_target is not None:
+        update_keys = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in conflict_target)
+        action = f"DO UPDATE SET {update_keys}" if update_keys else "DO NOTHING"
+        sql += f" ON CONFLICT({', '.join(conflict_target)}) {action}"
+    return sql
+
+
+@lru_cache(maxsize=256)
+def _record_type_util(columns: Tuple[str, ...]) -> type:
+    """Natija shakli (ustunlar ro'yxati) uchun keshlangan namedtuple klassi. `count(*)` kabi nomlar `_0` ga almashadi."""
+    return namedtuple("Record", columns, rename=True)
+
+
+def _scalar_row(cursor: sqlite3.Cursor, row: Tuple) -> Any:
+    return row[0]
+
+
+def _row_factory_util(row_mode: str, description: Optional[Sequence[Tuple]]) -> Optional[Callable[[sqlite3.Cursor, Tuple], Any]]:
+    """
+    Kursor uchun row_factory: qatorlar SQLite oqimida to'g'ridan-to'g'ri kerakli shaklda yasaladi
+    (oraliq `sqlite3.Row` va lug'atlarsiz). "dict" rejimi bu yerda ishlatilmaydi.
+    """
+    if row_mode == "tuple":
+        return None
+    if row_mode == "scalar":
+        return _scalar_row
+    if row_mode == "record":
+        record = _record_type_util(tuple(column[0] for column in description or ()))
+        # namedtuple._make dan ikki baravar tez: tuple to'g'ridan-to'g'ri yozuv klassiga aylantiriladi
+        return lambda cursor, row: tuple.__new__(record, row)
+    raise QueryError(f"Noma'lum qator rejimi: {row_mode}. Mumkin: {', '.join(ROW_MODES)}")
+
+
+def _split_sql_script_util(script: str) -> List[str]:
+    """
+    SQL skriptini alohida so'rovlarga ajratadi (`sqlite3.complete_statement` yordamida,
+    shuning uchun triggerlar ichidagi `;` ham to'g'ri hisoblanadi). Faqat izohdan iborat qoldiq tashlanadi.
+    """
+    statements: List[str] = []
+    buffer = ""
+    for piece in re.split(r"(;)", script):
+        buffer += piece
+        if piece == ";" and sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    tail = "\n".join(line for line in buffer.splitlines() if not line.strip().startswith("--")).strip()
+    if tail:
+        statements.append(buffer.strip())
+    return statements
+
+
+def _schema_fingerprint_util(db_instance: "AsyncDatabase") -> int:
+    """
+    Migratsiya fayllari va boshlang'ich ma'lumotlar skriptining nomi, hajmi va o'zgarish vaqtidan
+    `PRAGMA user_version` ga sig'adigan (musbat, 31 bit) barmoq izi hisoblaydi. Fayllar o'qilmaydi.
+    """
+    digest = hashlib.sha256()
+    paths = sorted(db_instance.migrations_path.glob("*.sql")) if db_instance.migrations_path.is_dir() else []
+    if db_instance.initial_data_path.is_file():
+        paths.append(db_instance.initial_data_path)
+    for path in paths:
+        st = path.stat()
+        digest.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return int.from_bytes(digest.digest()[:4], "big") & 0x7FFFFFFF or 1
+
+
 async def _run_migrations_util(db_instance: "AsyncDatabase"):
     if not db_instance.migrations_path.is_dir():
         logger.warning(f"Migratsiyalar papkasi topilmadi: {db_instance.migrations_path}")
@@ -92,34 +373,58 @@ async def _run_migrations_util(db_instance: "AsyncDatabase"):
             CREATE TABLE IF NOT EXISTS applied_migrations (
                 id INTEGER PRIMARY KEY,
                 filename TEXT UNIQUE NOT NULL,
+                checksum TEXT,
                 applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
-        applied_rows = await db_instance.fetchall("SELECT filename FROM applied_migrations")
-        applied_files = {row['filename'] for row in applied_rows}
-
-    migration_files = sorted([f for f in db_instance.migrations_path.glob("*.sql")], key=lambda f: f.name)
-    applied_migrations_count = 0
-    for migration_file in migration_files:
+        columns = {row['name'] for row in await db_instance.fetchall("PRAGMA table_info(applied_migrations)")}
+        if "checksum" not in columns:
+            await db_instance.execute("ALTER TABLE applied_migrations ADD COLUMN checksum TEXT")
+        applied_rows = await db_instance.fetchall("SELECT filename, checksum FROM applied_migrations")
+        applied_files = {row['filename']: row['checksum'] for row in applied_rows}
+
+    pending: List[Tuple[str, str, str]] = []
+    backfill: List[Tuple[str, str]] = []
+    mismatched: List[str] = []
+    for migration_file in sorted(db_instance.migrations_path.glob("*.sql"), key=lambda f: f.name):
+        sql_script = migration_file.read_text(encoding='utf-8')
+        checksum = hashlib.sha256(sql_script.encode('utf-8')).hexdigest()
         if migration_file.name not in applied_files:
-            logger.info("Yangi migratsiya qo'llanilmoqda: %s" % migration_file.name)
-            try:
-                with open(migration_file, 'r', encoding='utf-8') as f:
-                    sql_script = f.read()
-
-                conn = await db_instance._get_connection()
-                await conn.executescript(sql_script)
+            pending.append((migration_file.name, sql_script, checksum))
+        elif applied_files[migration_file.name] is None:
+            # Checksum ustunidan oldin qo'llanilgan migratsiyalar: joriy holatini ishonchli deb olamiz
+            backfill.append((checksum, migration_file.name))
+        elif applied_files[migration_file.name] != checksum:
+            mismatched.append(migration_file.name)
+
+    if mismatched:
+        logger.critical(f"Qo'llanilgan migratsiya fayllari o'zgartirilgan (checksum mos emas): {', '.join(mismatched)}")
+        raise QueryError(f"Migratsiya checksum xatosi: {', '.join(mismatched)}")
+
+    if not pending and not backfill:
+        logger.info("Ma'lumotlar bazasi sxemasi dolzarb. Yangi migratsiyalar yo'q.")
+        return
 
-                await db_instance.execute("INSERT INTO applied_migrations (filename) VALUES (?)", (migration_file.name,))
-                logger.success(f"Migratsiya '{migration_file.name}' muvaffaqiyatli qo'llanildi.")
-                applied_migrations_count += 1
+    # Barcha yangi migratsiyalar bitta tranzaksiyada: biri yiqilsa, hech biri qo'llanilmaydi.
+    # `executescript` ochiq tranzaksiyani commit qilib yuborgani uchun so'rovlar alohida bajariladi.
+    async with db_instance.transaction():
+        if backfill:
+            await db_instance.executemany("UPDATE applied_migrations SET checksum = ? WHERE filename = ?", backfill)
+        conn = await db_instance._get_connection()
+        for filename, sql_script, checksum in pending:
+            logger.info("Yangi migratsiya qo'llanilmoqda: %s" % filename)
+            try:
+                for statement in _split_sql_script_util(sql_script):
+                    await conn.execute(statement)
+                await conn.execute("INSERT INTO applied_migrations (filename, checksum) VALUES (?, ?)", (filename, checksum))
             except aiosqlite.Error as e:
-                logger.critical(f"Migratsiya '{migration_file.name}' bajarilishida xatolik: {e}", exc_info=True)
-                raise QueryError(f"Migratsiya xatosi: {migration_file.name}") from e
+                logger.critical(f"Migratsiya '{filename}' bajarilishida xatolik: {e}", exc_info=True)
+                raise QueryError(f"Migratsiya xatosi: {filename}") from e
+    db_instance._global_cache_version += 1
 
-    if applied_migrations_count == 0:
-        logger.info("Ma'lumotlar bazasi sxemasi dolzarb. Yangi migratsiyalar yo'q.")
+    if pending:
+        logger.success(f"{len(pending)} ta migratsiya muvaffaqiyatli qo'llanildi: {', '.join(name for name, _, _ in pending)}")
 
 
 async def _run_initial_data_script_util(db_instance: "AsyncDatabase"):
@@ -184,4 +489,96 @@ async def _create_backup_util(db_instance: "AsyncDatabase") -> Path:
             await db_instance.connect()
 
 
+class _BackupRestartLimit(Exception):
+    """Bosqichma-bosqich zaxiralash manba o'zgarishlari sababli juda ko'p qayta boshlandi."""
+
+
+def _online_backup_sync(source_path: Path, target_path: Path, pages: int, sleep: float, max_restarts: int = 5) -> None:
+    """
+    SQLite backup API orqali bazani ochiq holatda nusxalaydi (alohida thread'da ishlaydi).
+    Har bosqichda `pages` ta sahifa ko'chiriladi va bosqichlar orasida `sleep` soniya kutiladi.
+    Yozuvlar nusxalashni qayta-qayta boshlatib yuborsa, WAL rejimida yozuvchilarni
+    bloklamaydigan bir bosqichli nusxalashga o'tiladi.
+    """
+    restarts = 0
+    last_remaining: Optional[int] = None
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _BackupRestartLimit()
+        last_remaining = remaining
+        logger.trace(f"Zaxiralash: {total - remaining}/{total} sahifa ko'chirildi.")
+
+    source = sqlite3.connect(f"{source_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=progress, sleep=sleep)
+            except _BackupRestartLimit:
+                logger.warning(f"Zaxiralash {max_restarts} marta qayta boshlandi. Bir bosqichli nusxalashga o'tilmoqda.")
+                source.backup(target, pages=-1)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def _gzip_file_sync(source_path: Path, target_path: Path) -> None:
+    with open(source_path, 'rb') as f_in, gzip.open(target_path, 'wb', compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+
+
+async def _create_online_backup_util(db_instance: "AsyncDatabase", pages: int = 256, sleep_ms: int = 50, compress: bool = False) -> Path:
+    """
+    Bot ishlashda davom etgan holda (ulanishni yopmasdan) WAL tarkibini ham o'z ichiga
+    olgan izchil zaxira nusxa yaratadi. Ixtiyoriy ravishda gzip bilan siqadi.
+    """
+    if not db_instance.db_path or not db_instance.db_path.exists():
+        raise DatabaseError("Zaxira nusxa yaratish uchun baza fayli mavjud emas.")
+
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    backup_file = db_instance.backup_dir / f"{db_instance.db_path.name}.{timestamp}.bak"
+
+    try:
+        await asyncio.to_thread(_online_backup_sync, db_instance.db_path, backup_file, pages, sleep_ms / 1000)
+        if compress:
+            compressed_file = backup_file.with_name(backup_file.name + ".gz")
+            await asyncio.to_thread(_gzip_file_sync, backup_file, compressed_file)
+            backup_file.unlink()
+            backup_file = compressed_file
+        logger.info(f"Ma'lumotlar bazasining onlayn zaxirasi yaratildi: {backup_file}")
+        return backup_file
+    except Exception as e:
+        logger.error(f"Onlayn zaxira nusxa yaratishda xatolik: {e}", exc_info=True)
+        for leftover in (backup_file, backup_file.with_name(backup_file.name + ".gz")):
+            leftover.unlink(missing_ok=True)
+        raise DatabaseError(f"Zaxira nusxa yaratishda xatolik: {e}") from e
+
+
+def _prune_backups_util(db_instance: "AsyncDatabase", keep: int) -> List[Path]:
+    """`backup_dir` dagi eng yangi `keep` ta zaxiradan boshqasini o'chiradi. keep <= 0 bo'lsa hech narsa o'chirilmaydi."""
+    if keep <= 0 or not db_instance.db_path or not db_instance.backup_dir.is_dir():
+        return []
+
+    backups = sorted(
+        db_instance.backup_dir.glob(f"{db_instance.db_path.name}.*.bak*"),
+        key=lambda f: f.stat().st_mtime,
+        reverse=True,
+    )
+    removed: List[Path] = []
+    for old_backup in backups[keep:]:
+        try:
+            old_backup.unlink()
+            removed.append(old_backup)
+        except OSError as e:
+            logger.warning(f"Eski zaxira nusxani o'chirib bo'lmadi ({old_backup.name}): {e}")
+    if removed:
+        logger.info(f"{len(removed)} ta eski zaxira nusxa o'chirildi.")
+    return removed
+
+
 # GLOBAL obyektlar bu yerda yaratilmaydi.
@@ -1,5 +1,5 @@
 # userbot-v0\core\db_whitelists.py
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # Ma'lumotlar bazasiga kirishga ruxsat etilgan jadvallar ro'yxati
 DB_TABLE_WHITELIST: List[str] = [
@@ -35,6 +35,13 @@ DB_TABLE_WHITELIST: List[str] = [
     "digest_settings",
     "animator_random_items",
     "task_queue",
+    "task_logs_hourly",
+    "task_logs_daily",
+    "logged_media_hourly",
+    "logged_media_daily",
+    "ai_usage_hourly",
+    "ai_usage_totals",
+    "message_journal",
 ]
 
 # Ma'lumotlar bazasiga kirishga ruxsat etilgan ustunlar ro'yxati (jadval bo'yicha)
@@ -71,4 +78,36 @@ DB_COLUMN_WHITELIST: Dict[str, List[str]] = {
     "digest_settings": ["account_id", "delivery_time", "is_enabled", "confirmation_message_id", "chat_id", "created_at", "updated_at"],
     "animator_random_items": ["id", "account_id", "item_type", "item_value", "created_at"],
     "task_queue": ["id", "account_id", "task_name", "payload", "status", "created_at", "processed_at"], # misol uchun, agar task queue bo'lsa
-}
\ No newline at end of file
+    "task_logs_hourly": ["bucket", "task_key", "runs", "success_count", "failure_count", "timeout_count", "skipped_count", "total_duration_ms", "max_duration_ms"],
+    "task_logs_daily": ["bucket", "task_key", "runs", "success_count", "failure_count", "timeout_count", "skipped_count", "total_duration_ms", "max_duration_ms"],
+    "logged_media_hourly": ["account_id", "bucket", "source_chat_id", "media_count", "total_bytes"],
+    "logged_media_daily": ["account_id", "bucket", "source_chat_id", "media_count", "total_bytes"],
+    "ai_usage_hourly": ["userbot_account_id", "bucket", "call_count"],
+    "ai_usage_totals": ["userbot_account_id", "call_count"],
+    "message_journal": ["id", "account_id", "chat_id", "message_id", "sender_id", "event", "text", "created_at"],
+}
+
+# DB_SHARD_BY_ACCOUNT yoqilganda akkaunt bo'yicha alohida faylga (shardga) yo'naltiriladigan jadvallar:
+# jadval -> akkaunt ID saqlanadigan ustun. None - o'z akkaunt ustuni yo'q, faqat shard ichida
+# ishlatiladigan yordamchi jadval (FTS indekslari, indeksatsiya holati). Qolgan barcha jadvallar asosiy faylda.
+DB_SHARDED_TABLES: Dict[str, Optional[str]] = {
+    "afk_settings": "account_id",
+    "afk_mentions": "afk_account_id",
+    "afk_ignored_users": "owner_account_id",
+    "notes": "account_id",
+    "logged_media": "account_id",
+    "logged_media_hourly": "account_id",
+    "logged_media_daily": "account_id",
+    "message_journal": "account_id",
+    "text_log_settings": "account_id",
+    "text_log_ignored_users": "account_id",
+    "translate_history": "account_id",
+    "ai_knowledge_base": "account_id",
+    "ai_usage_stats": "userbot_account_id",
+    "ai_usage_hourly": "userbot_account_id",
+    "ai_usage_totals": "userbot_account_id",
+    "message_journal_fts": None,
+    "afk_mentions_fts": None,
+    "notes_fts": None,
+    "search_index_state": None,
+}
@@ -7,4 +7,12 @@ class DBConnectionError(DatabaseError):
     pass
 
 class QueryError(DatabaseError):
-    pass
\ No newline at end of file
+    pass
+
+class QueryInterruptedError(QueryError):
+    """So'rov vaqt/qadam byudjeti tugagani yoki bekor qilingani uchun to'xtatildi."""
+    def __init__(self, reason: str, rows: int = 0, elapsed: float = 0.0):
+        super().__init__(f"Query interrupted ({reason}) after {rows} rows, {elapsed:.2f}s")
+        self.reason = reason
+        self.rows = rows
+        self.elapsed = elapsed
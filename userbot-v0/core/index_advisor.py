@@ -0,0 +1,220 @@
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+_FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$", re.IGNORECASE)
+_PREDICATE_RE = re.compile(r"(?:\b(\w+)\.)?\b(\w+)\s*(=|==|>=|<=|>|<|\bIN\b|\bIS\b|\bBETWEEN\b)", re.IGNORECASE)
+_WHERE_RE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bRETURNING\b|$)", re.IGNORECASE | re.DOTALL)
+_IDENTIFIER_RE = re.compile(r"\b\w+\b")
+_MIGRATION_VERSION_RE = re.compile(r"^V(\d+)_")
+
+_EQUALITY_OPS = {"=", "==", "IN", "IS"}
+
+
+@dataclass
+class IndexRecommendation:
+    """To'liq jadval skanerlashini bartaraf etish uchun taklif qilingan indeks."""
+    table: str
+    columns: List[str]
+    key_columns: int
+    row_count: int = 0
+    calls: int = 0
+    total_ms: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.columns[:self.key_columns])}"
+
+    @property
+    def covering(self) -> bool:
+        return len(self.columns) > self.key_columns
+
+    @property
+    def sql(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({', '.join(self.columns)});"
+
+    @property
+    def estimated_saving_ms(self) -> float:
+        """
+        Taxminiy foyda: skanerlash narxi jadval hajmiga (n), indeks qidiruvi esa log2(n) ga
+        proporsional deb olinadi va profildagi umumiy vaqtning shu ulushi qaytariladi.
+        """
+        if self.row_count <= 1:
+            return 0.0
+        lookup_share = (math.log2(self.row_count) + 1) / self.row_count
+        return round(self.total_ms * max(1.0 - lookup_share, 0.0), 3)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "table": self.table,
+            "columns": self.columns,
+            "covering": self.covering,
+            "sql": self.sql,
+            "row_count": self.row_count,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "estimated_saving_ms": self.estimated_saving_ms,
+            "statements": self.statements,
+        }
+
+
+class IndexAdvisor:
+    """
+    Profilchidagi eng og'ir so'rovlarning `EXPLAIN QUERY PLAN` natijalarini tahlil qilib,
+    to'liq jadval skanerlashi (SCAN) uchraganda qoplovchi (covering) indekslarni taklif qiladi.
+    Takliflar `data/migrations` ga yangi migratsiya fayli sifatida yozilishi mumkin.
+    """
+
+    def __init__(self, db: "AsyncDatabase", max_index_columns: int = 5):
+        self._db = db
+        self._max_index_columns = max_index_columns
+        self._table_columns: Dict[str, List[str]] = {}
+
+    async def _columns_of(self, table: str) -> List[str]:
+        if table not in self._table_columns:
+            rows = await self._db.fetchall(f"PRAGMA table_info('{table}')")
+            self._table_columns[table] = [row["name"] for row in rows]
+        return self._table_columns[table]
+
+    async def _rowid_alias(self, table: str) -> Optional[str]:
+        """`INTEGER PRIMARY KEY` ustuni rowid bo'lgani uchun har bir indeksga avtomatik kiradi."""
+        rows = await self._db.fetchall(f"PRAGMA table_info('{table}')")
+        pk = [row for row in rows if row["pk"]]
+        if len(pk) == 1 and str(pk[0]["type"]).upper() == "INTEGER":
+            return pk[0]["name"]
+        return None
+
+    async def _existing_index_prefixes(self, table: str) -> List[Tuple[str, ...]]:
+        prefixes = []
+        for index in await self._db.fetchall(f"PRAGMA index_list('{table}')"):
+            info = await self._db.fetchall(f"PRAGMA index_info('{index['name']}')")
+            prefixes.append(tuple(row["name"] for row in sorted(info, key=lambda r: r["seqno"])))
+        return prefixes
+
+    async def _full_scans(self, statement: str) -> List[Tuple[str, Optional[str]]]:
+        """So'rov rejasidagi indekssiz SCAN qadamlarini (jadval, taxallus) qaytaradi."""
+        if ":" in statement or "$" in statement or "@" in statement:
+            return []
+        params = (None,) * statement.count("?")
+        try:
+            plan = await self._db.fetchall(f"EXPLAIN QUERY PLAN {statement}", params)
+        except Exception as e:
+            logger.debug(f"Indeks maslahatchisi: rejani olib bo'lmadi ({e}): {statement[:120]}")
+            return []
+        scans = []
+        for row in plan:
+            if match := _FULL_SCAN_RE.match(str(row.get("detail", "")).strip()):
+                scans.append((match.group(1), match.group(2)))
+        return scans
+
+    async def _propose(self, statement: str, table: str, alias: Optional[str]) -> Optional[Tuple[List[str], int]]:
+        columns = await self._columns_of(table)
+        if not columns:
+            return None
+        lowered = {c.lower(): c for c in columns}
+        owners = {table.lower(), (alias or table).lower()}
+
+        where = _WHERE_RE.search(statement)
+        equality: List[str] = []
+        ranges: List[str] = []
+        for qualifier, column, op in _PREDICATE_RE.findall(where.group(1) if where else ""):
+            if qualifier and qualifier.lower() not in owners:
+                continue
+            name = lowered.get(column.lower())
+            if not name:
+                continue
+            target = equality if op.upper() in _EQUALITY_OPS else ranges
+            if name not in equality and name not in ranges:
+                target.append(name)
+
+        key = equality + ranges[:1]
+        if not key:
+            return None
+
+        # Qoplovchi indeks: so'rovda ishlatilgan qolgan ustunlar ham indeksga qo'shiladi,
+        # shunda SQLite jadvalning o'ziga murojaat qilmaydi. `*` bo'lsa bu imkonsiz.
+        rowid = await self._rowid_alias(table)
+        extra: List[str] = []
+        if not re.search(r"\bSELECT\s+(?:\w+\.)?\*", statement, re.IGNORECASE):
+            for token in _IDENTIFIER_RE.findall(statement):
+                name = lowered.get(token.lower())
+                if name and name not in key and name not in extra and name != rowid:
+                    extra.append(name)
+        if extra and len(key) + len(extra) <= self._max_index_columns:
+            return key + extra, len(key)
+        return key, len(key)
+
+    async def analyze(self, limit: int = 25, min_calls: int = 1) -> List[IndexRecommendation]:
+        """Eng ko'p vaqt olgan `limit` ta so'rovni tahlil qiladi va takliflarni foyda bo'yicha saralaydi."""
+        recommendations: Dict[Tuple[str, Tuple[str, ...]], IndexRecommendation] = {}
+        existing: Dict[str, List[Tuple[str, ...]]] = {}
+
+        for item in self._db.get_query_profile(sort_by="total_ms", limit=limit):
+            statement = item["statement"]
+            if item["count"] < min_calls or statement.upper().startswith(("EXPLAIN", "PRAGMA", "CREATE", "DROP", "ALTER")):
+                continue
+            for table, alias in await self._full_scans(statement):
+                if table.startswith("sqlite_"):
+                    continue
+                proposal = await self._propose(statement, table, alias)
+                if not proposal:
+                    continue
+                columns, key_columns = proposal
+                if table not in existing:
+                    existing[table] = await self._existing_index_prefixes(table)
+                key = tuple(columns[:key_columns])
+                if any(prefix[:len(key)] == key for prefix in existing[table]):
+                    continue
+
+                rec = recommendations.get((table, key))
+                if rec is None:
+                    row_count = await self._db.fetch_val(f'SELECT count(*) FROM "{table}"') or 0
+                    rec = IndexRecommendation(table=table, columns=columns, key_columns=key_columns, row_count=row_count)
+                    recommendations[(table, key)] = rec
+                elif len(columns) > len(rec.columns):
+                    rec.columns = columns
+                rec.calls += item["count"]
+                rec.total_ms += item["total_ms"]
+                rec.statements.append(statement)
+
+        return sorted(recommendations.values(), key=lambda r: (r.estimated_saving_ms, r.total_ms), reverse=True)
+
+    def write_migration(self, recommendations: List[IndexRecommendation], migrations_path: Optional[Path] = None) -> Optional[Path]:
+        """Takliflarni navbatdagi raqamli `VNNN_index_advisor.sql` migratsiya fayliga yozadi."""
+        if not recommendations:
+            return None
+        migrations_path = migrations_path or self._db.migrations_path
+        migrations_path.mkdir(parents=True, exist_ok=True)
+
+        versions = [int(m.group(1)) for f in migrations_path.glob("V*.sql") if (m := _MIGRATION_VERSION_RE.match(f.name))]
+        filename = f"V{max(versions, default=0) + 1:03d}_index_advisor.sql"
+
+        lines = [
+            "-- =============================================================================",
+            f"-- MIGRATION: {filename}",
+            "-- DESCRIPTION: Indeks maslahatchisi (.db advise) tomonidan yaratilgan indekslar.",
+            f"-- GENERATED: {datetime.now().isoformat(timespec='seconds')}",
+            "-- =============================================================================",
+            "",
+        ]
+        for rec in recommendations:
+            lines.append(f"-- {rec.calls} chaqiruv, {rec.total_ms:.1f} ms, ~{rec.estimated_saving_ms:.1f} ms tejash")
+            lines.extend(f"--   {statement[:200]}" for statement in rec.statements[:3])
+            lines.append(rec.sql)
+            lines.append("")
+
+        target = migrations_path / filename
+        target.write_text("\n".join(lines), encoding="utf-8")
+        logger.success(f"Indeks maslahatchisi migratsiyasi yozildi: {target}")
+        return target
@@ -0,0 +1,160 @@
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+PROFILE_SORT_KEYS = ("total_ms", "count", "avg_ms", "p95_ms", "p99_ms", "rows", "lock_retries")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """
+    SQL so'rovini profil kaliti uchun normallashtiradi: literal qiymatlar `?` ga,
+    `IN (?, ?, ...)` ro'yxatlari `IN (?)` ga almashtiriladi, bo'shliqlar siqiladi.
+    """
+    normalized = _STRING_LITERAL_RE.sub("?", sql)
+    normalized = _NUMBER_LITERAL_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(?)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip().rstrip(";")
+
+
+def _percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank usulida foizlik (percentile) qiymati."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+@dataclass
+class StatementStats:
+    """Bitta normallashtirilgan so'rov uchun yig'ilgan ko'rsatkichlar."""
+    statement: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    lock_retries: int = 0
+    samples: Deque[float] = field(default_factory=deque)
+
+    def as_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(_percentile(ordered, 50), 3),
+            "p95_ms": round(_percentile(ordered, 95), 3),
+            "p99_ms": round(_percentile(ordered, 99), 3),
+            "rows": self.rows,
+            "lock_retries": self.lock_retries,
+        }
+
+
+class QueryProfiler:
+    """
+    `AsyncDatabase` so'rovlari uchun xotiradagi profilchi.
+    Har bir normallashtirilgan so'rov bo'yicha son, kechikish (p50/p95/p99), qatorlar va
+    lock qayta urinishlarini yig'adi; chegaradan sekin so'rovlarni alohida jurnalga yozadi.
+    Foizliklar oxirgi `samples_per_statement` ta o'lchov bo'yicha hisoblanadi.
+    """
+
+    def __init__(self, slow_threshold_ms: float = 200.0, slowlog_size: int = 50, samples_per_statement: int = 512, max_statements: int = 1000):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._samples_per_statement = max(samples_per_statement, 1)
+        self._max_statements = max_statements
+        self._statements: Dict[str, StatementStats] = {}
+        self._slowlog: Deque[Dict[str, Any]] = deque(maxlen=max(slowlog_size, 1))
+        self._dropped = 0
+        self._started_at = time.time()
+
+    def _stats_for(self, sql: str) -> Optional[StatementStats]:
+        statement = normalize_sql(sql)
+        stats = self._statements.get(statement)
+        if stats is None:
+            if len(self._statements) >= self._max_statements:
+                self._dropped += 1
+                return None
+            stats = StatementStats(statement=statement, samples=deque(maxlen=self._samples_per_statement))
+            self._statements[statement] = stats
+        return stats
+
+    def record(self, sql: str, duration_ms: float, rows: int = 0) -> None:
+        """Bajarilgan so'rov o'lchovini qo'shadi."""
+        stats = self._stats_for(sql)
+        if stats is None:
+            return
+        stats.count += 1
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.rows += max(rows, 0)
+        stats.samples.append(duration_ms)
+
+    def record_lock_retry(self, sql: str) -> None:
+        """`retry_on_lock` qayta urinishini hisobga oladi."""
+        if stats := self._stats_for(sql):
+            stats.lock_retries += 1
+
+    def is_slow(self, duration_ms: float) -> bool:
+        return self.slow_threshold_ms > 0 and duration_ms >= self.slow_threshold_ms
+
+    def add_slow_query(self, sql: str, params: Any, duration_ms: float) -> Dict[str, Any]:
+        """
+        Sekin so'rovni jurnalga qo'shadi va yozuvni qaytaradi.
+        `plan` maydoni keyinroq `EXPLAIN QUERY PLAN` natijasi bilan to'ldiriladi.
+        """
+        entry: Dict[str, Any] = {
+            "statement": normalize_sql(sql),
+            "sql": sql.strip(),
+            "params": repr(params)[:200],
+            "duration_ms": round(duration_ms, 3),
+            "at": time.time(),
+            "plan": None,
+        }
+        self._slowlog.append(entry)
+        return entry
+
+    def get_profile(self, sort_by: str = "total_ms", limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        """So'rovlar statistikasini `sort_by` bo'yicha kamayish tartibida qaytaradi."""
+        if sort_by not in PROFILE_SORT_KEYS:
+            raise ValueError(f"Noma'lum saralash kaliti: {sort_by}. Mumkin: {', '.join(PROFILE_SORT_KEYS)}")
+        rows = [stats.as_dict() for stats in self._statements.values()]
+        rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def get_slowlog(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Sekin so'rovlar jurnali, eng yangisi birinchi."""
+        entries = list(reversed(self._slowlog))
+        return entries[:limit] if limit else entries
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            "statements": len(self._statements),
+            "queries": sum(s.count for s in self._statements.values()),
+            "total_ms": round(sum(s.total_ms for s in self._statements.values()), 3),
+            "lock_retries": sum(s.lock_retries for s in self._statements.values()),
+            "slow_queries": len(self._slowlog),
+            "dropped": self._dropped,
+            "since": self._started_at,
+        }
+
+    def reset(self, slowlog: bool = True) -> None:
+        self._statements.clear()
+        self._dropped = 0
+        self._started_at = time.time()
+        if slowlog:
+            self._slowlog.clear()
+
+    def clear_slowlog(self) -> None:
+        self._slowlog.clear()
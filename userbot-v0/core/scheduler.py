@@ -76,6 +76,36 @@ class SchedulerManager:
         else:
             logger.info(f"Tizim vazifasi '{job_id_vacuum}' allaqachon rejalashtirilgan.")
 
+        task_key_inc_vacuum = "system.incremental_vacuum_db"
+        job_id_inc_vacuum = "system_incremental_vacuum"
+
+        if not self.scheduler.get_job(job_id_inc_vacuum):
+            if runner := self.app_context.tasks.get_task_runner(key=task_key_inc_vacuum):
+                try:
+                    self.scheduler.add_job(runner, trigger=IntervalTrigger(minutes=15, timezone="Asia/Tashkent"), id=job_id_inc_vacuum, replace_existing=True)
+                    logger.info(f"✅ Tizim vazifasi '{task_key_inc_vacuum}' har 15 daqiqada ishlashga rejalashtirildi.")
+                except Exception:
+                    logger.exception(f"Tizim vazifasi '{task_key_inc_vacuum}'ni rejalashtirib bo'lmadi.")
+            else:
+                logger.error(f"Rejalashtirish uchun '{task_key_inc_vacuum}' kalitli tizim vazifasi topilmadi. Vazifa ro'yxatdan o'tganligini tekshiring.")
+        else:
+            logger.info(f"Tizim vazifasi '{job_id_inc_vacuum}' allaqachon rejalashtirilgan.")
+
+        task_key_search = "system.search_index_sync"
+        job_id_search = "system_search_index_sync"
+
+        if not self.scheduler.get_job(job_id_search):
+            if runner := self.app_context.tasks.get_task_runner(key=task_key_search):
+                try:
+                    self.scheduler.add_job(runner, trigger=IntervalTrigger(minutes=1, timezone="Asia/Tashkent"), id=job_id_search, replace_existing=True)
+                    logger.info(f"✅ Tizim vazifasi '{task_key_search}' har daqiqada ishlashga rejalashtirildi.")
+                except Exception:
+                    logger.exception(f"Tizim vazifasi '{task_key_search}'ni rejalashtirib bo'lmadi.")
+            else:
+                logger.error(f"Rejalashtirish uchun '{task_key_search}' kalitli tizim vazifasi topilmadi. Vazifa ro'yxatdan o'tganligini tekshiring.")
+        else:
+            logger.info(f"Tizim vazifasi '{job_id_search}' allaqachon rejalashtirilgan.")
+
     def _create_trigger(self, trigger_type: str, trigger_args: Dict[str, Any]):
         """
         Trigger ob'ektini yaratadi. Noma'lum trigger turi yoki xato yuz bersa, QueryError tashlaydi.
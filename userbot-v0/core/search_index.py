@@ -0,0 +1,190 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+# snippet() natijasidagi moslik chegaralari; HTML ga o'tkazishdan oldin matn xavfsiz ekranlanadi
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+_TERM_RE = re.compile(r'"[^"]*"\*?|\S+')
+_OPERATORS = {"OR", "AND", "NOT"}
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """Qidiruv manbasi: asosiy jadval, unga mos FTS5 jadvali va natija ustunlari."""
+    name: str
+    order: int
+    table: str
+    fts_table: str
+    key_column: str
+    account_column: str
+    chat_column: str
+    columns: str
+    # True bo'lsa manba yozuv paytida emas, `sync_search_index` orqali partiyalarda indekslanadi
+    incremental: bool = False
+
+
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    "journal": SearchSource(
+        name="journal", order=0, table="message_journal", fts_table="message_journal_fts",
+        key_column="id", account_column="account_id", chat_column="chat_id",
+        columns="t.chat_id, t.message_id, t.sender_id, t.event AS label, t.created_at, snippet(message_journal_fts, 0, ?, ?, '…', 12)",
+        incremental=True,
+    ),
+    "afk": SearchSource(
+        name="afk", order=1, table="afk_mentions", fts_table="afk_mentions_fts",
+        key_column="id", account_column="afk_account_id", chat_column="chat_id",
+        columns="t.chat_id, t.message_id, t.chatter_id AS sender_id, 'mention' AS label, t.mention_time AS created_at, snippet(afk_mentions_fts, 0, ?, ?, '…', 12)",
+        incremental=True,
+    ),
+    "notes": SearchSource(
+        name="notes", order=2, table="notes", fts_table="notes_fts",
+        key_column="rowid", account_column="account_id", chat_column="source_chat_id",
+        columns="t.source_chat_id AS chat_id, t.source_message_id AS message_id, NULL AS sender_id, t.name AS label, t.created_at, snippet(notes_fts, -1, ?, ?, '…', 12)",
+    ),
+}
+
+
+def build_match_query(text: str) -> str:
+    """
+    Foydalanuvchi kiritgan matnni xavfsiz FTS5 MATCH ifodasiga aylantiradi.
+    Har bir so'z qo'shtirnoqqa olinadi (maxsus belgilar sintaksis xatosi bermasligi uchun),
+    `so'z*` prefiks qidiruvi, `"ibora"` hamda so'zlar orasidagi OR/AND/NOT saqlanadi.
+    """
+    terms: List[str] = []
+    for token in _TERM_RE.findall(text or ""):
+        if token in _OPERATORS:
+            if terms and terms[-1] not in _OPERATORS:
+                terms.append(token)
+            continue
+        prefix = token.endswith("*")
+        body = token.rstrip("*")
+        if len(body) >= 2 and body.startswith('"') and body.endswith('"'):
+            body = body[1:-1]
+        body = body.replace('"', '""').strip()
+        if body:
+            terms.append(f'"{body}"' + ("*" if prefix else ""))
+    while terms and terms[-1] in _OPERATORS:
+        terms.pop()
+    return " ".join(terms)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Natija qatoridan keyingi sahifa uchun (rank, manba, kalit) kursorini yasaydi."""
+    return f"{float(row['rank'])!r}:{SEARCH_SOURCES[row['source']].order}:{row['row_key']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int, int]:
+    try:
+        rank, order, key = cursor.split(":")
+        return float(rank), int(order), int(key)
+    except ValueError:
+        raise ValueError(f"Noto'g'ri kursor: {cursor}") from None
+
+
+async def sync_source(db: "AsyncDatabase", source: SearchSource, batch_size: int = 500, max_batches: Optional[int] = None, pause: float = 0.0) -> int:
+    """
+    Manbaning hali indekslanmagan qatorlarini (`search_index_state.last_rowid` dan keyin)
+    `batch_size` lik partiyalarda FTS ga qo'shadi. Har bir partiya alohida qisqa tranzaksiya;
+    belgi ham shu tranzaksiyada yangilanadi, shuning uchun qator ikki marta indekslanmaydi.
+    """
+    text_columns = await _fts_columns(db, source.fts_table)
+    column_list = ", ".join(text_columns)
+    indexed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        async with db.transaction() as cursor:
+            await cursor.execute("SELECT last_rowid FROM search_index_state WHERE source = ?", (source.table,))
+            row = await cursor.fetchone()
+            last_rowid = row[0] if row else 0
+            await cursor.execute(
+                f"SELECT max({source.key_column}), count(*) FROM (SELECT {source.key_column} FROM {source.table} WHERE {source.key_column} > ? ORDER BY {source.key_column} LIMIT ?)",
+                (last_rowid, batch_size),
+            )
+            upper_rowid, count = await cursor.fetchone()
+            if upper_rowid is None:
+                break
+            await cursor.execute(
+                f"INSERT INTO {source.fts_table} (rowid, {column_list}) SELECT {source.key_column}, {column_list} FROM {source.table} WHERE {source.key_column} > ? AND {source.key_column} <= ?",
+                (last_rowid, upper_rowid),
+            )
+            await cursor.execute(
+                """
+                INSERT INTO search_index_state (source, last_rowid) VALUES (?, ?)
+                ON CONFLICT(source) DO UPDATE SET last_rowid = excluded.last_rowid, updated_at = CURRENT_TIMESTAMP
+                """,
+                (source.table, upper_rowid),
+            )
+        indexed += count
+        batches += 1
+        if pause:
+            await asyncio.sleep(pause)
+    if indexed:
+        logger.debug(f"🔎 '{source.table}': {indexed} ta yangi qator qidiruv indeksiga qo'shildi ({batches} partiya).")
+    return indexed
+
+
+async def sync_all(db: "AsyncDatabase", batch_size: int = 500, max_batches: Optional[int] = None, pause: float = 0.0) -> Dict[str, int]:
+    """Barcha partiyalab indekslanadigan manbalarni yangilaydi."""
+    return {
+        source.name: await sync_source(db, source, batch_size=batch_size, max_batches=max_batches, pause=pause)
+        for source in SEARCH_SOURCES.values() if source.incremental
+    }
+
+
+async def _fts_columns(db: "AsyncDatabase", fts_table: str) -> List[str]:
+    rows = await db.fetchall(f"PRAGMA table_info('{fts_table}')")
+    return [row["name"] for row in rows]
+
+
+async def search(
+    db: "AsyncDatabase",
+    query: str,
+    account_id: int,
+    *,
+    sources: Optional[Sequence[str]] = None,
+    chat_id: Optional[int] = None,
+    after: Optional[str] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Tanlangan manbalar bo'yicha bm25 reytingi (kichigi yaxshiroq) bilan qidiradi.
+    Sahifalash OFFSET emas, (rank, manba, kalit) kursori orqali: `after` oldingi sahifaning
+    oxirgi qatoridan `encode_cursor` bilan olinadi. Natijada `snippet` maydonida mos so'zlar
+    `HIGHLIGHT_START`/`HIGHLIGHT_END` belgilari bilan o'ralgan bo'ladi.
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+    selected = [SEARCH_SOURCES[name] for name in (sources or SEARCH_SOURCES.keys())]
+
+    parts: List[str] = []
+    params: List[Any] = []
+    for source in selected:
+        sql = (
+            f"SELECT '{source.name}' AS source, {source.order} AS source_order, t.{source.key_column} AS row_key, "
+            f"{source.columns} AS snippet, bm25({source.fts_table}) AS rank "
+            f"FROM {source.fts_table} JOIN {source.table} t ON t.{source.key_column} = {source.fts_table}.rowid "
+            f"WHERE {source.fts_table} MATCH ? AND t.{source.account_column} = ?"
+        )
+        params.extend([HIGHLIGHT_START, HIGHLIGHT_END, match, account_id])
+        if chat_id is not None:
+            sql += f" AND t.{source.chat_column} = ?"
+            params.append(chat_id)
+        parts.append(sql)
+
+    sql = f"SELECT * FROM ({' UNION ALL '.join(parts)})"
+    if after:
+        sql += " WHERE (rank, source_order, row_key) > (?, ?, ?)"
+        params.extend(decode_cursor(after))
+    sql += " ORDER BY rank, source_order, row_key LIMIT ?"
+    params.append(limit)
+    return await db.fetchall(sql, tuple(params))
@@ -0,0 +1,150 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import tempfile
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Any, List, Optional, Sequence, Tuple
+
+import aiosqlite
+from loguru import logger
+
+from .adhoc_query import open_readonly_connection
+from .exceptions import QueryError
+
+# zstd ixtiyoriy: kutubxona o'rnatilmagan bo'lsa faqat gzip mavjud
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+EXPORT_FORMATS = ("csv", "json", "jsonl")
+EXPORT_COMPRESSIONS = ("gzip", "zstd")
+_COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+@dataclass
+class ExportResult:
+    """Tayyor eksport: boshiga qaytarilgan vaqtinchalik fayl (chaqiruvchi yopadi) va ko'rsatkichlar."""
+    file: IO[bytes]
+    filename: str
+    rows: int
+    size_bytes: int
+    columns: List[str]
+
+
+def available_compressions() -> Tuple[str, ...]:
+    return tuple(c for c in EXPORT_COMPRESSIONS if c != "zstd" or zstandard is not None)
+
+
+class _Encoder:
+    """Qatorlar bo'lagini tanlangan formatda (siqib) faylga yozadi. Ishchi oqimda chaqiriladi."""
+
+    def __init__(self, sink: IO[bytes], fmt: str, compression: Optional[str], columns: List[str]):
+        self._sink = sink
+        self._compressor: Optional[IO[bytes]] = None
+        if compression == "gzip":
+            self._compressor = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6)
+        elif compression == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3).stream_writer(sink, closefd=False)
+        self._text = io.TextIOWrapper(self._compressor or sink, encoding="utf-8", newline="")
+        self._fmt = fmt
+        self._columns = columns
+        self._rows = 0
+        self._csv = csv.writer(self._text) if fmt == "csv" else None
+        if self._csv:
+            self._csv.writerow(columns)
+
+    def write(self, rows: Sequence[Tuple[Any, ...]]) -> None:
+        if self._csv:
+            self._csv.writerows(rows)
+        elif self._fmt == "jsonl":
+            self._text.writelines(json.dumps(dict(zip(self._columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows)
+        else:
+            for row in rows:
+                self._text.write("[\n" if self._rows == 0 else ",\n")
+                self._text.write(json.dumps(dict(zip(self._columns, row)), indent=2, ensure_ascii=False, default=str))
+                self._rows += 1
+
+    def finish(self) -> None:
+        if self._fmt == "json":
+            self._text.write("[]" if self._rows == 0 else "\n]")
+        self._text.flush()
+        self._text.detach()
+        if self._compressor is not None:
+            # Siqish oqimini yakunlaydi; asosiy fayl ochiq qoladi
+            self._compressor.close()
+        self._sink.flush()
+
+
+async def _table_columns(conn: aiosqlite.Connection, table: str) -> List[str]:
+    async with conn.execute(f'PRAGMA table_info("{table}")') as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def export_table(
+    db: "AsyncDatabase",
+    table: str,
+    *,
+    fmt: str = "csv",
+    columns: Optional[Sequence[str]] = None,
+    where: Optional[str] = None,
+    compression: Optional[str] = None,
+    chunk_size: int = 1000,
+    spool_max_bytes: int = 8 * 1024 * 1024,
+) -> ExportResult:
+    """
+    Jadvalni oqim sifatida eksport qiladi: alohida faqat o'qish uchun ulanishdagi kursordan
+    `chunk_size` lik bo'laklar formatlanib (CSV / JSON / JSON Lines), ixtiyoriy gzip/zstd bilan
+    siqilib, `spool_max_bytes` dan katta bo'lsa diskka o'tadigan vaqtinchalik faylga yoziladi.
+    Xotira sarfi jadval hajmiga bog'liq emas. `columns` faqat jadvaldagi mavjud ustunlarni qabul
+    qiladi; `where` faqat o'qish uchun ulanishda bajariladigan ixtiyoriy SQL sharti.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Noto'g'ri format: {fmt}. Mumkin: {', '.join(EXPORT_FORMATS)}")
+    if compression and compression not in available_compressions():
+        raise ValueError(f"Siqish turi mavjud emas: {compression}. Mumkin: {', '.join(available_compressions())}")
+    if not table.isidentifier():
+        raise ValueError("Noto'g'ri jadval nomi.")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode="w+b")
+    try:
+        async with open_readonly_connection(db) as conn:
+            table_columns = await _table_columns(conn, table)
+            if not table_columns:
+                raise ValueError(f"'{table}' jadvali mavjud emas.")
+            selected = list(columns) if columns else table_columns
+            if unknown := [c for c in selected if c not in table_columns]:
+                raise ValueError(f"'{table}' jadvalida bunday ustunlar yo'q: {', '.join(unknown)}")
+
+            column_list = ", ".join(f'"{c}"' for c in selected)
+            sql = f'SELECT {column_list} FROM "{table}"'
+            if where:
+                sql += f" WHERE {where}"
+
+            encoder = _Encoder(spool, fmt, compression, selected)
+            rows = 0
+            try:
+                async with conn.execute(sql) as cursor:
+                    while chunk := await cursor.fetchmany(chunk_size):
+                        # Formatlash va siqish event loop'ni band qilmasin
+                        await asyncio.to_thread(encoder.write, chunk)
+                        rows += len(chunk)
+            except aiosqlite.Error as e:
+                raise QueryError(f"Eksport so'rovi bajarilmadi: {e}") from e
+            await asyncio.to_thread(encoder.finish)
+
+        size = spool.tell()
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+
+    filename = f"{table}_export.{fmt}{_COMPRESSION_SUFFIXES.get(compression or '', '')}"
+    logger.debug(f"Eksport '{table}': {rows} qator, {size} bayt ({fmt}, {compression or 'siqilmagan'}).")
+    return ExportResult(file=spool, filename=filename, rows=rows, size_bytes=size, columns=selected)
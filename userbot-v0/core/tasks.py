@@ -10,6 +10,8 @@ from loguru import logger
 
 
 from .exceptions import DatabaseError, QueryError
+from .archive import archive_table_rows, open_month_before, prune_archives, seal_archives
+from .search_index import sync_all
 
 
 if TYPE_CHECKING:
@@ -388,30 +390,184 @@ class TaskRegistry:
 
 
 
+async def _purge_table_in_batches(db: "AsyncDatabase", table_name: str, date_column: str, cleanup_days: int, batch_size: int, pause: float) -> int:
+    """
+    Bitta jadvaldan eski yozuvlarni rowid oralig'i bo'yicha `batch_size` lik partiyalarda o'chiradi.
+    Har bir partiya alohida qisqa tranzaksiya; progress `retention_progress` ga yoziladi va
+    vazifa to'xtab qolsa, keyingi ishga tushishda o'sha cutoff va rowid dan davom etadi.
+    """
+    progress = await db.fetchone("SELECT cutoff, last_rowid, deleted FROM retention_progress WHERE table_name = ?", (table_name,))
+    if progress:
+        cutoff, last_rowid, deleted = progress["cutoff"], progress["last_rowid"], progress["deleted"]
+        logger.info(f"🧹 '{table_name}' tozalash to'xtagan joyidan davom etmoqda (rowid > {last_rowid}, {deleted} ta allaqachon o'chirilgan).")
+    else:
+        cutoff = await db.fetch_val("SELECT date('now', ?)", (f"-{cleanup_days} days",))
+        last_rowid, deleted = 0, 0
+
+    batches = 0
+    while True:
+        upper_rowid = await db.fetch_val(
+            f"SELECT max(rowid) FROM (SELECT rowid FROM {table_name} WHERE rowid > ? AND {date_column} < ? ORDER BY rowid LIMIT ?)",
+            (last_rowid, cutoff, batch_size),
+        )
+        if upper_rowid is None:
+            break
+
+        async with db.transaction():
+            batch_deleted = await db.execute(
+                f"DELETE FROM {table_name} WHERE rowid > ? AND rowid <= ? AND {date_column} < ?",
+                (last_rowid, upper_rowid, cutoff),
+            )
+            await db.execute(
+                """
+                INSERT INTO retention_progress (table_name, cutoff, last_rowid, deleted) VALUES (?, ?, ?, ?)
+                ON CONFLICT(table_name) DO UPDATE SET last_rowid = excluded.last_rowid, deleted = excluded.deleted, updated_at = CURRENT_TIMESTAMP
+                """,
+                (table_name, cutoff, upper_rowid, deleted + batch_deleted),
+            )
+        last_rowid = upper_rowid
+        deleted += batch_deleted
+        batches += 1
+        logger.debug(f"🧹 '{table_name}': {batches}-partiya, jami {deleted} ta o'chirildi (rowid <= {last_rowid}).")
+        # Partiyalar orasida boshqa yozuvchilarga navbat beramiz
+        await asyncio.sleep(pause)
+
+    await db.execute("DELETE FROM retention_progress WHERE table_name = ?", (table_name,))
+    return deleted
+
+
+async def _maintain_archives(target: "AsyncDatabase", db: "AsyncDatabase", config: "ConfigManager", cleanup_days: int) -> None:
+    """Endi qator qo'shilmaydigan oylarni siqadi va `DB_ARCHIVE_KEEP_MONTHS` dan eski arxivlarni o'chiradi."""
+    max_archive_days = max(db.get_cleanup_retention_days(table) or cleanup_days for table in db.get_archive_tables())
+    await seal_archives(target, open_month_before(max_archive_days))
+    if removed := prune_archives(target, int(config.get("DB_ARCHIVE_KEEP_MONTHS", 12))):
+        logger.info(f"🗄 {removed} ta eski oylik arxiv o'chirildi.")
+
+
 async def cleanup_old_database_entries(db: "AsyncDatabase", config: "ConfigManager"):
     cleanup_days = config.get("DB_CLEANUP_DAYS", 7)
+    batch_size = int(config.get("DB_CLEANUP_BATCH_SIZE", 500))
+    pause = float(config.get("DB_CLEANUP_BATCH_PAUSE_MS", 50)) / 1000
     logger.info(f"🧹 Ma'lumotlar bazasini tozalash vazifasi ishga tushdi. {cleanup_days} kundan eski yozuvlar o'chiriladi...")
 
     try:
-        async with db.transaction():
+        tables_to_clean = db.get_cleanup_configurations()
 
-            tables_to_clean = db.get_cleanup_configurations()
+        archive_tables = db.get_archive_tables()
+        archive_enabled = bool(config.get("DB_ARCHIVE_ENABLED", True))
 
-            total_deleted_count = 0
+        total_deleted_count = 0
+        total_archived_count = 0
+        # Sharding yoqilgan bo'lsa har bir shard fayli alohida, o'z tranzaksiyalarida tozalanadi
+        # retention_progress jadvali V013 migratsiyasida yaratiladi (shardlarda ham)
+        for target in await db.all_databases():
             for table_name, date_column in tables_to_clean.items():
-                deleted_count = await db.execute(
-                    f"DELETE FROM {table_name} WHERE {date_column} < date('now', '-{cleanup_days} days')",
-                )
+                retention_days = db.get_cleanup_retention_days(table_name) or cleanup_days
+                if archive_enabled and table_name in archive_tables:
+                    moved_count = await archive_table_rows(target, table_name, date_column, retention_days, batch_size, pause)
+                    if moved_count > 0:
+                        logger.info(f"🗄 '{table_name}' jadvalidan {moved_count} ta eski yozuv arxivga ko'chirildi.")
+                        total_archived_count += moved_count
+                    continue
+                deleted_count = await _purge_table_in_batches(target, table_name, date_column, retention_days, batch_size, pause)
                 if deleted_count > 0:
                     logger.info(f"🧹 '{table_name}' jadvalidan {deleted_count} ta eski yozuv o'chirildi.")
                     total_deleted_count += deleted_count
 
+            if archive_enabled and archive_tables:
+                await _maintain_archives(target, db, config, cleanup_days)
+
+        if total_archived_count:
+            logger.info(f"🗄 Jami {total_archived_count} ta yozuv oylik arxivlarga ko'chirildi.")
         logger.success(f"✅ Ma'lumotlar bazasini tozalash vazifasi muvaffaqiyatli yakunlandi. Jami {total_deleted_count} ta yozuv o'chirildi.")
     except Exception as e:
         logger.exception(f"💥 Ma'lumotlar bazasini tozalash vaqtida xatolik yuz berdi: {e}")
 
 
-async def vacuum_database(db: "AsyncDatabase"):
+async def _reclaim_free_pages(db: "AsyncDatabase", config: "ConfigManager", min_free_ratio: float) -> int:
+    """
+    Bo'sh sahifalarni `PRAGMA incremental_vacuum` bilan kichik bo'laklarda qaytaradi.
+    Bo'laklar faqat baza bo'sh turganda (oxirgi yozuvdan `DB_VACUUM_IDLE_SECONDS` o'tgach) bajariladi.
+    """
+    storage = await db.get_storage_stats()
+    if storage.get("auto_vacuum") != "INCREMENTAL":
+        logger.info("ℹ️ auto_vacuum=INCREMENTAL yoqilmagan. Haftalik VACUUM bazani shu rejimga o'tkazadi.")
+        return 0
+    if not storage["freelist_count"] or storage["free_ratio"] < min_free_ratio:
+        logger.debug(f"Bo'sh sahifalar ulushi {storage['free_ratio']:.1%}, qayta egallash shart emas.")
+        return 0
+
+    slice_pages = int(config.get("DB_VACUUM_SLICE_PAGES", 256))
+    idle_seconds = float(config.get("DB_VACUUM_IDLE_SECONDS", 5))
+    deadline = time.monotonic() + float(config.get("DB_VACUUM_MAX_SECONDS", 60))
+
+    total_freed = 0
+    while time.monotonic() < deadline:
+        if db.seconds_since_last_write() < idle_seconds:
+            await asyncio.sleep(min(idle_seconds, 1.0))
+            continue
+        freed = await db.incremental_vacuum(slice_pages)
+        total_freed += freed
+        if freed < slice_pages:
+            break
+        await asyncio.sleep(0.05)
+    return total_freed
+
+
+async def incremental_vacuum_database(db: "AsyncDatabase", config: "ConfigManager"):
+    min_free_ratio = float(config.get("DB_VACUUM_MIN_FREE_RATIO", 0.1))
+    try:
+        for target in await db.all_databases():
+            freed = await _reclaim_free_pages(target, config, min_free_ratio)
+            if freed:
+                logger.info(f"🧩 incremental_vacuum: {freed} ta bo'sh sahifa qaytarildi.")
+    except Exception as e:
+        logger.exception(f"💥 incremental_vacuum vaqtida xatolik yuz berdi: {e}")
+
+
+async def sync_search_index(db: "AsyncDatabase", config: "ConfigManager"):
+    """Jurnal va AFK eslatmalarining yangi qatorlarini FTS indeksiga partiyalarda qo'shadi."""
+    batch_size = int(config.get("DB_SEARCH_INDEX_BATCH_SIZE", 500))
+    pause = float(config.get("DB_CLEANUP_BATCH_PAUSE_MS", 50)) / 1000
+    try:
+        # Navbatdagi jurnal yozuvlari ham shu yurishda indekslansin
+        await db.flush_writes()
+        for target in await db.all_databases():
+            indexed = await sync_all(target, batch_size=batch_size, pause=pause)
+            if total := sum(indexed.values()):
+                logger.info(f"🔎 Qidiruv indeksi yangilandi: {total} ta qator ({indexed}).")
+    except Exception as e:
+        logger.exception(f"💥 Qidiruv indeksini yangilashda xatolik yuz berdi: {e}")
+
+
+async def vacuum_database(db: "AsyncDatabase", config: "ConfigManager"):
+    try:
+        targets = await db.all_databases()
+    except Exception as e:
+        logger.exception(f"💥 Ma'lumotlar bazasini VACUUM qilishda xatolik yuz berdi: {e}")
+        return
+    # Shardlar kichik fayllar: har biri alohida va navbat bilan VACUUM qilinadi
+    for target in targets:
+        await _vacuum_single_database(target, config)
+
+
+async def _vacuum_single_database(db: "AsyncDatabase", config: "ConfigManager"):
+    try:
+        # `.db stats` qatorlar sonini sqlite_stat1 dan taxminlaydi
+        await db.analyze()
+    except Exception as e:
+        logger.warning(f"ANALYZE bajarilmadi: {e}")
+    try:
+        storage = await db.get_storage_stats()
+        if storage.get("auto_vacuum") == "INCREMENTAL":
+            # Ulanishni yopmasdan barcha bo'sh sahifalarni qaytaramiz
+            freed = await _reclaim_free_pages(db, config, min_free_ratio=0.0)
+            logger.success(f"✅ Haftalik incremental_vacuum yakunlandi: {freed} ta sahifa qaytarildi.")
+            return
+    except Exception as e:
+        logger.exception(f"💥 Ma'lumotlar bazasini VACUUM qilishda xatolik yuz berdi: {e}")
+        return
+
     logger.info("⚙️ Ma'lumotlar bazasida VACUUM operatsiyasi boshlandi...")
     try:
         await db.vacuum()
@@ -444,5 +600,21 @@ def register_core_tasks(registry: TaskRegistry):
         retry_delay=300,
         timeout=1800
     )(vacuum_database)
+
+    registry.register(
+        key="system.incremental_vacuum_db",
+        description="Bo'sh sahifalarni bazani yopmasdan, kichik bo'laklarda qaytaradi.",
+        singleton=True,
+        retries=0,
+        timeout=600
+    )(incremental_vacuum_database)
+
+    registry.register(
+        key="system.search_index_sync",
+        description="Qidiruv (FTS5) indeksiga yangi xabarlarni partiyalarda qo'shadi.",
+        singleton=True,
+        retries=0,
+        timeout=300
+    )(sync_search_index)
     
-    logger.info("Core tizim vazifalari (cleanup, vacuum) muvaffaqiyatli ro'yxatdan o'tkazildi.")
\ No newline at end of file
+    logger.info("Core tizim vazifalari (cleanup, vacuum, incremental_vacuum, search_index_sync) muvaffaqiyatli ro'yxatdan o'tkazildi.")
\ No newline at end of file
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .database import AsyncDatabase
+
+
+WAL_CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+# Ketma-ket shuncha checkpoint WAL oxirigacha yetmasa ogohlantirish yoziladi
+STARVATION_WARN_RUNS = 3
+
+
+class WalManager:
+    """
+    `-wal` faylini fonda kuzatadi va checkpoint qiladi.
+    Bo'sh paytda (oxirgi yozuvdan `idle_seconds` o'tgach) PASSIVE checkpoint bajariladi;
+    WAL `budget_bytes` dan oshsa RESTART, u ham yordam bermasa keyingi qadamda TRUNCATE.
+    Checkpoint WAL oxirigacha yetmasa (uzoq o'qiyotgan ulanish eski snapshot'ni ushlab turibdi)
+    bu "starvation" sifatida hisoblanadi.
+    """
+
+    def __init__(self, db: "AsyncDatabase", *, check_interval: float, budget_bytes: int, idle_seconds: float, busy_timeout_ms: int):
+        self._db = db
+        self.check_interval = max(check_interval, 0.05)
+        self.budget_bytes = max(budget_bytes, 0)
+        self.idle_seconds = max(idle_seconds, 0.0)
+        self.busy_timeout_ms = max(busy_timeout_ms, 0)
+
+        self._task: Optional[asyncio.Task] = None
+        self._escalate = False
+        self._last_checkpoint_at = 0.0
+        self._consecutive_starved = 0
+        self._stats: Dict[str, Any] = {
+            "checkpoints": {mode.lower(): 0 for mode in WAL_CHECKPOINT_MODES},
+            "busy": 0,
+            "starved_runs": 0,
+            "errors": 0,
+            "max_wal_bytes": 0,
+            "last_checkpoint": None,
+        }
+
+    @property
+    def wal_path(self) -> Optional[Path]:
+        db_path = self._db.db_path
+        return db_path.with_name(f"{db_path.name}-wal") if db_path else None
+
+    def wal_size(self) -> int:
+        path = self.wal_path
+        try:
+            return path.stat().st_size if path else 0
+        except FileNotFoundError:
+            return 0
+
+    def _choose_mode(self, wal_bytes: int) -> Optional[str]:
+        if wal_bytes == 0:
+            return None
+        if self.budget_bytes and wal_bytes > self.budget_bytes:
+            return "TRUNCATE" if self._escalate else "RESTART"
+        # Oxirgi checkpoint'dan keyin yozuv bo'lmagan bo'lsa WAL allaqachon ko'chirilgan
+        since_write = self._db.seconds_since_last_write()
+        if since_write >= self.idle_seconds and since_write < time.monotonic() - self._last_checkpoint_at:
+            return "PASSIVE"
+        return None
+
+    async def run_once(self) -> Optional[Dict[str, Any]]:
+        """Bitta kuzatish qadami. Checkpoint bajarilgan bo'lsa uning natijasini qaytaradi."""
+        wal_bytes = self.wal_size()
+        self._stats["max_wal_bytes"] = max(self._stats["max_wal_bytes"], wal_bytes)
+        mode = self._choose_mode(wal_bytes)
+        if mode is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            busy, log_frames, checkpointed = await self._db.checkpoint(mode, busy_timeout_ms=self.busy_timeout_ms)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"WAL checkpoint ({mode}) bajarilmadi: {e}")
+            return None
+        self._last_checkpoint_at = time.monotonic()
+        if log_frames < 0:
+            # Baza WAL rejimida emas
+            return None
+
+        result = {
+            "mode": mode,
+            "busy": bool(busy),
+            "log_frames": log_frames,
+            "checkpointed_frames": checkpointed,
+            "wal_bytes_before": wal_bytes,
+            "wal_bytes_after": self.wal_size(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "at": time.time(),
+        }
+        self._stats["checkpoints"][mode.lower()] += 1
+        self._stats["last_checkpoint"] = result
+        if busy:
+            self._stats["busy"] += 1
+
+        if busy or checkpointed < log_frames:
+            self._stats["starved_runs"] += 1
+            self._consecutive_starved += 1
+            if self._consecutive_starved >= STARVATION_WARN_RUNS:
+                reader_seconds = self._db.longest_active_read_seconds()
+                logger.warning(
+                    f"WAL checkpoint {self._consecutive_starved} marta ketma-ket oxirigacha yetmadi "
+                    f"({checkpointed}/{log_frames} freym, WAL {wal_bytes / 1024 / 1024:.1f} MB). "
+                    f"Eng uzoq faol o'qish: {reader_seconds:.1f} s."
+                )
+        else:
+            self._consecutive_starved = 0
+        # RESTART ham WAL'ni byudjetga tushirmagan bo'lsa keyingi safar TRUNCATE
+        self._escalate = bool(self.budget_bytes) and (busy or result["wal_bytes_after"] > self.budget_bytes)
+
+        logger.debug(f"WAL checkpoint ({mode}): {checkpointed}/{log_frames} freym, {wal_bytes} -> {result['wal_bytes_after']} bayt.")
+        return result
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"WAL kuzatuvchisida kutilmagan xatolik: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "wal_bytes": self.wal_size(),
+            "budget_bytes": self.budget_bytes,
+            "running": self._task is not None and not self._task.done(),
+            "consecutive_starved": self._consecutive_starved,
+            "longest_read_seconds": round(self._db.longest_active_read_seconds(), 3),
+            **self._stats,
+            "checkpoints": dict(self._stats["checkpoints"]),
+        }
@@ -0,0 +1,10 @@
+-- =============================================================================
+-- MIGRATION: V010_hot_query_indexes.sql
+-- DESCRIPTION: Indekssiz (to'liq SCAN) ishlayotgan tez-tez chaqiriladigan so'rovlar uchun indekslar.
+-- =============================================================================
+
+-- afk.py: SELECT COUNT(id) FROM afk_mentions WHERE afk_account_id = ? AND chatter_id = ?
+CREATE INDEX IF NOT EXISTS idx_afk_mentions_account_chatter ON afk_mentions (afk_account_id, chatter_id);
+
+-- digest.py: ... FROM logged_media WHERE account_id=? AND timestamp >= ? GROUP BY source_chat_id
+CREATE INDEX IF NOT EXISTS idx_logged_media_account_timestamp ON logged_media (account_id, timestamp, source_chat_id);
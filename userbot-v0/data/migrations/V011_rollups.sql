@@ -0,0 +1,155 @@
+-- =============================================================================
+-- MIGRATION: V011_rollups.sql
+-- DESCRIPTION: task_logs, logged_media va ai_usage_stats uchun soatlik/kunlik yig'ma
+--              (rollup) jadvallar. Triggerlar ularni yozuv paytida yangilab boradi,
+--              shuning uchun hisobotlar xom qatorlarga bog'liq emas va ular tez o'chirilishi mumkin.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS task_logs_hourly (
+    bucket TEXT NOT NULL,
+    task_key TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    failure_count INTEGER NOT NULL DEFAULT 0,
+    timeout_count INTEGER NOT NULL DEFAULT 0,
+    skipped_count INTEGER NOT NULL DEFAULT 0,
+    total_duration_ms REAL NOT NULL DEFAULT 0,
+    max_duration_ms REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, task_key)
+);
+
+CREATE TABLE IF NOT EXISTS task_logs_daily (
+    bucket TEXT NOT NULL,
+    task_key TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    failure_count INTEGER NOT NULL DEFAULT 0,
+    timeout_count INTEGER NOT NULL DEFAULT 0,
+    skipped_count INTEGER NOT NULL DEFAULT 0,
+    total_duration_ms REAL NOT NULL DEFAULT 0,
+    max_duration_ms REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, task_key)
+);
+
+CREATE TABLE IF NOT EXISTS logged_media_hourly (
+    account_id BIGINT NOT NULL,
+    bucket TEXT NOT NULL,
+    source_chat_id BIGINT NOT NULL,
+    media_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, bucket, source_chat_id)
+);
+
+CREATE TABLE IF NOT EXISTS logged_media_daily (
+    account_id BIGINT NOT NULL,
+    bucket TEXT NOT NULL,
+    source_chat_id BIGINT NOT NULL,
+    media_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, bucket, source_chat_id)
+);
+
+CREATE TABLE IF NOT EXISTS ai_usage_hourly (
+    userbot_account_id BIGINT NOT NULL,
+    bucket TEXT NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (userbot_account_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS ai_usage_totals (
+    userbot_account_id BIGINT PRIMARY KEY NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Mavjud xom qatorlardan boshlang'ich to'ldirish
+INSERT OR IGNORE INTO task_logs_hourly
+SELECT strftime('%Y-%m-%d %H:00:00', run_at), task_key, count(*),
+       sum(status = 'SUCCESS'), sum(status = 'FAILURE'), sum(status = 'TIMEOUT'), sum(status = 'SKIPPED'),
+       sum(coalesce(duration_ms, 0)), max(coalesce(duration_ms, 0))
+FROM task_logs GROUP BY 1, 2;
+
+INSERT OR IGNORE INTO task_logs_daily
+SELECT date(run_at), task_key, count(*),
+       sum(status = 'SUCCESS'), sum(status = 'FAILURE'), sum(status = 'TIMEOUT'), sum(status = 'SKIPPED'),
+       sum(coalesce(duration_ms, 0)), max(coalesce(duration_ms, 0))
+FROM task_logs GROUP BY 1, 2;
+
+INSERT OR IGNORE INTO logged_media_hourly
+SELECT account_id, strftime('%Y-%m-%d %H:00:00', timestamp), source_chat_id, count(*), sum(coalesce(file_size, 0))
+FROM logged_media GROUP BY 1, 2, 3;
+
+INSERT OR IGNORE INTO logged_media_daily
+SELECT account_id, date(timestamp), source_chat_id, count(*), sum(coalesce(file_size, 0))
+FROM logged_media GROUP BY 1, 2, 3;
+
+INSERT OR IGNORE INTO ai_usage_totals
+SELECT userbot_account_id, sum(call_count) FROM ai_usage_stats GROUP BY 1;
+
+-- Yozuv paytida yig'malarni yangilovchi triggerlar
+CREATE TRIGGER IF NOT EXISTS trg_task_logs_rollup AFTER INSERT ON task_logs
+BEGIN
+    INSERT INTO task_logs_hourly VALUES (
+        strftime('%Y-%m-%d %H:00:00', NEW.run_at), NEW.task_key, 1,
+        NEW.status = 'SUCCESS', NEW.status = 'FAILURE', NEW.status = 'TIMEOUT', NEW.status = 'SKIPPED',
+        coalesce(NEW.duration_ms, 0), coalesce(NEW.duration_ms, 0)
+    )
+    ON CONFLICT(bucket, task_key) DO UPDATE SET
+        runs = runs + 1,
+        success_count = success_count + excluded.success_count,
+        failure_count = failure_count + excluded.failure_count,
+        timeout_count = timeout_count + excluded.timeout_count,
+        skipped_count = skipped_count + excluded.skipped_count,
+        total_duration_ms = total_duration_ms + excluded.total_duration_ms,
+        max_duration_ms = max(max_duration_ms, excluded.max_duration_ms);
+
+    INSERT INTO task_logs_daily VALUES (
+        date(NEW.run_at), NEW.task_key, 1,
+        NEW.status = 'SUCCESS', NEW.status = 'FAILURE', NEW.status = 'TIMEOUT', NEW.status = 'SKIPPED',
+        coalesce(NEW.duration_ms, 0), coalesce(NEW.duration_ms, 0)
+    )
+    ON CONFLICT(bucket, task_key) DO UPDATE SET
+        runs = runs + 1,
+        success_count = success_count + excluded.success_count,
+        failure_count = failure_count + excluded.failure_count,
+        timeout_count = timeout_count + excluded.timeout_count,
+        skipped_count = skipped_count + excluded.skipped_count,
+        total_duration_ms = total_duration_ms + excluded.total_duration_ms,
+        max_duration_ms = max(max_duration_ms, excluded.max_duration_ms);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_logged_media_rollup AFTER INSERT ON logged_media
+BEGIN
+    INSERT INTO logged_media_hourly VALUES (
+        NEW.account_id, strftime('%Y-%m-%d %H:00:00', NEW.timestamp), NEW.source_chat_id, 1, coalesce(NEW.file_size, 0)
+    )
+    ON CONFLICT(account_id, bucket, source_chat_id) DO UPDATE SET
+        media_count = media_count + 1,
+        total_bytes = total_bytes + excluded.total_bytes;
+
+    INSERT INTO logged_media_daily VALUES (
+        NEW.account_id, date(NEW.timestamp), NEW.source_chat_id, 1, coalesce(NEW.file_size, 0)
+    )
+    ON CONFLICT(account_id, bucket, source_chat_id) DO UPDATE SET
+        media_count = media_count + 1,
+        total_bytes = total_bytes + excluded.total_bytes;
+END;
+
+-- ai_usage_stats o'zi kunlik yig'ma; soatlik taqsimot va umumiy son shu yerda yuritiladi
+CREATE TRIGGER IF NOT EXISTS trg_ai_usage_rollup_insert AFTER INSERT ON ai_usage_stats
+BEGIN
+    INSERT INTO ai_usage_hourly VALUES (NEW.userbot_account_id, strftime('%Y-%m-%d %H:00:00', 'now', 'localtime'), NEW.call_count)
+    ON CONFLICT(userbot_account_id, bucket) DO UPDATE SET call_count = call_count + excluded.call_count;
+
+    INSERT INTO ai_usage_totals VALUES (NEW.userbot_account_id, NEW.call_count)
+    ON CONFLICT(userbot_account_id) DO UPDATE SET call_count = call_count + excluded.call_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ai_usage_rollup_update AFTER UPDATE OF call_count ON ai_usage_stats
+WHEN NEW.call_count > OLD.call_count
+BEGIN
+    INSERT INTO ai_usage_hourly VALUES (NEW.userbot_account_id, strftime('%Y-%m-%d %H:00:00', 'now', 'localtime'), NEW.call_count - OLD.call_count)
+    ON CONFLICT(userbot_account_id, bucket) DO UPDATE SET call_count = call_count + excluded.call_count;
+
+    INSERT INTO ai_usage_totals VALUES (NEW.userbot_account_id, NEW.call_count - OLD.call_count)
+    ON CONFLICT(userbot_account_id) DO UPDATE SET call_count = call_count + excluded.call_count;
+END;
@@ -0,0 +1,97 @@
+-- =============================================================================
+-- MIGRATION: V012_search_fts.sql
+-- DESCRIPTION: FTS5 to'liq matnli qidiruv: log_text xabarlari jurnali (message_journal),
+--              notes.content va afk_mentions.message_text uchun indekslar.
+--              message_journal va afk_mentions tez o'sadi, shuning uchun ular yozuv paytida
+--              emas, `system.search_index_sync` vazifasi tomonidan partiyalarda indekslanadi
+--              (search_index_state dagi rowid belgisidan boshlab). Eslatmalar kam yoziladi,
+--              ular triggerlar orqali darhol indekslanadi.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS message_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id BIGINT NOT NULL,
+    chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    sender_id BIGINT,
+    event TEXT NOT NULL CHECK (event IN ('new', 'edit', 'delete')),
+    text TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_message_journal_account_chat ON message_journal (account_id, chat_id, message_id);
+CREATE INDEX IF NOT EXISTS idx_message_journal_created_at ON message_journal (created_at);
+
+-- Partiyalab indekslanadigan manbalar uchun oxirgi indekslangan rowid
+CREATE TABLE IF NOT EXISTS search_index_state (
+    source TEXT PRIMARY KEY NOT NULL,
+    last_rowid INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT OR IGNORE INTO search_index_state (source, last_rowid) VALUES ('message_journal', 0), ('afk_mentions', 0);
+
+-- --- Tashqi kontentli (external content) FTS5 jadvallari: matn faqat asosiy jadvalda saqlanadi ---
+
+CREATE VIRTUAL TABLE IF NOT EXISTS message_journal_fts USING fts5(
+    text, content='message_journal', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS afk_mentions_fts USING fts5(
+    message_text, content='afk_mentions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+-- Eslatmalar kichik jadval: notes_fts o'z nusxasini saqlaydi, shunda FTS dan o'chirish
+-- idempotent bo'ladi (REPLACE/UPSERT oqimlarida ikki marta o'chirish indeksni buzmaydi).
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    name, content, tokenize='unicode61 remove_diacritics 2'
+);
+
+-- --- Partiyalab indekslanadigan jadvallar: faqat allaqachon indekslangan qatorlar FTS dan olinadi ---
+
+CREATE TRIGGER IF NOT EXISTS trg_message_journal_fts_delete AFTER DELETE ON message_journal
+WHEN old.id <= (SELECT last_rowid FROM search_index_state WHERE source = 'message_journal')
+BEGIN
+    INSERT INTO message_journal_fts (message_journal_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_afk_mentions_fts_delete AFTER DELETE ON afk_mentions
+WHEN old.id <= (SELECT last_rowid FROM search_index_state WHERE source = 'afk_mentions')
+BEGIN
+    INSERT INTO afk_mentions_fts (afk_mentions_fts, rowid, message_text) VALUES ('delete', old.id, old.message_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_afk_mentions_fts_update AFTER UPDATE OF message_text ON afk_mentions
+WHEN old.id <= (SELECT last_rowid FROM search_index_state WHERE source = 'afk_mentions')
+BEGIN
+    INSERT INTO afk_mentions_fts (afk_mentions_fts, rowid, message_text) VALUES ('delete', old.id, old.message_text);
+    INSERT INTO afk_mentions_fts (rowid, message_text) VALUES (new.id, new.message_text);
+END;
+
+-- --- notes: darhol indekslash ---
+-- notes.py `REPLACE INTO` ishlatadi; recursive_triggers o'chiq bo'lgani uchun almashtirilgan
+-- qatorda AFTER DELETE ishlamaydi, shu sababli eski yozuv BEFORE INSERT da FTS dan olinadi.
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_fts_replace BEFORE INSERT ON notes
+BEGIN
+    DELETE FROM notes_fts WHERE rowid IN (SELECT rowid FROM notes WHERE account_id = new.account_id AND name = new.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_fts_insert AFTER INSERT ON notes
+BEGIN
+    INSERT INTO notes_fts (rowid, name, content) VALUES (new.rowid, new.name, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_fts_delete AFTER DELETE ON notes
+BEGIN
+    DELETE FROM notes_fts WHERE rowid = old.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_fts_update AFTER UPDATE ON notes
+BEGIN
+    DELETE FROM notes_fts WHERE rowid = old.rowid;
+    INSERT INTO notes_fts (rowid, name, content) VALUES (new.rowid, new.name, new.content);
+END;
+
+-- Mavjud eslatmalarni indeksga qo'shish
+INSERT INTO notes_fts (rowid, name, content) SELECT rowid, name, content FROM notes;
@@ -0,0 +1,14 @@
+-- =============================================================================
+-- MIGRATION: V013_retention_progress.sql
+-- DESCRIPTION: Partiyalab tozalash (cleanup_old_database_entries) progressi: jadval bo'yicha
+--              joriy chegara sanasi, oxirgi o'chirilgan rowid va o'chirilgan qatorlar soni.
+--              Vazifa to'xtab qolsa, keyingi ishga tushishda shu joydan davom etadi.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS retention_progress (
+    table_name TEXT PRIMARY KEY NOT NULL,
+    cutoff TEXT NOT NULL,
+    last_rowid INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -30,8 +30,22 @@ async def run_application_lifecycle(static_settings: StaticSettings):
     state = AppState()
     config.set_db_instance(db)
     
-    db.register_cleanup_table("afk_mentions", "mention_time")
-    db.register_cleanup_table("logged_media", "timestamp")
+    # Tarixiy jurnallar o'chirilmaydi, oylik siqilgan arxivlarga ko'chiriladi (DB_ARCHIVE_ENABLED)
+    db.register_cleanup_table("afk_mentions", "mention_time", archive=True)
+    db.register_cleanup_table("logged_media", "timestamp", archive=True)
+    # Xom jurnallar qisqa saqlanadi: hisobotlar soatlik/kunlik yig'ma jadvallardan o'qiydi
+    db.register_cleanup_table("task_logs", "run_at", retention_days=config.get("DB_TASK_LOG_RETENTION_DAYS", 3), archive=True)
+    for rollup_table in ("task_logs_hourly", "logged_media_hourly", "ai_usage_hourly"):
+        db.register_cleanup_table(rollup_table, "bucket", retention_days=config.get("DB_ROLLUP_HOURLY_RETENTION_DAYS", 30))
+    db.register_cleanup_table("message_journal", "created_at", retention_days=config.get("DB_MESSAGE_JOURNAL_RETENTION_DAYS", 30))
+
+    # Har bir xabarda o'qiladigan kichik sozlamalar jadvallari xotirada saqlanadi
+    db.register_settings_table("afk_settings", ["account_id"])
+    db.register_settings_table("media_logger_account_settings", ["account_id"])
+    db.register_settings_table("media_log_chat_settings", ["account_id", "chat_id"])
+    db.register_settings_table("text_log_settings", ["account_id", "chat_id"])
+    db.register_settings_table("text_log_ignored_users", ["account_id", "user_id"])
+    db.register_settings_table("group_settings", ["userbot_account_id", "chat_id"])
     
     await state.load_from_disk()
     await state.set('system.lifecycle_signal', 'restart', persistent=True)
@@ -0,0 +1,125 @@
+# tests/core/test_adhoc_query.py
+
+import asyncio
+import csv
+import io
+import threading
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from core.adhoc_query import cancel_queries, get_active_queries, is_read_query, open_readonly_connection, run_adhoc_query
+from core.cache import CacheManager
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+from core.exceptions import QueryInterruptedError
+
+# Hech qachon tugamaydigan so'rov: faqat progress handler to'xtata oladi
+ENDLESS_SQL = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: default
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.configure(db_path=tmp_path / "adhoc.db")
+    await database.connect()
+    await database.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    await database.executemany("INSERT INTO items (name) VALUES (?)", [(f"item-{i}",) for i in range(120)])
+    yield database
+    await database.close()
+
+
+def test_is_read_query():
+    assert is_read_query("  select 1")
+    assert is_read_query("WITH a AS (SELECT 1) SELECT * FROM a")
+    assert not is_read_query("DELETE FROM items")
+
+
+class TestAdhocQuery:
+    pytestmark = pytest.mark.asyncio
+
+    async def test_results_stream_to_sink_with_bounded_preview(self, db: AsyncDatabase):
+        sink = io.StringIO()
+        async with open_readonly_connection(db) as conn:
+            result = await run_adhoc_query(conn, "SELECT id, name FROM items ORDER BY id", sink, preview_rows=5, batch_size=7)
+
+        assert result.columns == ["id", "name"]
+        assert result.rows == 120 and not result.truncated
+        assert result.preview == [(i, f"item-{i - 1}") for i in range(1, 6)]
+        rows = list(csv.reader(io.StringIO(sink.getvalue())))
+        assert rows[0] == ["id", "name"] and len(rows) == 121 and rows[-1] == ["120", "item-119"]
+
+    async def test_max_rows_truncates(self, db: AsyncDatabase):
+        async with open_readonly_connection(db) as conn:
+            result = await run_adhoc_query(conn, "SELECT id FROM items", max_rows=50, batch_size=30)
+        assert result.rows == 50 and result.truncated
+
+    async def test_exactly_max_rows_is_not_truncated(self, db: AsyncDatabase):
+        async with open_readonly_connection(db) as conn:
+            exact = await run_adhoc_query(conn, "SELECT id FROM items", max_rows=120, batch_size=30)
+            boundary = await run_adhoc_query(conn, "SELECT id FROM items", max_rows=60, batch_size=30)
+        assert exact.rows == 120 and not exact.truncated
+        assert boundary.rows == 60 and boundary.truncated
+
+    async def test_csv_is_written_off_the_event_loop(self, db: AsyncDatabase):
+        class ThreadRecordingSink(io.StringIO):
+            threads = set()
+
+            def write(self, text):
+                self.threads.add(threading.get_ident())
+                return super().write(text)
+
+        sink = ThreadRecordingSink()
+        async with open_readonly_connection(db) as conn:
+            result = await run_adhoc_query(conn, "SELECT id, name FROM items", sink, batch_size=40)
+        assert result.rows == 120 and len(list(csv.reader(io.StringIO(sink.getvalue())))) == 121
+        assert sink.threads and threading.get_ident() not in sink.threads
+
+    async def test_connection_is_read_only(self, db: AsyncDatabase):
+        async with open_readonly_connection(db) as conn:
+            with pytest.raises(aiosqlite.OperationalError):
+                await run_adhoc_query(conn, "DELETE FROM items")
+        assert await db.fetch_val("SELECT count(*) FROM items") == 120
+
+    async def test_step_and_time_budgets_interrupt_the_query(self, db: AsyncDatabase):
+        async with open_readonly_connection(db) as conn:
+            with pytest.raises(QueryInterruptedError) as steps:
+                await run_adhoc_query(conn, ENDLESS_SQL, timeout=0, max_steps=200_000)
+            with pytest.raises(QueryInterruptedError) as timeout:
+                await run_adhoc_query(conn, ENDLESS_SQL, timeout=0.2)
+            # Ulanish to'xtatilgandan keyin ham ishlaydi
+            assert (await run_adhoc_query(conn, "SELECT count(*) FROM items")).preview == [(120,)]
+
+        assert steps.value.reason == "steps"
+        assert timeout.value.reason == "timeout" and 0.2 <= timeout.value.elapsed < 5
+        assert get_active_queries() == []
+
+    async def test_running_query_can_be_cancelled(self, db: AsyncDatabase):
+        async with open_readonly_connection(db) as conn:
+            task = asyncio.create_task(run_adhoc_query(conn, ENDLESS_SQL, timeout=30))
+            while not get_active_queries():
+                await asyncio.sleep(0.01)
+            [active] = get_active_queries()
+            assert await cancel_queries(active.query_id + 1) == []
+            assert await cancel_queries(active.query_id) == [active.query_id]
+
+            with pytest.raises(QueryInterruptedError) as info:
+                await asyncio.wait_for(task, timeout=5)
+        assert info.value.reason == "cancelled"
+        # Boshqa so'rovlar shu vaqt davomida bloklanmagan
+        assert await db.fetch_val("SELECT count(*) FROM items") == 120
@@ -0,0 +1,154 @@
+# tests/core/test_archive.py
+
+import gzip
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from core.archive import (
+    archive_path,
+    archive_table_rows,
+    list_archives,
+    max_attached_months,
+    open_archive_session,
+    open_month_before,
+    prune_archives,
+    resolve_months,
+    seal_archives,
+)
+from core.cache import CacheManager
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _open_db(base: Path, monkeypatch) -> AsyncDatabase:
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: default
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.archive_dir = base / "archive"
+    database.configure(db_path=base / "hot.db")
+    await database.connect()
+    await database.execute("CREATE TABLE task_logs (id INTEGER PRIMARY KEY, task_key TEXT, status TEXT, run_at DATETIME NOT NULL)")
+    rows = [(f"t{i}", "ok", f"2026-0{7 + i % 2}-1{i % 10} 10:00:00") for i in range(20)]
+    await database.executemany("INSERT INTO task_logs (task_key, status, run_at) VALUES (?, ?, ?)", rows)
+    await database.execute("INSERT INTO task_logs (task_key, status, run_at) VALUES ('yangi', 'ok', datetime('now'))")
+    return database
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    database = await _open_db(tmp_path, monkeypatch)
+    yield database
+    await database.close()
+
+
+class TestArchiving:
+
+    async def test_old_rows_are_moved_into_monthly_files(self, db: AsyncDatabase):
+        moved = await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=6, pause=0)
+
+        assert moved == 20
+        assert await db.fetch_val("SELECT count(*) FROM task_logs") == 1
+        assert [a["month"] for a in list_archives(db)] == ["2026-07", "2026-08"]
+        assert archive_path(db, "2026-07").name == "hot.2026-07.db"
+
+    async def test_rerun_after_partial_batch_does_not_duplicate(self, db: AsyncDatabase):
+        original_execute = db.execute
+
+        async def failing_delete(sql, params=()):
+            if sql.startswith("DELETE FROM task_logs"):
+                raise RuntimeError("uzilish")
+            return await original_execute(sql, params)
+
+        db.execute = failing_delete
+        with pytest.raises(RuntimeError):
+            await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=6, pause=0)
+        db.execute = original_execute
+
+        # Arxivga yozilgan, lekin o'chirilmagan partiya qayta yozilmaydi
+        assert await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=6, pause=0) == 20
+        async with open_archive_session(db, ["2026-07", "2026-08"]) as conn:
+            async with conn.execute("SELECT count(*), count(DISTINCT source_rowid) FROM archive_task_logs") as cursor:
+                assert tuple(await cursor.fetchone()) == (20, 20)
+
+    async def test_sealed_months_are_compressed_and_reopened_for_late_rows(self, db: AsyncDatabase):
+        await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+
+        assert await seal_archives(db, before_month="2026-08") == 1
+        july = archive_path(db, "2026-07", compressed=True)
+        assert july.exists() and not archive_path(db, "2026-07").exists()
+        with gzip.open(july, "rb") as f:
+            assert f.read(16) == b"SQLite format 3\x00"
+
+        await db.execute("INSERT INTO task_logs (task_key, status, run_at) VALUES ('kech', 'ok', '2026-07-31 23:00:00')")
+        await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+        assert not july.exists() and archive_path(db, "2026-07").exists()
+        async with open_archive_session(db, ["2026-07"]) as conn:
+            async with conn.execute("SELECT count(*) FROM archive_2026_07.task_logs") as cursor:
+                assert (await cursor.fetchone())[0] == 11
+
+    async def test_session_attaches_compressed_archives_read_only(self, db: AsyncDatabase):
+        await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+        await seal_archives(db, before_month="2026-09")
+
+        months = resolve_months(db, "2026-07..2026-08")
+        assert months == ["2026-07", "2026-08"]
+        async with open_archive_session(db, months) as conn:
+            async with conn.execute(
+                "SELECT substr(run_at, 1, 7) AS month, count(*) AS n FROM archive_task_logs GROUP BY month ORDER BY month"
+            ) as cursor:
+                assert [tuple(r) for r in await cursor.fetchall()] == [("2026-07", 10), ("2026-08", 10)]
+            # Jonli jadval ham shu ulanishda ko'rinadi
+            async with conn.execute("SELECT count(*) FROM task_logs") as cursor:
+                assert (await cursor.fetchone())[0] == 1
+            with pytest.raises(Exception):
+                await conn.execute("DELETE FROM archive_2026_07.task_logs")
+
+        with pytest.raises(ValueError):
+            resolve_months(db, "1999-01")
+
+    async def test_session_rejects_more_months_than_attach_limit(self, db: AsyncDatabase, monkeypatch):
+        await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+        assert max_attached_months() >= 2
+
+        monkeypatch.setattr("core.archive.max_attached_months", lambda: 1)
+        with pytest.raises(ValueError, match="ko'pi bilan 1"):
+            async with open_archive_session(db, resolve_months(db, "all")):
+                pass
+
+    async def test_session_handles_uri_special_characters_in_paths(self, tmp_path: Path, monkeypatch):
+        base = tmp_path / "a#b %20?c"
+        base.mkdir()
+        database = await _open_db(base, monkeypatch)
+        try:
+            await archive_table_rows(database, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+            async with open_archive_session(database, ["2026-07", "2026-08"]) as conn:
+                async with conn.execute("SELECT count(*) FROM archive_task_logs") as cursor:
+                    assert (await cursor.fetchone())[0] == 20
+        finally:
+            await database.close()
+
+    async def test_prune_and_open_month_boundaries(self, db: AsyncDatabase):
+        await archive_table_rows(db, "task_logs", "run_at", archive_days=7, batch_size=100, pause=0)
+        now = datetime(2026, 10, 5, tzinfo=timezone.utc)
+
+        assert open_month_before(7, now=now) == "2026-09"
+        assert open_month_before(30, now=now) == "2026-09"
+        assert prune_archives(db, keep_months=0, now=now) == 0
+        assert prune_archives(db, keep_months=2, now=now) == 1
+        assert [a["month"] for a in list_archives(db)] == ["2026-08"]
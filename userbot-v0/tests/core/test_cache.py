@@ -3,11 +3,13 @@
 import pytest
 import asyncio
 import pickle
+import time
 from pathlib import Path
 from typing import AsyncGenerator
 from unittest.mock import MagicMock, AsyncMock, patch
 
 import pytest_asyncio
+from cachetools import LRUCache, TTLCache
 
 from core.cache import CacheManager
 from core.config_manager import ConfigManager
@@ -57,6 +59,15 @@ class TestCacheOperations:
         assert stats_after_clear["total_hits"] == 0
 
 
+    async def test_hot_path_does_not_wait_for_persistence_lock(self, manager: CacheManager):
+        await manager.set("k", "v")
+        async with manager._lock:  # masalan, save_to_disk snapshot olayotgan payt
+            await asyncio.wait_for(manager.set("k2", "v2"), timeout=0.1)
+            assert await asyncio.wait_for(manager.get("k"), timeout=0.1) == "v"
+            assert await asyncio.wait_for(manager.exists("k2"), timeout=0.1) is True
+            assert await asyncio.wait_for(manager.delete("k2"), timeout=0.1) is True
+
+
 @pytest.mark.asyncio
 class TestCachePoliciesAndTypes:
     """TTL, LRU va kesh turlarini almashtirishni tekshirish."""
@@ -73,14 +84,78 @@ class TestCachePoliciesAndTypes:
         await manager.set("k3", "v3", ttl=None)
         assert await manager.get("k2") is None
 
-    async def test_cache_type_switching_logs_warning(self, mock_config: MagicMock):
+    async def test_mixed_ttls_share_a_namespace_without_wiping(self, manager: CacheManager):
+        await manager.set("entity", "e", ttl=3600)
+        await manager.set("forever", "f", ttl=None)
+        await manager.set("rate", 1.0, ttl=1)
+        await manager.set("admins", [1, 2], ttl=600)
+        await manager.set("default", "d")
+
+        assert [await manager.get(k) for k in ("entity", "forever", "rate", "admins", "default")] == ["e", "f", 1.0, [1, 2], "d"]
+        await asyncio.sleep(1.1)
+        assert await manager.get("rate") is None
+        assert await manager.get("entity") == "e" and await manager.get("forever") == "f"
+
+    async def test_rewriting_an_entry_applies_its_new_ttl(self, manager: CacheManager):
+        await manager.set("k", "v1", ttl=None)
+        await manager.set("k", "v2", ttl=1)
+        assert await manager.get("k") == "v2"
+        await asyncio.sleep(1.1)
+        assert await manager.exists("k") is False
+
+@pytest.mark.asyncio
+class TestNamespaceLimits:
+    """Nomlar makoni bo'yicha yozuvlar soni / bayt chegaralari va statistikasi."""
+    async def test_byte_budget_evicts_least_recently_used(self, manager: CacheManager):
+        manager.configure_namespace("blobs", max_bytes=100, sizer=len)
+        for key in ("a", "b", "c"):
+            await manager.set(key, "x" * 40, namespace="blobs")
+        assert await manager.get("a", namespace="blobs") is None  # 120 > 100 bayt
+        await manager.get("b", namespace="blobs")
+        await manager.set("d", "x" * 40, namespace="blobs")
+        assert await manager.get("c", namespace="blobs") is None
+        assert await manager.get("b", namespace="blobs") is not None
+
+        stats = (await manager.get_stats())["namespaces"]["blobs"]
+        assert stats["bytes"] == 80 and stats["entries"] == 2
+        assert stats["evictions"] == 2 and stats["max_bytes"] == 100
+
+    async def test_entry_limit_and_oversized_values(self, manager: CacheManager):
+        manager.configure_namespace("small", max_entries=2, max_bytes=50, sizer=len)
+        for key in ("a", "b", "c"):
+            await manager.set(key, "v", namespace="small")
+        assert not await manager.exists("a", namespace="small")
+
+        # Byudjetdan katta qiymat keshlanmaydi va eski qiymatni ham o'chiradi
+        await manager.set("b", "x" * 51, namespace="small")
+        assert not await manager.exists("b", namespace="small")
+        stats = (await manager.get_stats())["namespaces"]["small"]
+        assert stats["rejected"] == 1 and stats["entries"] == 1
+
+    async def test_reconfiguring_shrinks_existing_namespace(self, manager: CacheManager):
+        for i in range(10):
+            await manager.set(i, i, namespace="grow")
+        manager.configure_namespace("grow", max_entries=3)
+        assert [await manager.exists(i, namespace="grow") for i in range(10)].count(True) == 3
+        assert await manager.get(9, namespace="grow") == 9
+
+    async def test_limits_from_config_and_namespace_stats(self, mock_config: MagicMock):
+        settings = {'CACHE_DEFAULT_TTL': 3600, 'CACHE_NAMESPACE_LIMITS': {"tiny": {"max_entries": 1}}}
+        mock_config.get.side_effect = lambda key, default=None: settings.get(key, default)
         manager = CacheManager(config_manager=mock_config)
-        with patch("core.cache.logger.warning") as mock_log:
-            mock_config.get.side_effect = lambda k, d=None: 128 if k == 'CACHE_DEFAULT_MAX_SIZE' else None
-            await manager.set("lru_key", "lru_val", namespace="switch", ttl=None)
-            mock_config.get.side_effect = lambda k, d=None: 3600
-            await manager.set("ttl_key", "ttl_val", namespace="switch", ttl=100)
-            mock_log.assert_called_once()
+        await manager.set("a", [1, 2, 3], namespace="tiny")
+        await manager.set("b", {"k": "v"}, namespace="tiny")
+        await manager.set("short", "v", namespace="other", ttl=1)
+        await manager.get("b", namespace="tiny"); await manager.get("a", namespace="tiny")
+        await asyncio.sleep(1.1)
+        await manager.get("short", namespace="other")
+
+        stats = await manager.get_stats()
+        tiny, other = stats["namespaces"]["tiny"], stats["namespaces"]["other"]
+        assert tiny["entries"] == 1 and tiny["evictions"] == 1 and tiny["hit_rate"] == 0.5
+        assert tiny["bytes"] > 0 and stats["total_bytes"] == tiny["bytes"] + other["bytes"]
+        assert other["expirations"] == 1 and other["misses"] == 1 and other["max_entries"] == 512
+
 
 @pytest.mark.asyncio
 class TestCachePersistenceAndErrors:
@@ -95,6 +170,72 @@ class TestCachePersistenceAndErrors:
             await manager2.load_from_disk()
             assert await manager2.get("persist_key") == "value"
 
+    async def test_load_does_not_extend_or_revive_expired_entries(self, mock_config: MagicMock, tmp_path: Path):
+        test_file = tmp_path / "expiry.pkl"
+        clock = [time.time()]
+        with patch("core.cache.CACHE_FILE_PATH", test_file), patch("core.cache.time.time", side_effect=lambda: clock[0]):
+            manager1 = CacheManager(config_manager=mock_config)
+            await manager1.set("short", "v", ttl=60)
+            await manager1.set("long", "v", ttl=600)
+            await manager1.set("forever", "v", ttl=None)
+            await manager1.save_to_disk()
+
+            # Qayta ishga tushirish 2 daqiqadan keyin: 60 soniyalik yozuv qaytib kelmasligi kerak
+            clock[0] += 120
+            manager2 = CacheManager(config_manager=mock_config)
+            await manager2.load_from_disk()
+            assert await manager2.get("short") is None
+            assert await manager2.get("long") == "v" and await manager2.get("forever") == "v"
+            assert (await manager2.get_stats())["namespaces"]["default"]["entries"] == 2
+
+            # Muddat yuklashda yangilanmagan: asl 600 soniyadan keyin yozuv tugaydi
+            clock[0] += 481
+            assert await manager2.get("long") is None
+            assert await manager2.get("forever") == "v"
+
+    async def test_reconfigure_keeps_absolute_expiry(self, mock_config: MagicMock):
+        clock = [time.time()]
+        with patch("core.cache.time.time", side_effect=lambda: clock[0]):
+            manager = CacheManager(config_manager=mock_config)
+            await manager.set("k", "v", ttl=60, namespace="ns")
+            clock[0] += 45
+            manager.configure_namespace("ns", max_entries=10)
+            assert await manager.get("k", namespace="ns") == "v"
+            clock[0] += 16
+            assert await manager.get("k", namespace="ns") is None
+
+    async def test_save_snapshot_is_consistent_under_concurrent_writes(self, mock_config: MagicMock, tmp_path: Path):
+        test_file = tmp_path / "concurrent.pkl"
+        with patch("core.cache.CACHE_FILE_PATH", test_file):
+            manager1 = CacheManager(config_manager=mock_config)
+            for ns in range(20):
+                await manager1.set("base", ns, namespace=f"ns{ns}")
+
+            async def writer():
+                for i in range(500):
+                    await manager1.set(i, i, namespace=f"ns{i % 20}")
+                    await manager1.clear_namespace("temp")
+                    await manager1.set("t", i, namespace="temp")
+                    await asyncio.sleep(0)
+
+            await asyncio.gather(writer(), manager1.save_to_disk())
+            manager2 = CacheManager(config_manager=mock_config)
+            await manager2.load_from_disk()
+            assert all([await manager2.get("base", namespace=f"ns{ns}") == ns for ns in range(20)])
+
+    async def test_load_legacy_file_format(self, mock_config: MagicMock, tmp_path: Path):
+        test_file = tmp_path / "legacy.pkl"
+        legacy_ttl, legacy_lru = TTLCache(maxsize=8, ttl=60), LRUCache(maxsize=8)
+        legacy_ttl["old_key"], legacy_lru["lru_key"] = "old_value", "lru_value"
+        test_file.write_bytes(pickle.dumps({'_stores': {"legacy": legacy_ttl, "lru": legacy_lru}, '_hits': 0, '_misses': 0}))
+        with patch("core.cache.CACHE_FILE_PATH", test_file):
+            manager = CacheManager(config_manager=mock_config)
+            await manager.load_from_disk()
+            assert await manager.get("old_key", namespace="legacy") == "old_value"
+            assert await manager.get("lru_key", namespace="lru") == "lru_value"
+            await manager.set("new_key", "new_value", namespace="legacy", ttl=5)
+            assert await manager.get("new_key", namespace="legacy") == "new_value"
+
     async def test_load_corrupted_file(self, mock_config: MagicMock, tmp_path: Path):
         test_file = tmp_path / "corrupted.pkl"
         test_file.write_text("corrupted")
@@ -122,6 +263,71 @@ class TestCachableDecorator:
         await decorated_func()
         mock_func.assert_awaited_once()
 
+    async def test_concurrent_misses_share_one_computation(self, manager: CacheManager):
+        calls = 0
+
+        @manager.cachable(namespace="flight")
+        async def slow(x):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return x * 2
+
+        assert await asyncio.gather(*(slow(21) for _ in range(20)), slow(1)) == [42] * 20 + [2]
+        assert calls == 2
+        stats = (await manager.get_stats())["namespaces"]["flight"]
+        assert stats["coalesced"] == 19 and stats["misses"] == 21
+        assert not manager._inflight
+
+    async def test_cancelled_waiter_does_not_cancel_the_flight(self, manager: CacheManager):
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "v"
+
+        first = asyncio.create_task(manager.get_or_compute("k", compute))
+        await started.wait()
+        second = asyncio.create_task(manager.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "v"
+        assert await manager.get("k") == "v"
+
+    async def test_errors_reach_every_waiter_and_are_not_cached(self, manager: CacheManager):
+        compute = AsyncMock(side_effect=[RuntimeError("api"), "ok"])
+        results = await asyncio.gather(*(manager.get_or_compute("k", compute) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await manager.get_or_compute("k", compute) == "ok"
+        assert compute.await_count == 2
+
+    async def test_stale_while_revalidate_serves_old_value_during_refresh(self, manager: CacheManager):
+        values = iter(["v1", "v2"])
+        refreshing = asyncio.Event()
+
+        @manager.cachable(namespace="swr", ttl=1, stale_ttl=60)
+        async def fetch():
+            value = next(values)
+            if value == "v2":
+                refreshing.set()
+                await asyncio.sleep(0.05)
+            return value
+
+        assert await fetch() == "v1"
+        await asyncio.sleep(1.1)
+        assert await manager.get(fetch_key := ("tests.core.test_cache", "fetch", (), frozenset()), namespace="swr") is None
+        # Eskirgan qiymat darhol qaytadi, yangilanish bitta marta fonda ishlaydi
+        assert [await fetch() for _ in range(3)] == ["v1"] * 3
+        await refreshing.wait()
+        await asyncio.sleep(0.1)
+        assert await fetch() == "v2"
+        assert await manager.get(fetch_key, namespace="swr") == "v2"
+
+        stats = (await manager.get_stats())["namespaces"]["swr"]
+        assert stats["stale_hits"] == 3 and stats["refreshes"] == 1
+        assert (await manager.get_stats())["total_stale_hits"] == 3
+
     async def test_cachable_unhashable_arg_logs_warning(self, manager: CacheManager):
         @manager.cachable()
         async def func(arg): return arg
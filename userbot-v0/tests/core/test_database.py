@@ -1,5 +1,6 @@
 import pytest
 import asyncio
+import os
 from pathlib import Path
 from typing import AsyncGenerator, Optional, List, Dict
 from unittest.mock import MagicMock, AsyncMock, patch
@@ -227,6 +228,52 @@ class TestAsyncDatabase:
         assert user['email'] == "test@example.com"  # type: ignore
         assert rows_affected == user['id']  # type: ignore
 
+    async def test_insert_many_chunks_rows_and_caches_statement(self, db: AsyncDatabase, monkeypatch):
+        # 4 ustun, 10 parametr chegarasi: har bir so'rovda 2 qator
+        monkeypatch.setattr("core.database._SQLITE_MAX_VARIABLES", 10)
+        rows = [{"name": f"user{i}", "age": i, "email": f"u{i}@x.uz", "id": 100 + i} for i in range(5)]
+
+        with patch.object(db, "_validate_column_names", wraps=db._validate_column_names) as validate, \
+                patch.object(db, "_executemany_local", wraps=db._executemany_local) as spy:
+            assert await db.insert_many("users", rows) == 5
+            assert await db.insert_many("users", [{"name": "oxirgi", "age": 1, "email": "o@x.uz", "id": 200}]) == 1
+
+        statements = [c.args[0] for c in spy.call_args_list]
+        assert statements[0].count("(?, ?, ?, ?)") == 2 and len(spy.call_args_list[0].args[1]) == 2
+        assert statements[1].count("(?, ?, ?, ?)") == 1 and statements[2] == statements[1]
+        # Har bir so'rov shakli uchun whitelist bir marta tekshiriladi
+        assert validate.call_count == 2
+        assert await db.fetch_val("SELECT count(*) FROM users WHERE id >= 100") == 6
+
+    async def test_insert_many_commits_each_chunk(self, db: AsyncDatabase, mock_config_manager: MagicMock):
+        base = mock_config_manager.get.side_effect
+        mock_config_manager.get.side_effect = lambda key, default=None: 3 if key == "DB_BULK_CHUNK_ROWS" else base(key, default)
+        rows = [{"name": f"bulk{i}", "age": i} for i in range(7)] + [{"name": "bulk0", "age": 0}]
+
+        with pytest.raises(QueryError):
+            await db.insert_many("users", rows)
+        # Oxirgi partiya UNIQUE xatosi bilan bekor qilindi, oldingilari saqlangan
+        assert await db.fetch_val("SELECT count(*) FROM users WHERE name LIKE 'bulk%'") == 6
+
+    async def test_upsert_many(self, db: AsyncDatabase):
+        await db.insert_many("users", [{"name": "a", "age": 1}, {"name": "b", "age": 2}])
+        affected = await db.upsert_many("users", [{"name": "a", "age": 10}, {"name": "c", "age": 3}, {"name": "b", "age": 20, "email": "b@x.uz"}], ["name"])
+
+        assert affected == 3
+        rows = await db.fetchall("SELECT name, age, email FROM users WHERE name IN ('a', 'b', 'c') ORDER BY name")
+        assert rows == [
+            {"name": "a", "age": 10, "email": None},
+            {"name": "b", "age": 20, "email": "b@x.uz"},
+            {"name": "c", "age": 3, "email": None},
+        ]
+        assert await db.insert_many("users", []) == 0
+
+    async def test_insert_many_validates_whitelist(self, db: AsyncDatabase):
+        with pytest.raises(QueryError):
+            await db.insert_many("users", [{"name": "x", "password": "y"}])
+        with pytest.raises(QueryError):
+            await db.upsert_many("secrets", [{"id": 1}], ["id"])
+
     async def test_vacuum(self, db: AsyncDatabase):
 
         await db.execute("CREATE TABLE IF NOT EXISTS large_data (id INTEGER PRIMARY KEY, content TEXT)")
@@ -473,3 +520,605 @@ class TestAsyncDatabase:
 
             assert database.initial_data_path == tmp_path / "data" / "initial_data.sql"
             assert database.migrations_path == tmp_path / "data" / "migrations"
+
+    async def test_read_pool_serves_selects(self, db: AsyncDatabase):
+        assert db.get_read_pool_stats()["size"] == 2
+
+        user = await db.fetchone("SELECT * FROM users WHERE name = ?", ("John Doe",))
+        assert user is not None
+        await db.fetchall("SELECT * FROM users")
+        await db.fetch_val("SELECT COUNT(*) FROM users")
+
+        stats = db.get_read_pool_stats()
+        assert stats["acquisitions"] == 3
+        assert stats["available"] == 2
+
+    async def test_read_pool_sees_committed_writes(self, db: AsyncDatabase):
+        await db.insert("users", {"name": "Pool Reader", "age": 20})
+        assert await db.fetch_val("SELECT age FROM users WHERE name = ?", ("Pool Reader",)) == 20
+
+    async def test_transaction_reads_own_uncommitted_writes(self, db: AsyncDatabase):
+        async with db.transaction():
+            await db.execute("UPDATE users SET age = ? WHERE name = ?", (77, "John Doe"))
+            assert await db.fetch_val("SELECT age FROM users WHERE name = 'John Doe'") == 77
+            acquisitions_inside = db.get_read_pool_stats()["acquisitions"]
+
+        assert acquisitions_inside == 0
+        assert await db.fetch_val("SELECT age FROM users WHERE name = 'John Doe'") == 77
+
+    async def test_concurrent_writes_survive_a_failing_transaction(self, db: AsyncDatabase):
+        entered = asyncio.Event()
+
+        async def failing_transaction():
+            async with db.transaction():
+                await db.execute("UPDATE users SET age = 0")
+                entered.set()
+                await asyncio.sleep(0.05)  # boshqa vazifalar shu paytda yozadi
+                raise ValueError("rollback")
+
+        async def writer(i: int):
+            await entered.wait()
+            if i % 2:
+                await db.execute("INSERT INTO users (name, age) VALUES (?, ?)", (f"w{i}", i))
+            else:
+                await db.execute_insert("INSERT INTO users (name, age) VALUES (?, ?)", (f"w{i}", i))
+
+        results = await asyncio.gather(failing_transaction(), *(writer(i) for i in range(50)), return_exceptions=True)
+        assert isinstance(results[0], ValueError)
+        assert await db.fetch_val("SELECT COUNT(*) FROM users WHERE name LIKE 'w%'") == 50
+        assert await db.fetch_val("SELECT age FROM users WHERE name = 'John Doe'") == 30
+
+    async def test_read_pool_disabled(self, tmp_path: Path, mock_cache_manager: AsyncMock, monkeypatch):
+        async def mock_do_nothing(*args, **kwargs):
+            pass
+
+        monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+        monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: 0 if key == "DB_READ_POOL_SIZE" else default
+        database = AsyncDatabase(config_manager=config, cache_manager=mock_cache_manager)
+        database.configure(db_path=tmp_path / "no_pool.db")
+
+        async with database:
+            assert await database.fetch_val("SELECT 1") == 1
+            stats = database.get_read_pool_stats()
+            assert stats["size"] == 0
+            assert stats["acquisitions"] == 0
+
+    async def test_enqueue_write_batches_in_one_flush(self, db: AsyncDatabase):
+        for i in range(5):
+            await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", (f"Queued {i}", i))
+
+        assert db.get_write_queue_stats()["pending"] == 5
+        assert await db.fetch_val("SELECT COUNT(*) FROM users WHERE name LIKE 'Queued%'") == 0
+
+        flushed = await db.flush_writes()
+        assert flushed == 5
+        assert await db.fetch_val("SELECT COUNT(*) FROM users WHERE name LIKE 'Queued%'") == 5
+        stats = db.get_write_queue_stats()
+        assert stats["pending"] == 0
+        assert stats["batches"] == 1
+
+    async def test_enqueue_write_bad_row_does_not_drop_batch(self, db: AsyncDatabase):
+        await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", ("Good Row", 1))
+        await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", ("John Doe", 2))  # UNIQUE buziladi
+
+        assert await db.flush_writes() == 1
+
+        assert await db.fetch_val("SELECT COUNT(*) FROM users WHERE name = 'Good Row'") == 1
+        stats = db.get_write_queue_stats()
+        assert stats["failed"] == 1 and stats["flushed"] == 1
+
+    async def test_enqueue_write_flushed_in_background(self, db: AsyncDatabase, mock_config_manager: MagicMock):
+        mock_config_manager.get.side_effect = lambda key, default=None: 10 if key == "DB_WRITE_BATCH_INTERVAL_MS" else default
+        await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", ("Background", 5))
+
+        for _ in range(50):
+            if db.get_write_queue_stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await db.fetch_val("SELECT age FROM users WHERE name = 'Background'") == 5
+
+    async def test_enqueue_write_backpressure(self, db: AsyncDatabase, mock_config_manager: MagicMock):
+        mock_config_manager.get.side_effect = lambda key, default=None: 2 if key == "DB_WRITE_QUEUE_MAX" else default
+        for i in range(5):
+            await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", (f"Pressure {i}", i))
+
+        await db.flush_writes()
+        assert await db.fetch_val("SELECT COUNT(*) FROM users WHERE name LIKE 'Pressure%'") == 5
+        assert db.get_write_queue_stats()["backpressure_waits"] > 0
+
+    async def test_close_flushes_pending_writes(self, db: AsyncDatabase):
+        await db.enqueue_write("INSERT INTO users (name, age) VALUES (?, ?)", ("On Close", 9))
+        await db.close()
+        await db.connect()
+        assert await db.fetch_val("SELECT age FROM users WHERE name = 'On Close'") == 9
+
+    @pytest.fixture
+    def real_cache(self, db: AsyncDatabase, mock_config_manager: MagicMock) -> CacheManager:
+        base_get = mock_config_manager.get.side_effect
+        mock_config_manager.get.side_effect = lambda key, default=None: 300 if key == "CACHE_DEFAULT_TTL" else base_get(key, default)
+        db._cache_manager = CacheManager(config_manager=mock_config_manager)
+        return db._cache_manager
+
+    async def test_query_cache_invalidated_by_write_to_read_table(self, db: AsyncDatabase, real_cache: CacheManager):
+        query = "SELECT age FROM users WHERE name = ?"
+
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 30
+        await db._conn.execute("UPDATE users SET age = 31 WHERE name = 'John Doe'")  # type: ignore
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 30  # keshdan
+
+        await db.update("users", {"age": 32}, "name = ?", ("John Doe",))
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 32
+
+    async def test_query_cache_kept_on_unrelated_write(self, db: AsyncDatabase, real_cache: CacheManager):
+        await db.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        query = "SELECT age FROM users WHERE name = ?"
+
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 30
+        await db._conn.execute("UPDATE users SET age = 40 WHERE name = 'John Doe'")  # type: ignore
+        await db.insert("settings", {"key": "a", "value": "b"})
+
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 30
+
+    async def test_query_cache_comma_join_and_views(self, db: AsyncDatabase, real_cache: CacheManager):
+        await db.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        await db.execute("CREATE VIEW user_names AS SELECT name FROM users")
+        join_query = "SELECT COUNT(*) FROM settings, users WHERE users.age > 0"
+        view_query = "SELECT COUNT(*) FROM user_names"
+        cte_query = "WITH u AS (SELECT * FROM users) SELECT COUNT(*) FROM u"
+
+        await db.insert("settings", {"key": "a", "value": "b"})
+        assert await db.fetch_val(join_query, use_cache=True) == 1
+        assert await db.fetch_val(view_query, use_cache=True) == 1
+        assert await db.fetch_val(cte_query, use_cache=True) == 1
+        await db.insert("users", {"name": "Second", "age": 1})
+
+        assert await db.fetch_val(join_query, use_cache=True) == 2
+        assert await db.fetch_val(view_query, use_cache=True) == 2
+        assert await db.fetch_val(cte_query, use_cache=True) == 2
+
+    async def test_query_cache_declared_tables(self, db: AsyncDatabase, real_cache: CacheManager):
+        await db.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        await db.execute("CREATE VIEW user_names AS SELECT name FROM users")
+        query = "SELECT COUNT(*) FROM user_names"
+
+        assert await db.fetch_val(query, use_cache=True, tables=["users"]) == 1
+        await db.insert("users", {"name": "View Reader", "age": 1})
+        assert await db.fetch_val(query, use_cache=True, tables=["users"]) == 2
+
+    async def test_query_cache_versions_bump_after_commit(self, db: AsyncDatabase, real_cache: CacheManager):
+        query = "SELECT age FROM users WHERE name = ?"
+        reader_saw = []
+
+        async def concurrent_reader():
+            # Pul ulanishi commit'dan oldingi holatni ko'radi va uni keshga yozadi
+            reader_saw.append(await db.fetch_val(query, ("John Doe",), use_cache=True))
+
+        async with db.transaction():
+            await db.execute("UPDATE users SET age = 50 WHERE name = 'John Doe'")
+            assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 50  # o'z yozuvi, keshsiz
+            await asyncio.create_task(concurrent_reader())
+
+        assert reader_saw == [30]
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 50
+
+        with pytest.raises(ValueError):
+            async with db.transaction():
+                await db.execute("UPDATE users SET age = 60 WHERE name = 'John Doe'")
+                raise ValueError("rollback")
+        assert db._cache_pending == set()
+        assert await db.fetch_val(query, ("John Doe",), use_cache=True) == 50
+
+    async def test_iterate_rows(self, db: AsyncDatabase):
+        await db.executemany("INSERT INTO users (name, age) VALUES (?, ?)", [(f"Iter {i}", i) for i in range(7)])
+
+        rows = [row async for row in db.iterate("SELECT name, age FROM users WHERE name LIKE 'Iter%' ORDER BY age", chunk_size=3)]
+        assert len(rows) == 7
+        assert rows[0] == {"name": "Iter 0", "age": 0}
+
+    async def test_iterate_chunks_as_tuples(self, db: AsyncDatabase):
+        await db.executemany("INSERT INTO users (name, age) VALUES (?, ?)", [(f"Chunk {i}", i) for i in range(7)])
+
+        chunks = [chunk async for chunk in db.iterate("SELECT age FROM users WHERE name LIKE 'Chunk%' ORDER BY age", chunk_size=3, as_tuples=True, chunks=True)]
+        assert [len(c) for c in chunks] == [3, 3, 1]
+        assert chunks[0][0] == (0,)
+
+    async def test_iterate_early_exit_releases_connection(self, db: AsyncDatabase):
+        from contextlib import aclosing
+
+        async with aclosing(db.iterate("SELECT * FROM users")) as rows:
+            async for _ in rows:
+                break
+        assert db.get_read_pool_stats()["available"] == 2
+
+    async def test_iterate_error(self, db: AsyncDatabase):
+        with pytest.raises(QueryError):
+            async for _ in db.iterate("SELECT * FROM missing_table"):
+                pass
+
+    async def test_create_online_backup_keeps_connection(self, db: AsyncDatabase, tmp_path: Path):
+        import sqlite3
+
+        db.backup_dir = tmp_path / "online_backups"
+        db.backup_dir.mkdir(exist_ok=True)
+        conn_before = db._conn
+
+        backup_path = await db.create_backup(online=True)
+
+        assert db._conn is conn_before
+        with sqlite3.connect(backup_path) as backup_conn:
+            assert backup_conn.execute("SELECT name FROM users").fetchone() == ("John Doe",)
+
+    async def test_create_online_backup_compressed(self, db: AsyncDatabase, tmp_path: Path):
+        import gzip
+
+        db.backup_dir = tmp_path / "gz_backups"
+        db.backup_dir.mkdir(exist_ok=True)
+
+        backup_path = await db.create_backup(online=True, compress=True)
+
+        assert backup_path.name.endswith(".bak.gz")
+        with gzip.open(backup_path, "rb") as f:
+            assert f.read(16) == b"SQLite format 3\x00"
+
+    async def test_create_backup_prunes_old_backups(self, db: AsyncDatabase, tmp_path: Path, mock_config_manager: MagicMock):
+        db.backup_dir = tmp_path / "pruned_backups"
+        db.backup_dir.mkdir(exist_ok=True)
+        for i in range(3):
+            old_backup = db.backup_dir / f"test.db.2020-01-0{i + 1}_00-00-00.bak"
+            old_backup.write_bytes(b"old")
+            os.utime(old_backup, (1_000_000 + i, 1_000_000 + i))
+        mock_config_manager.get.side_effect = lambda key, default=None: 2 if key == "DB_BACKUP_KEEP" else default
+
+        backup_path = await db.create_backup(online=True)
+
+        remaining = sorted(f.name for f in db.backup_dir.iterdir())
+        assert remaining == sorted([backup_path.name, "test.db.2020-01-03_00-00-00.bak"])
+
+    async def _fill_and_delete(self, db: AsyncDatabase) -> None:
+        await db.execute("CREATE TABLE large_data (id INTEGER PRIMARY KEY, content TEXT)")
+        await db.executemany("INSERT INTO large_data (content) VALUES (?)", [("x" * 2000,) for _ in range(200)])
+        await db.execute("DELETE FROM large_data")
+
+    async def test_new_database_uses_incremental_auto_vacuum(self, db: AsyncDatabase):
+        storage = await db.get_storage_stats()
+
+        assert storage["auto_vacuum"] == "INCREMENTAL"
+        assert storage["page_count"] > 0
+
+    async def test_incremental_vacuum_reclaims_free_pages(self, db: AsyncDatabase):
+        await self._fill_and_delete(db)
+        before = await db.get_storage_stats()
+        assert before["freelist_count"] > 10
+        assert before["free_ratio"] > 0
+
+        freed = await db.incremental_vacuum(10)
+
+        after = await db.get_storage_stats()
+        assert freed == 10
+        assert after["freelist_count"] == before["freelist_count"] - 10
+        assert after["page_count"] == before["page_count"] - 10
+        assert db.is_connected()
+
+    async def test_vacuum_converts_legacy_database_to_incremental(self, tmp_path: Path, mock_config_manager: MagicMock, mock_cache_manager: AsyncMock, monkeypatch):
+        import sqlite3
+
+        async def mock_do_nothing(*args, **kwargs):
+            pass
+
+        monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+        monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+        db_path = tmp_path / "legacy.db"
+        with sqlite3.connect(db_path) as legacy:
+            legacy.execute("CREATE TABLE legacy (id INTEGER PRIMARY KEY)")
+
+        database = AsyncDatabase(config_manager=mock_config_manager, cache_manager=mock_cache_manager)
+        database.configure(db_path=db_path)
+        await database.connect()
+        try:
+            assert (await database.get_storage_stats())["auto_vacuum"] == "NONE"
+            await database.vacuum()
+            assert (await database.get_storage_stats())["auto_vacuum"] == "INCREMENTAL"
+        finally:
+            await database.close()
+
+    async def test_query_profile_records_statements(self, db: AsyncDatabase):
+        db.reset_query_profile()
+        await db.fetchall("SELECT * FROM users WHERE age > ?", (10,))
+        await db.fetchall("SELECT * FROM users WHERE age > ?", (50,))
+        await db.execute("UPDATE users SET age = age + 1 WHERE name = ?", ("John Doe",))
+
+        profile = {item["statement"]: item for item in db.get_query_profile(limit=None)}
+
+        select_stats = profile["SELECT * FROM users WHERE age > ?"]
+        assert select_stats["count"] == 2
+        assert select_stats["rows"] >= 1
+        assert profile["UPDATE users SET age = age + ? WHERE name = ?"]["rows"] == 1
+
+    async def test_slow_query_captured_with_plan(self, db: AsyncDatabase):
+        db._profiler.slow_threshold_ms = 0.000001
+        await db.fetchall("SELECT * FROM users WHERE age > ?", (10,))
+        await asyncio.gather(*db._profiler_tasks)
+
+        [entry] = db.get_slow_queries()
+        assert entry["sql"] == "SELECT * FROM users WHERE age > ?"
+        assert any("users" in step for step in entry["plan"])
+
+    async def test_lock_retry_counted_in_profile(self, db: AsyncDatabase):
+        db.reset_query_profile()
+        conn = await db._get_connection()
+        original_execute = conn.execute
+        calls = {"n": 0}
+
+        def flaky_execute(sql, params=None):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise aiosqlite.OperationalError("database is locked")
+            return original_execute(sql, params)
+
+        with patch.object(conn, "execute", side_effect=flaky_execute), patch("core.database.asyncio.sleep", new=AsyncMock()):
+            await db.execute("UPDATE users SET age = 31 WHERE name = ?", ("John Doe",))
+
+        [item] = db.get_query_profile()
+        assert item["lock_retries"] == 1
+        assert item["count"] == 1
+
+    async def test_connect_skips_migrations_when_schema_unchanged(self, tmp_path: Path, mock_config_manager: MagicMock, mock_cache_manager: AsyncMock, monkeypatch):
+        calls = {"migrations": 0, "initial": 0}
+
+        async def count_migrations(*args, **kwargs):
+            calls["migrations"] += 1
+
+        async def count_initial(*args, **kwargs):
+            calls["initial"] += 1
+
+        monkeypatch.setattr("core.database._run_migrations_util", count_migrations)
+        monkeypatch.setattr("core.database._run_initial_data_script_util", count_initial)
+
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        migration = migrations_dir / "V001_first.sql"
+        migration.write_text("CREATE TABLE first (id INTEGER);")
+
+        database = AsyncDatabase(config_manager=mock_config_manager, cache_manager=mock_cache_manager)
+        database.configure(db_path=tmp_path / "bootstrap.db")
+        database.migrations_path = migrations_dir
+        database.initial_data_path = tmp_path / "missing_initial_data.sql"
+
+        for _ in range(2):
+            await database.connect()
+            await database.close()
+        assert calls == {"migrations": 1, "initial": 1}
+
+        migration.write_text("CREATE TABLE first (id INTEGER, name TEXT);")
+        await database.connect()
+        await database.close()
+        assert calls == {"migrations": 2, "initial": 2}
+
+
+class TestRowModes:
+    """fetchone/fetchall/iterate `row_mode` parametri."""
+
+    async def test_fetch_row_modes(self, db: AsyncDatabase):
+        await db.insert_many("users", [{"name": "Ali", "age": 20}, {"name": "Vali", "age": 25}])
+        sql = "SELECT name, age FROM users WHERE age IS NOT NULL ORDER BY age"
+
+        assert await db.fetchall(sql, row_mode="tuple") == [("Ali", 20), ("Vali", 25), ("John Doe", 30)]
+        assert await db.fetchall(sql, row_mode="scalar") == ["Ali", "Vali", "John Doe"]
+        assert await db.fetchone(sql, row_mode="scalar") == "Ali"
+        assert await db.fetchone("SELECT name FROM users WHERE name = 'yo''q'", row_mode="record") is None
+
+        records = await db.fetchall(sql, row_mode="record")
+        assert [(r.name, r.age) for r in records] == [("Ali", 20), ("Vali", 25), ("John Doe", 30)]
+        # Bir xil natija shakli uchun klass qayta yaratilmaydi
+        assert type(await db.fetchone(sql, row_mode="record")) is type(records[0])
+
+        record = await db.fetchone("SELECT count(*), max(age) AS oldest FROM users", row_mode="record")
+        assert record._0 == 3 and record.oldest == 30
+
+    async def test_iterate_row_modes(self, db: AsyncDatabase):
+        names = [name async for name in db.iterate("SELECT name FROM users", row_mode="scalar")]
+        assert names == ["John Doe"]
+        chunks = [chunk async for chunk in db.iterate("SELECT id, name FROM users", chunks=True, as_tuples=True)]
+        assert chunks == [[(1, "John Doe")]]
+
+    async def test_unknown_row_mode_raises(self, db: AsyncDatabase):
+        with pytest.raises(QueryError):
+            await db.fetchall("SELECT * FROM users", row_mode="xml")
+
+    async def test_cached_records_survive_pickling(self, db: AsyncDatabase):
+        import pickle
+        records = await db.fetchall("SELECT id, name FROM users", row_mode="record")
+        cached = pickle.loads(pickle.dumps(db._rows_to_cache(records, "record")))
+        restored = db._rows_from_cache(cached, "record")
+        assert restored == records and restored[0].name == "John Doe"
+
+
+class TestSettingsTables:
+    """register_settings_table: sozlamalar qatorlari xotiradan, yozuvlar orqali yangilanadi."""
+
+    @pytest_asyncio.fixture
+    async def settings_db(self, db: AsyncDatabase) -> AsyncDatabase:
+        await db.execute("CREATE TABLE chat_prefs (account_id INTEGER, chat_id INTEGER, enabled INTEGER, PRIMARY KEY (account_id, chat_id))")
+        await db.executemany("INSERT INTO chat_prefs VALUES (?, ?, ?)", [(1, 10, 1), (1, 20, 0), (2, 10, 1)])
+        db.register_settings_table("chat_prefs", ["account_id", "chat_id"])
+        return db
+
+    async def test_reads_are_served_from_memory(self, settings_db: AsyncDatabase):
+        assert await settings_db.get_settings_row("chat_prefs", 1, 10) == {"account_id": 1, "chat_id": 10, "enabled": 1}
+
+        with patch.object(settings_db, "fetchall", wraps=settings_db.fetchall) as spy:
+            assert await settings_db.get_settings_row("chat_prefs", 1, 20) == {"account_id": 1, "chat_id": 20, "enabled": 0}
+            assert await settings_db.get_settings_row("chat_prefs", 3, 10) is None
+            assert [r["chat_id"] for r in await settings_db.get_settings_rows("chat_prefs", 1)] == [10, 20]
+        spy.assert_not_called()
+
+        # Qaytarilgan nusxani o'zgartirish keshni buzmaydi
+        (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] = 99
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] == 1
+
+    async def test_writes_refresh_only_the_touched_account(self, settings_db: AsyncDatabase):
+        await settings_db.get_settings_row("chat_prefs", 1, 10)
+        loaded = settings_db.get_settings_cache_stats()["rows_loaded"]
+
+        await settings_db.execute("UPDATE chat_prefs SET enabled = ? WHERE account_id = ? AND chat_id = ?", (0, 2, 10))
+        await settings_db.execute("REPLACE INTO chat_prefs (account_id, chat_id, enabled) VALUES (?, ?, ?)", (2, 30, 1))
+
+        assert (await settings_db.get_settings_row("chat_prefs", 2, 10))["enabled"] == 0
+        assert await settings_db.get_settings_row("chat_prefs", 2, 30) is not None
+        # Faqat 2-akkauntning qatorlari qayta yuklandi
+        assert settings_db.get_settings_cache_stats()["rows_loaded"] == loaded + 2
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] == 1
+
+        # Kalitsiz yozuv butun jadvalni qayta yuklaydi
+        await settings_db.execute("DELETE FROM chat_prefs WHERE enabled = 0")
+        assert await settings_db.get_settings_rows("chat_prefs") == [
+            {"account_id": 1, "chat_id": 10, "enabled": 1},
+            {"account_id": 2, "chat_id": 30, "enabled": 1},
+        ]
+
+    async def test_transaction_changes_become_visible_after_commit(self, settings_db: AsyncDatabase):
+        await settings_db.get_settings_row("chat_prefs", 1, 10)
+
+        with pytest.raises(RuntimeError):
+            async with settings_db.transaction():
+                await settings_db.execute("UPDATE chat_prefs SET enabled = ? WHERE account_id = ?", (5, 1))
+                raise RuntimeError("bekor")
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] == 1
+
+        async with settings_db.transaction():
+            await settings_db.execute("UPDATE chat_prefs SET enabled = ? WHERE account_id = ?", (7, 1))
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] == 7
+
+        await settings_db.enqueue_write("UPDATE chat_prefs SET enabled = ? WHERE account_id = ?", (8, 1))
+        await settings_db.flush_writes()
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 20))["enabled"] == 8
+
+    async def test_write_during_first_load_is_not_lost(self, settings_db: AsyncDatabase):
+        loaded, resume = asyncio.Event(), asyncio.Event()
+        original_fetchall = settings_db.fetchall
+
+        async def slow_first_fetch(*args, **kwargs):
+            rows = await original_fetchall(*args, **kwargs)
+            if not loaded.is_set():
+                loaded.set()
+                await resume.wait()  # yozuv natija o'qilgandan keyin, saqlanishidan oldin tushadi
+            return rows
+
+        with patch.object(settings_db, "fetchall", side_effect=slow_first_fetch):
+            reader = asyncio.create_task(settings_db.get_settings_row("chat_prefs", 1, 10))
+            await loaded.wait()
+            await settings_db.execute("UPDATE chat_prefs SET enabled = ? WHERE account_id = ? AND chat_id = ?", (0, 1, 10))
+            resume.set()
+            assert (await reader)["enabled"] == 0
+
+        assert (await settings_db.get_settings_row("chat_prefs", 1, 10))["enabled"] == 0
+        assert settings_db.get_settings_cache_stats()["loads"] == 2
+
+    async def test_unregistered_table_raises(self, settings_db: AsyncDatabase):
+        with pytest.raises(QueryError):
+            await settings_db.get_settings_row("accounts", 1)
+        with pytest.raises(ValueError):
+            settings_db.register_settings_table("chat_prefs", [])
+
+
+class TestAccountSharding:
+    """DB_SHARD_BY_ACCOUNT: plagin jadvallari akkaunt bo'yicha alohida fayllarga yo'naltiriladi."""
+
+    @pytest_asyncio.fixture
+    async def sharded_db(self, tmp_path: Path, mock_cache_manager: AsyncMock) -> AsyncGenerator[AsyncDatabase, None]:
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: {
+            "DB_SHARD_BY_ACCOUNT": True,
+            "DB_SHARDED_TABLES": {"notes": "account_id"},
+        }.get(key, default)
+
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        (migrations_dir / "V001_schema.sql").write_text(
+            "CREATE TABLE accounts (id INTEGER PRIMARY KEY, name TEXT);\n"
+            "CREATE TABLE notes (account_id INTEGER NOT NULL, name TEXT NOT NULL, content TEXT, PRIMARY KEY (account_id, name));"
+        )
+
+        database = AsyncDatabase(config_manager=config, cache_manager=mock_cache_manager)
+        database.configure(db_path=tmp_path / "main.db", table_whitelist=None, column_whitelist={})
+        database.migrations_path = migrations_dir
+        database.initial_data_path = tmp_path / "missing_initial_data.sql"
+        await database.connect()
+        yield database
+        await database.close()
+
+    async def test_keyed_statements_are_routed_to_account_shards(self, sharded_db: AsyncDatabase):
+        await sharded_db.execute("INSERT INTO accounts (id, name) VALUES (?, ?)", (1, "birinchi"))
+        await sharded_db.execute("INSERT INTO notes (account_id, name, content) VALUES (?, ?, ?)", (1, "a", "bir"))
+        await sharded_db.execute_insert("INSERT INTO notes (name, account_id, content) VALUES (?, ?, ?)", ("b", 2, "ikki"))
+
+        shard_1, shard_2 = await sharded_db.shard_for(1), await sharded_db.shard_for(2)
+        assert shard_1.db_path.name == "account_1.db" and shard_1.db_path.exists()
+        # Asosiy jadvallar asosiy faylda qoladi, plagin jadvali esa shardlarda
+        assert await shard_1.fetch_val("SELECT count(*) FROM accounts") == 0
+        assert await sharded_db.fetch_val("SELECT count(*) FROM accounts") == 1
+        assert await sharded_db.fetch_val("SELECT count(*) FROM notes") == 0
+        assert await shard_1.fetch_val("SELECT count(*) FROM notes") == 1
+        assert await shard_2.fetch_val("SELECT content FROM notes") == "ikki"
+
+        assert await sharded_db.fetchall("SELECT name FROM notes WHERE account_id = ?", (2,)) == [{"name": "b"}]
+        assert await sharded_db.fetchone("SELECT content FROM notes WHERE name = ? AND account_id = ?", ("a", 1)) == {"content": "bir"}
+        assert await sharded_db.execute("UPDATE notes SET content = ? WHERE account_id = ?", ("yangi", 1)) == 1
+        assert [row async for row in sharded_db.iterate("SELECT content FROM notes WHERE account_id = ?", (1,))] == [{"content": "yangi"}]
+
+    async def test_batched_writes_are_split_per_shard(self, sharded_db: AsyncDatabase):
+        rows = [(account_id, f"n{i}", "x") for i in range(3) for account_id in (1, 2)]
+        assert await sharded_db.executemany("INSERT INTO notes (account_id, name, content) VALUES (?, ?, ?)", rows) == 6
+
+        await sharded_db.enqueue_write("INSERT INTO notes (account_id, name, content) VALUES (?, ?, ?)", (3, "q", "navbat"))
+        assert await sharded_db.flush_writes() == 1
+
+        counts = {shard.shard_account_id: await shard.fetch_val("SELECT count(*) FROM notes") for shard in await sharded_db.get_shards()}
+        assert counts == {1: 3, 2: 3, 3: 1}
+
+    async def test_writes_for_different_accounts_do_not_wait_for_each_other(self, sharded_db: AsyncDatabase):
+        shard_1 = await sharded_db.shard_for(1)
+        async with shard_1.transaction():
+            await sharded_db.execute("INSERT INTO notes (account_id, name) VALUES (?, ?)", (1, "tx"))
+            # Boshqa akkauntning yozuvchisi alohida: ochiq tranzaksiyani kutmaydi
+            await asyncio.wait_for(sharded_db.execute("INSERT INTO notes (account_id, name) VALUES (?, ?)", (2, "parallel")), timeout=2)
+        assert await sharded_db.fetch_val("SELECT count(*) FROM notes WHERE account_id = ?", (2,)) == 1
+
+    async def test_existing_shards_are_discovered_for_maintenance(self, sharded_db: AsyncDatabase, tmp_path: Path):
+        await sharded_db.execute("INSERT INTO notes (account_id, name) VALUES (?, ?)", (7, "a"))
+        await sharded_db.close()
+
+        await sharded_db.connect()
+        databases = await sharded_db.all_databases()
+        assert databases[0] is sharded_db
+        assert [db.shard_account_id for db in databases[1:]] == [7]
+        # Kalitsiz so'rov chaqirilgan faylning o'zida bajariladi
+        assert await sharded_db.execute("DELETE FROM notes") == 0
+        assert await databases[1].execute("DELETE FROM notes") == 1
+
+    async def test_sharding_disabled_keeps_single_file(self, db: AsyncDatabase):
+        assert not db.sharding_enabled
+        assert await db.database_for(1) is db
+        assert await db.all_databases() == [db]
+
+    async def test_settings_rows_are_read_from_the_account_shard(self, sharded_db: AsyncDatabase):
+        sharded_db.register_settings_table("notes", ["account_id", "name"])
+        await sharded_db.execute("INSERT INTO notes (account_id, name, content) VALUES (?, ?, ?)", (4, "til", "uz"))
+
+        assert (await sharded_db.get_settings_row("notes", 4, "til"))["content"] == "uz"
+        await sharded_db.execute("UPDATE notes SET content = ? WHERE account_id = ?", ("en", 4))
+        assert (await sharded_db.get_settings_row("notes", 4, "til"))["content"] == "en"
+        assert await sharded_db.get_settings_row("notes", 5, "til") is None
+
+    async def test_bulk_insert_is_split_per_shard(self, sharded_db: AsyncDatabase):
+        rows = [{"account_id": account_id, "name": f"n{i}"} for i in range(150) for account_id in (1, 2)]
+        assert await sharded_db.insert_many("notes", rows) == 300
+        assert await sharded_db.upsert_many("notes", [{"account_id": 2, "name": "n0", "content": "yangi"}], ["account_id", "name"]) == 1
+
+        assert await (await sharded_db.shard_for(1)).fetch_val("SELECT count(*) FROM notes") == 150
+        assert await (await sharded_db.shard_for(2)).fetch_val("SELECT content FROM notes WHERE name = 'n0'") == "yangi"
+        assert await sharded_db.fetch_val("SELECT count(*) FROM notes") == 0
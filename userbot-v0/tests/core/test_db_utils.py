@@ -11,11 +11,18 @@ from core.db_utils import (
     _validate_table_name_util,
     _validate_column_names_util,
     _get_db_stats_util,
+    _get_table_stats_util,
     _run_migrations_util,
     _create_backup_util,
     _run_initial_data_script_util,
+    _extract_read_tables_util,
+    _extract_write_tables_util,
+    _split_sql_script_util,
+    _build_bulk_insert_sql_util,
+    _shard_param_index_util,
 )
 from core.database import AsyncDatabase
+from core.config import BASE_DIR
 from core.exceptions import QueryError, DatabaseError
 from core.config_manager import ConfigManager
 from core.cache import CacheManager
@@ -226,6 +233,44 @@ class TestValidationUtils:
             _validate_column_names_util("users", ["id", "password"], whitelist)
 
 
+class TestQueryTableUtils:
+    """So'rovlardan jadval nomlarini ajratib olishni test qilish."""
+
+    def test_extract_read_tables(self):
+        sql = 'SELECT a.* FROM afk_settings a JOIN "notes" n ON 1 WHERE a.x IN (SELECT user_id FROM admins)'
+        assert _extract_read_tables_util(sql) == ["admins", "afk_settings", "notes"]
+
+    def test_extract_read_tables_comma_join(self):
+        assert _extract_read_tables_util("SELECT * FROM a, b WHERE a.id=b.id") == ["a", "b"]
+        assert _extract_read_tables_util("SELECT * FROM a AS x JOIN b ON x.id = b.id, main.c y ORDER BY 1, 2") == ["a", "b", "c"]
+
+    def test_extract_read_tables_uncertain(self):
+        assert _extract_read_tables_util("SELECT * FROM (SELECT * FROM a) t") is None
+        assert _extract_read_tables_util("WITH t AS (SELECT * FROM a) SELECT * FROM t") is None
+
+    def test_extract_write_tables(self):
+        assert _extract_write_tables_util("INSERT OR IGNORE INTO users (id) VALUES (1)") == ["users"]
+        assert _extract_write_tables_util("  update users set a = 1") == ["users"]
+        assert _extract_write_tables_util("DELETE FROM logged_media WHERE id = 1") == ["logged_media"]
+        assert _extract_write_tables_util("CREATE TABLE IF NOT EXISTS foo (id INTEGER)") == ["foo"]
+
+    def test_extract_write_tables_read_and_unknown(self):
+        assert _extract_write_tables_util("SELECT 1") == []
+        assert _extract_write_tables_util("PRAGMA journal_mode") == []
+        assert _extract_write_tables_util("VACUUM") is None
+
+
+    def test_build_bulk_insert_sql(self):
+        assert _build_bulk_insert_sql_util("users", ("id", "name"), 2) == "INSERT INTO users (id, name) VALUES (?, ?), (?, ?)"
+        assert _build_bulk_insert_sql_util("users", ("id", "name"), 1, ("id",)).endswith("ON CONFLICT(id) DO UPDATE SET name = excluded.name")
+        assert _build_bulk_insert_sql_util("users", ("id",), 1, ("id",)).endswith("ON CONFLICT(id) DO NOTHING")
+
+    def test_multi_row_insert_has_no_single_account_key(self):
+        tables = {"notes": "account_id"}
+        assert _shard_param_index_util("INSERT INTO notes (name, account_id) VALUES (?, ?)", tables) == 1
+        assert _shard_param_index_util("INSERT INTO notes (name, account_id) VALUES (?, ?), (?, ?)", tables) is None
+
+
 class TestMigrationUtils:
     """Migratsiya funksiyalarini test qilish."""
 
@@ -290,6 +335,199 @@ class TestMigrationUtils:
             mock_logger_info.assert_called_with("Ma'lumotlar bazasi sxemasi dolzarb. Yangi migratsiyalar yo'q.")
 
 
+    @pytest.mark.asyncio
+    async def test_run_migrations_util_pending_applied_atomically(self, db: AsyncDatabase, tmp_path: Path):
+        """Yangi migratsiyalardan biri yiqilsa, oldingilari ham qo'llanilmaydi."""
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        (migrations_dir / "V001_ok.sql").write_text("CREATE TABLE ok_table (id INTEGER); INSERT INTO ok_table VALUES (1);")
+        (migrations_dir / "V002_bad.sql").write_text("INSERT INTO missing_table VALUES (1);")
+        db.migrations_path = migrations_dir
+
+        with pytest.raises(QueryError, match="Migratsiya xatosi: V002_bad.sql"):
+            await _run_migrations_util(db)
+
+        assert await db.fetch_val("SELECT count(*) FROM sqlite_master WHERE name = 'ok_table'") == 0
+        assert await db.fetch_val("SELECT count(*) FROM applied_migrations") == 0
+
+    @pytest.mark.asyncio
+    async def test_run_migrations_util_detects_changed_applied_file(self, db: AsyncDatabase, tmp_path: Path):
+        """Qo'llanilgan migratsiya fayli o'zgartirilsa, checksum xatosi ko'tariladi."""
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        migration = migrations_dir / "V001_first.sql"
+        migration.write_text("CREATE TABLE first (id INTEGER);")
+        db.migrations_path = migrations_dir
+        await _run_migrations_util(db)
+
+        migration.write_text("CREATE TABLE first (id INTEGER, extra TEXT);")
+
+        with pytest.raises(QueryError, match="checksum"):
+            await _run_migrations_util(db)
+
+    @pytest.mark.asyncio
+    async def test_run_migrations_util_backfills_legacy_checksums(self, db: AsyncDatabase, tmp_path: Path):
+        """checksum ustunisiz eski `applied_migrations` jadvali yangilanadi va to'ldiriladi."""
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        (migrations_dir / "V001_first.sql").write_text("CREATE TABLE first (id INTEGER);")
+        db.migrations_path = migrations_dir
+        await db.execute("CREATE TABLE applied_migrations (id INTEGER PRIMARY KEY, filename TEXT UNIQUE NOT NULL, applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)")
+        await db.execute("INSERT INTO applied_migrations (filename) VALUES ('V001_first.sql')")
+
+        await _run_migrations_util(db)
+
+        checksum = await db.fetch_val("SELECT checksum FROM applied_migrations WHERE filename = 'V001_first.sql'")
+        assert checksum and len(checksum) == 64
+
+    def test_split_sql_script_util(self):
+        """Skript so'rovlarga to'g'ri ajratilishini tekshirish (satr va trigger ichidagi `;` bilan)."""
+        script = (
+            "-- izoh\nCREATE TABLE a (x TEXT); INSERT INTO a VALUES ('1;2');\n"
+            "CREATE TRIGGER t AFTER INSERT ON a BEGIN UPDATE a SET x = 'y'; END;\n-- oxiri\n"
+        )
+
+        statements = _split_sql_script_util(script)
+
+        assert len(statements) == 3
+        assert statements[1] == "INSERT INTO a VALUES ('1;2');"
+        assert statements[2].endswith("END;")
+
+
+    @pytest.mark.asyncio
+    async def test_rollup_triggers_maintain_aggregates(self, db: AsyncDatabase):
+        """Loyihaning haqiqiy migratsiyalari: yig'ma jadvallar yozuv paytida yangilanadi va xom qatorlar o'chirilganda saqlanib qoladi."""
+        db.migrations_path = BASE_DIR / "data" / "migrations"
+        await _run_migrations_util(db)
+
+        await db.executemany(
+            "INSERT INTO task_logs (task_key, run_at, duration_ms, status) VALUES (?, ?, ?, ?)",
+            [("t.a", "2024-05-01 10:05:00.5", 10.0, "SUCCESS"), ("t.a", "2024-05-01 10:55:00", 30.0, "FAILURE"), ("t.a", "2024-05-01 11:00:00", 5.0, "SUCCESS")],
+        )
+        await db.executemany(
+            "INSERT INTO logged_media (account_id, source_chat_id, file_size, timestamp) VALUES (?, ?, ?, ?)",
+            [(1, 100, 500, "2024-05-01 10:00:00"), (1, 100, 700, "2024-05-01 10:30:00"), (1, 200, None, "2024-05-01 12:00:00")],
+        )
+        upsert = (
+            "INSERT INTO ai_usage_stats (userbot_account_id, stat_date, call_count) VALUES (?, ?, 1) "
+            "ON CONFLICT(userbot_account_id, stat_date) DO UPDATE SET call_count = call_count + 1"
+        )
+        for _ in range(3):
+            await db.execute(upsert, (1, "2024-05-01"))
+        await db.execute("DELETE FROM task_logs")
+        await db.execute("DELETE FROM logged_media")
+
+        hourly = await db.fetchall("SELECT bucket, runs, success_count, failure_count, total_duration_ms, max_duration_ms FROM task_logs_hourly ORDER BY bucket")
+        assert hourly == [
+            {"bucket": "2024-05-01 10:00:00", "runs": 2, "success_count": 1, "failure_count": 1, "total_duration_ms": 40.0, "max_duration_ms": 30.0},
+            {"bucket": "2024-05-01 11:00:00", "runs": 1, "success_count": 1, "failure_count": 0, "total_duration_ms": 5.0, "max_duration_ms": 5.0},
+        ]
+        assert await db.fetch_val("SELECT runs FROM task_logs_daily WHERE bucket = '2024-05-01' AND task_key = 't.a'") == 3
+
+        media = await db.fetchall("SELECT source_chat_id, media_count, total_bytes FROM logged_media_daily ORDER BY source_chat_id")
+        assert media == [{"source_chat_id": 100, "media_count": 2, "total_bytes": 1200}, {"source_chat_id": 200, "media_count": 1, "total_bytes": 0}]
+
+        assert await db.fetch_val("SELECT call_count FROM ai_usage_totals WHERE userbot_account_id = 1") == 3
+        assert await db.fetch_val("SELECT SUM(call_count) FROM ai_usage_hourly WHERE userbot_account_id = 1") == 3
+
+
+class TestTableStats:
+    """Taxminiy (sqlite_stat1/rowid) va aniq jadval statistikasi."""
+
+    pytestmark = pytest.mark.asyncio
+
+    async def _fill(self, db: AsyncDatabase):
+        await db.execute("CREATE TABLE stats_a (id INTEGER PRIMARY KEY, name TEXT)")
+        await db.execute("CREATE INDEX idx_stats_a_name ON stats_a (name)")
+        await db.execute("CREATE TABLE stats_b (id INTEGER PRIMARY KEY, body TEXT)")
+        await db.executemany("INSERT INTO stats_a (name) VALUES (?)", [(f"n{i}",) for i in range(50)])
+        await db.executemany("INSERT INTO stats_b (body) VALUES (?)", [("x" * 500,) for _ in range(20)])
+        # Boshidan o'chirilgan qatorlar: rowid oralig'i bo'yicha taxmin
+        await db.execute("DELETE FROM stats_b WHERE id <= 5")
+
+    async def test_approximate_counts_from_stat1_and_rowid_range(self, db: AsyncDatabase):
+        await self._fill(db)
+        await db.analyze()
+        await db.execute("INSERT INTO stats_a (name) VALUES ('keyin')")
+        await db.execute("CREATE TABLE stats_c (id INTEGER PRIMARY KEY)")
+        await db.executemany("INSERT INTO stats_c (id) VALUES (?)", [(i,) for i in (3, 4, 7)])
+
+        result = await _get_table_stats_util(db)
+        tables = {t["name"]: t for t in result["tables"]}
+
+        # sqlite_stat1 ANALYZE paytidagi holatni ko'rsatadi
+        assert tables["stats_a"]["row_count"] == 50
+        assert tables["stats_a"]["indexes"] == ["idx_stats_a_name"]
+        assert tables["stats_b"]["row_count"] == 15
+        assert tables["stats_c"]["row_count"] == 5
+        assert not any(t["row_count_exact"] for t in tables.values())
+        assert "sqlite_stat1" not in tables
+
+        if result["dbstat"]:
+            assert tables["stats_b"]["size_bytes"] > 15 * 500
+
+    async def test_exact_counts(self, db: AsyncDatabase):
+        await self._fill(db)
+        await db.execute("CREATE TABLE stats_c (id INTEGER PRIMARY KEY)")
+        await db.executemany("INSERT INTO stats_c (id) VALUES (?)", [(i,) for i in (3, 4, 7)])
+
+        result = await _get_table_stats_util(db, exact=True)
+        counts = {t["name"]: t["row_count"] for t in result["tables"]}
+        assert counts == {"stats_a": 50, "stats_b": 15, "stats_c": 3}
+        assert all(t["row_count_exact"] for t in result["tables"])
+
+    async def test_results_are_cached_and_exact_serves_approximate(self, db: AsyncDatabase):
+        await self._fill(db)
+
+        first = await db.get_table_stats()
+        assert first["cached"] is False
+        await db.execute("INSERT INTO stats_a (name) VALUES ('yangi')")
+        second = await db.get_table_stats()
+        assert second["cached"] is True
+        assert second["tables"] == first["tables"]
+
+        exact = await db.get_table_stats(exact=True)
+        assert exact["cached"] is False
+        assert {t["name"]: t["row_count"] for t in exact["tables"]}["stats_a"] == 51
+        assert (await db.get_table_stats())["exact"] is True
+
+        await db.analyze()
+        assert (await db.get_table_stats())["cached"] is False
+
+        stats = await db.db_stats()
+        assert stats["table_stats"]["cached"] is True
+        assert stats["total_rows"] >= 66
+
+    async def test_stats_on_real_migrated_schema(self, tmp_path: Path, mock_cache_manager: AsyncMock):
+        """Haqiqiy data/migrations: FTS5 virtual/shadow va WITHOUT ROWID jadvallar statistikani buzmaydi."""
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: default
+        database = AsyncDatabase(config_manager=config, cache_manager=mock_cache_manager)
+        database.configure(db_path=tmp_path / "migrated.db")
+        await database.connect()
+        try:
+            await database.execute("CREATE TABLE stats_kv (k TEXT PRIMARY KEY, v TEXT) WITHOUT ROWID")
+            await database.execute("INSERT INTO stats_kv VALUES ('a', '1')")
+            await database.execute(
+                "INSERT INTO notes (account_id, name, content) VALUES (1, 'n', 'matn')"
+            )
+
+            result = await _get_table_stats_util(database)
+            tables = {t["name"]: t for t in result["tables"]}
+            assert "notes" in tables and "message_journal" in tables
+            assert not any(name.endswith("_fts") or "_fts_" in name for name in tables)
+            assert tables["stats_kv"]["row_count"] is None
+            assert tables["notes"]["row_count"] == 1
+
+            exact = {t["name"]: t["row_count"] for t in (await _get_table_stats_util(database, exact=True))["tables"]}
+            assert exact["stats_kv"] == 1
+
+            stats = await database.db_stats()
+            assert "error" not in stats
+        finally:
+            await database.close()
+
+
 class TestOtherDBUtils:
     """Qolgan yordamchi funksiyalarni test qilish."""
 
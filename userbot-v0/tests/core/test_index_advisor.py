@@ -0,0 +1,96 @@
+# tests/core/test_index_advisor.py
+
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from core.cache import CacheManager
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+from core.index_advisor import IndexAdvisor, IndexRecommendation
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: default
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.configure(db_path=tmp_path / "advisor.db")
+    database.migrations_path = tmp_path / "migrations"
+    await database.connect()
+    await database.execute(
+        "CREATE TABLE logged_media (id INTEGER PRIMARY KEY, account_id INTEGER, source_chat_id INTEGER, file_name TEXT, timestamp DATETIME)"
+    )
+    await database.executemany(
+        "INSERT INTO logged_media (account_id, source_chat_id, file_name, timestamp) VALUES (?, ?, ?, ?)",
+        [(i % 5, i % 7, f"f{i}", f"2024-01-{i % 28 + 1:02d}") for i in range(300)],
+    )
+    database.reset_query_profile()
+    yield database
+    await database.close()
+
+
+class TestIndexAdvisor:
+
+    async def test_recommends_covering_index_for_full_scan(self, db: AsyncDatabase):
+        for _ in range(3):
+            await db.fetchall(
+                "SELECT source_chat_id, COUNT(id) AS c FROM logged_media WHERE account_id = ? AND timestamp >= ? GROUP BY source_chat_id",
+                (1, "2024-01-10"),
+            )
+
+        [rec] = await IndexAdvisor(db).analyze()
+
+        assert rec.table == "logged_media"
+        assert rec.columns == ["account_id", "timestamp", "source_chat_id"]
+        assert rec.covering
+        assert rec.calls == 3
+        assert rec.row_count == 300
+        assert rec.estimated_saving_ms <= rec.total_ms
+
+    async def test_select_star_gets_key_only_index(self, db: AsyncDatabase):
+        await db.fetchall("SELECT * FROM logged_media WHERE file_name = ?", ("f1",))
+
+        [rec] = await IndexAdvisor(db).analyze()
+
+        assert rec.columns == ["file_name"]
+        assert not rec.covering
+
+    async def test_existing_index_suppresses_recommendation(self, db: AsyncDatabase):
+        await db.fetchall("SELECT * FROM logged_media WHERE file_name = ?", ("f1",))
+        await db.execute("CREATE INDEX idx_file ON logged_media (file_name)")
+
+        assert await IndexAdvisor(db).analyze() == []
+
+    async def test_indexed_lookup_not_reported(self, db: AsyncDatabase):
+        await db.fetchall("SELECT * FROM logged_media WHERE id = ?", (5,))
+
+        assert await IndexAdvisor(db).analyze() == []
+
+    async def test_write_migration_uses_next_version(self, db: AsyncDatabase):
+        db.migrations_path.mkdir()
+        (db.migrations_path / "V009_plugin_tools.sql").write_text("-- noop")
+        rec = IndexRecommendation(table="logged_media", columns=["account_id", "timestamp"], key_columns=2, row_count=300, calls=4, total_ms=12.0, statements=["SELECT ..."])
+
+        path = IndexAdvisor(db).write_migration([rec])
+
+        assert path.name == "V010_index_advisor.sql"
+        content = path.read_text(encoding="utf-8")
+        assert "CREATE INDEX IF NOT EXISTS idx_logged_media_account_id_timestamp ON logged_media (account_id, timestamp);" in content
+
+        await db.execute(content)
+        assert IndexAdvisor(db).write_migration([]) is None
@@ -153,8 +153,8 @@ class TestMainLogic:
 
         # `register_cleanup_table` metodiga qilingan chaqiruvlarni tekshiramiz
         calls = [
-            call("afk_mentions", "mention_time"),
-            call("logged_media", "timestamp")
+            call("afk_mentions", "mention_time", archive=True),
+            call("logged_media", "timestamp", archive=True)
         ]
         mock_dependencies['db_instance'].register_cleanup_table.assert_has_calls(calls, any_order=True)
 
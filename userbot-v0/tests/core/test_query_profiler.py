@@ -0,0 +1,85 @@
+# tests/core/test_query_profiler.py
+
+import pytest
+
+from core.query_profiler import QueryProfiler, normalize_sql
+
+
+class TestNormalizeSql:
+    """So'rovlarni normallashtirishni test qilish."""
+
+    def test_literals_and_whitespace(self):
+        sql = "SELECT *  FROM users\n WHERE id = 42 AND name = 'O''Brien';"
+        assert normalize_sql(sql) == "SELECT * FROM users WHERE id = ? AND name = ?"
+
+    def test_in_list_is_collapsed(self):
+        assert normalize_sql("DELETE FROM t WHERE id IN (?, ?, ?)") == normalize_sql("DELETE FROM t WHERE id IN (1,2)")
+
+    def test_identifiers_with_digits_are_kept(self):
+        assert normalize_sql("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+class TestQueryProfiler:
+    """Profil statistikasi va sekin so'rovlar jurnalini test qilish."""
+
+    def test_record_and_percentiles(self):
+        profiler = QueryProfiler()
+        for ms in range(1, 101):
+            profiler.record("SELECT * FROM users WHERE id = ?", float(ms), rows=1)
+
+        [item] = profiler.get_profile()
+        assert item["count"] == 100
+        assert item["rows"] == 100
+        assert item["p50_ms"] == 50.0
+        assert item["p95_ms"] == 95.0
+        assert item["p99_ms"] == 99.0
+        assert item["max_ms"] == 100.0
+
+    def test_lock_retries_grouped_by_statement(self):
+        profiler = QueryProfiler()
+        profiler.record("UPDATE users SET age = 1", 1.0)
+        profiler.record_lock_retry("UPDATE users SET age = 2")
+
+        [item] = profiler.get_profile()
+        assert item["lock_retries"] == 1
+        assert profiler.get_summary()["lock_retries"] == 1
+
+    def test_sorting_and_invalid_key(self):
+        profiler = QueryProfiler()
+        profiler.record("SELECT a FROM t", 10.0)
+        for _ in range(5):
+            profiler.record("SELECT b FROM t", 1.0)
+
+        assert profiler.get_profile(sort_by="total_ms")[0]["statement"] == "SELECT a FROM t"
+        assert profiler.get_profile(sort_by="count")[0]["statement"] == "SELECT b FROM t"
+        with pytest.raises(ValueError):
+            profiler.get_profile(sort_by="unknown")
+
+    def test_slowlog_is_bounded_and_newest_first(self):
+        profiler = QueryProfiler(slow_threshold_ms=5, slowlog_size=2)
+        assert not profiler.is_slow(4.9)
+        assert profiler.is_slow(5)
+        for i in range(3):
+            profiler.add_slow_query(f"SELECT {i}", (), 10.0 + i)
+
+        log = profiler.get_slowlog()
+        assert [entry["sql"] for entry in log] == ["SELECT 2", "SELECT 1"]
+        assert log[0]["plan"] is None
+
+    def test_max_statements_limit(self):
+        profiler = QueryProfiler(max_statements=1)
+        profiler.record("SELECT a FROM t", 1.0)
+        profiler.record("SELECT b FROM t", 1.0)
+
+        assert len(profiler.get_profile()) == 1
+        assert profiler.get_summary()["dropped"] == 1
+
+    def test_reset_keeps_slowlog_when_requested(self):
+        profiler = QueryProfiler(slow_threshold_ms=1)
+        profiler.record("SELECT 1", 2.0)
+        profiler.add_slow_query("SELECT 1", (), 2.0)
+
+        profiler.reset(slowlog=False)
+
+        assert profiler.get_profile() == []
+        assert len(profiler.get_slowlog()) == 1
@@ -0,0 +1,155 @@
+# tests/core/test_search_index.py
+
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from core.cache import CacheManager
+from core.config import BASE_DIR
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+from core.db_utils import _run_migrations_util
+from core.search_index import (
+    HIGHLIGHT_END,
+    HIGHLIGHT_START,
+    SEARCH_SOURCES,
+    build_match_query,
+    encode_cursor,
+    search,
+    sync_all,
+    sync_source,
+)
+
+JOURNAL_SQL = "INSERT INTO message_journal (account_id, chat_id, message_id, sender_id, event, text) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    """Loyihaning haqiqiy migratsiyalari qo'llangan baza."""
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: default
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.configure(db_path=tmp_path / "search.db")
+    await database.connect()
+    database.migrations_path = BASE_DIR / "data" / "migrations"
+    await _run_migrations_util(database)
+    yield database
+    await database.close()
+
+
+class TestMatchQuery:
+
+    def test_terms_are_quoted_and_operators_kept(self):
+        assert build_match_query('salom dunyo') == '"salom" "dunyo"'
+        assert build_match_query('hisob* OR "aniq ibora"') == '"hisob"* OR "aniq ibora"'
+        assert build_match_query('a"b) NEAR(') == '"a""b)" "NEAR("'
+
+    def test_dangling_operators_are_dropped(self):
+        assert build_match_query("OR salom NOT") == '"salom"'
+        assert build_match_query("   ") == ""
+
+
+class TestIncrementalIndexing:
+    pytestmark = pytest.mark.asyncio
+
+    async def test_journal_is_indexed_in_batches_off_the_write_path(self, db: AsyncDatabase):
+        for i in range(5):
+            await db.enqueue_write(JOURNAL_SQL, (1, -1001, i, 42, "new", f"xabar raqam {i} banan"))
+        await db.flush_writes()
+
+        # Yozuv paytida indekslanmaydi
+        assert await search(db, "banan", account_id=1) == []
+
+        assert await sync_source(db, SEARCH_SOURCES["journal"], batch_size=2, max_batches=1) == 2
+        assert await db.fetch_val("SELECT last_rowid FROM search_index_state WHERE source = 'message_journal'") == 2
+        assert len(await search(db, "banan", account_id=1)) == 2
+
+        assert await sync_all(db, batch_size=2) == {"journal": 3, "afk": 0}
+        assert await sync_all(db, batch_size=2) == {"journal": 0, "afk": 0}
+        assert len(await search(db, "banan", account_id=1)) == 5
+
+    async def test_deleting_rows_keeps_index_consistent(self, db: AsyncDatabase):
+        await db.executemany(JOURNAL_SQL, [(1, 10, i, 42, "new", f"olma {i}") for i in range(4)])
+        await sync_all(db)
+        await db.execute(JOURNAL_SQL, (1, 10, 99, 42, "delete", "olma indekslanmagan"))
+
+        # Indekslangan va hali indekslanmagan qatorlar o'chiriladi
+        await db.execute("DELETE FROM message_journal WHERE message_id IN (0, 99)")
+        await sync_all(db)
+
+        # Indeks buzilgan bo'lsa integrity-check xatolik qaytaradi
+        await db.execute("INSERT INTO message_journal_fts (message_journal_fts) VALUES ('integrity-check')")
+        rows = await search(db, "olma", account_id=1)
+        assert sorted(r["message_id"] for r in rows) == [1, 2, 3]
+
+    async def test_notes_replace_keeps_single_index_entry(self, db: AsyncDatabase):
+        sql = "REPLACE INTO notes (account_id, name, content) VALUES (?, ?, ?)"
+        await db.execute(sql, (1, "retsept", "eski palov retsepti"))
+        await db.execute(sql, (1, "retsept", "yangi palov retsepti"))
+
+        assert await db.fetch_val("SELECT count(*) FROM notes_fts") == 1
+        assert await search(db, "eski", account_id=1) == []
+        [row] = await search(db, "palov", account_id=1)
+        assert row["source"] == "notes" and row["label"] == "retsept"
+
+        await db.execute("DELETE FROM notes WHERE name = 'retsept'")
+        assert await search(db, "palov", account_id=1) == []
+
+
+class TestSearch:
+    pytestmark = pytest.mark.asyncio
+
+    async def test_ranking_snippet_and_scoping(self, db: AsyncDatabase):
+        await db.executemany(JOURNAL_SQL, [
+            (1, 10, 1, 42, "new", "choy ichamizmi"),
+            (1, 10, 2, 42, "edit", "choy choy choy hamma joyda choy"),
+            (1, 20, 3, 42, "new", "kofe yaxshiroq, lekin choy ham bo'ladi"),
+            (2, 10, 4, 42, "new", "boshqa akkauntdagi choy"),
+        ])
+        await db.execute(
+            "INSERT INTO afk_mentions (afk_account_id, chatter_id, chat_id, message_id, message_text) VALUES (?, ?, ?, ?, ?)",
+            (1, 7, 30, 5, "choyga boramizmi?"),
+        )
+        await sync_all(db)
+
+        rows = await search(db, "choy", account_id=1)
+        assert [r["message_id"] for r in rows][0] == 2
+        assert {r["source"] for r in rows} == {"journal"}
+        assert all(f"{HIGHLIGHT_START}choy{HIGHLIGHT_END}" in r["snippet"] for r in rows)
+        assert rows == sorted(rows, key=lambda r: r["rank"])
+
+        assert [r["message_id"] for r in await search(db, "choy", account_id=1, chat_id=20)] == [3]
+        assert [r["source"] for r in await search(db, "choy*", account_id=1, sources=["afk"])] == ["afk"]
+        assert [r["message_id"] for r in await search(db, "choy", account_id=2)] == [4]
+
+    async def test_keyset_pagination_covers_all_results_once(self, db: AsyncDatabase):
+        await db.executemany(JOURNAL_SQL, [(1, 10, i, 42, "new", "non " * (i % 3 + 1) + f"raqam {i}") for i in range(7)])
+        await db.execute("REPLACE INTO notes (account_id, name, content) VALUES (1, 'non', 'issiq non')")
+        await sync_all(db)
+
+        seen, after = [], None
+        while True:
+            page = await search(db, "non", account_id=1, after=after, limit=3)
+            if not page:
+                break
+            seen.extend((r["source"], r["row_key"]) for r in page)
+            after = encode_cursor(page[-1])
+
+        assert len(seen) == 8
+        assert len(set(seen)) == 8
+
+    async def test_invalid_cursor_raises(self, db: AsyncDatabase):
+        with pytest.raises(ValueError):
+            await search(db, "non", account_id=1, after="noto'g'ri")
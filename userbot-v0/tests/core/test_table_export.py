@@ -0,0 +1,98 @@
+# tests/core/test_table_export.py
+
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+
+from core.cache import CacheManager
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+from core.exceptions import QueryError
+from core.table_export import available_compressions, export_table
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: default
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.configure(db_path=tmp_path / "export.db")
+    await database.connect()
+    await database.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, secret TEXT)")
+    await database.executemany("INSERT INTO items (name, secret) VALUES (?, ?)", [(f"nom, \"{i}\"", "x") for i in range(250)])
+    yield database
+    await database.close()
+
+
+async def test_csv_export_streams_in_chunks_with_projection_and_filter(db: AsyncDatabase):
+    result = await export_table(db, "items", fmt="csv", columns=["id", "name"], where="id > 200", chunk_size=7)
+    with result.file:
+        text = result.file.read().decode("utf-8")
+
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == ["id", "name"]
+    assert len(rows) == 51 and result.rows == 50
+    assert rows[1] == ["201", 'nom, "200"']
+    assert result.filename == "items_export.csv"
+    assert result.size_bytes == len(text.encode("utf-8"))
+
+
+async def test_json_and_jsonl_exports(db: AsyncDatabase):
+    result = await export_table(db, "items", fmt="json", columns=["id"], chunk_size=100)
+    with result.file:
+        assert [row["id"] for row in json.load(result.file)] == list(range(1, 251))
+
+    result = await export_table(db, "items", fmt="jsonl", where="id <= 3")
+    with result.file:
+        lines = result.file.read().decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines][0] == {"id": 1, "name": 'nom, "0"', "secret": "x"}
+    assert len(lines) == 3
+
+    result = await export_table(db, "items", fmt="json", where="id < 0")
+    with result.file:
+        assert json.load(result.file) == [] and result.rows == 0
+
+
+async def test_gzip_export_is_spooled_to_disk_when_large(db: AsyncDatabase):
+    result = await export_table(db, "items", fmt="jsonl", compression="gzip", spool_max_bytes=64)
+    with result.file:
+        assert result.file._rolled  # xotira chegarasidan oshgach diskka o'tgan
+        assert result.filename == "items_export.jsonl.gz"
+        lines = gzip.decompress(result.file.read()).decode("utf-8").splitlines()
+    assert len(lines) == result.rows == 250
+
+
+async def test_invalid_requests_are_rejected(db: AsyncDatabase):
+    with pytest.raises(ValueError):
+        await export_table(db, "items; DROP TABLE items")
+    with pytest.raises(ValueError):
+        await export_table(db, "missing_table")
+    with pytest.raises(ValueError):
+        await export_table(db, "items", columns=["id", "nope"])
+    with pytest.raises(ValueError):
+        await export_table(db, "items", fmt="xml")
+    if "zstd" not in available_compressions():
+        with pytest.raises(ValueError):
+            await export_table(db, "items", compression="zstd")
+    # Shart faqat o'qish uchun ulanishda bajariladi
+    with pytest.raises(QueryError):
+        await export_table(db, "items", where="id IN (SELECT nope FROM items)")
+    assert await db.fetch_val("SELECT count(*) FROM items") == 250
@@ -17,13 +17,16 @@ from core.client_manager import ClientManager
 from core.exceptions import DatabaseError, QueryError
 
 
-from core.tasks import cleanup_old_database_entries, vacuum_database
+from core.tasks import cleanup_old_database_entries, vacuum_database, incremental_vacuum_database
 
 
 @pytest.fixture
 def mock_db() -> AsyncMock:
     db = AsyncMock(spec=AsyncDatabase)
     db.get_cleanup_configurations.return_value = {"test_table": "test_date_col"}
+    db.get_cleanup_retention_days.return_value = None
+    db.get_archive_tables.return_value = set()
+    db.all_databases.return_value = [db]
     db.transaction = MagicMock(return_value=AsyncMock(__aenter__=AsyncMock(), __aexit__=AsyncMock(return_value=False)))
     return db
 
@@ -562,6 +565,8 @@ class TestSystemTasks:
         """cleanup_old_database_entries taskini bajarish va undagi xatolikni tekshirish."""
         mock_db.execute.return_value = 5
         mock_db.execute.side_effect = None  # Oldingi testlardan qolgan side_effect'ni tozalash
+        mock_db.fetchone.return_value = None
+        mock_db.fetch_val.side_effect = ["2024-01-01", 42, None]
 
         with patch("core.tasks.logger.info") as mock_info, patch("core.tasks.logger.success") as mock_success:
             await registry.run_task_manually("system.cleanup_db")
@@ -569,7 +574,10 @@ class TestSystemTasks:
 
             mock_info.assert_any_call(f"🧹 Ma'lumotlar bazasini tozalash vazifasi ishga tushdi. {mock_config.get.return_value} kundan eski yozuvlar o'chiriladi...")
             mock_success.assert_any_call("✅ Ma'lumotlar bazasini tozalash vazifasi muvaffaqiyatli yakunlandi. Jami 5 ta yozuv o'chirildi.")
-            mock_db.execute.assert_awaited_once_with(f"DELETE FROM test_table WHERE test_date_col < date('now', '-{mock_config.get.return_value} days')")
+            mock_db.fetch_val.assert_any_await("SELECT date('now', ?)", (f"-{mock_config.get.return_value} days",))
+            mock_db.execute.assert_any_await(
+                "DELETE FROM test_table WHERE rowid > ? AND rowid <= ? AND test_date_col < ?", (0, 42, "2024-01-01")
+            )
 
         mock_db.reset_mock()
         # Endi xatolik holatini tekshiramiz
@@ -604,3 +612,129 @@ class TestSystemTasks:
 
             mock_exception.assert_called_once()
             assert "Ma'lumotlar bazasini VACUUM qilishda xatolik yuz berdi" in mock_exception.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_vacuum_db_uses_incremental_vacuum_when_enabled(self, mock_db: AsyncMock):
+        """auto_vacuum=INCREMENTAL bo'lsa haftalik vazifa ulanishni yopadigan VACUUM o'rniga bo'laklarda tozalaydi."""
+        mock_db.get_storage_stats.return_value = {"auto_vacuum": "INCREMENTAL", "freelist_count": 300, "free_ratio": 0.05}
+        mock_db.seconds_since_last_write = MagicMock(return_value=60.0)
+        mock_db.incremental_vacuum.side_effect = [256, 44]
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: default
+
+        await vacuum_database(mock_db, config)
+
+        mock_db.vacuum.assert_not_awaited()
+        assert mock_db.incremental_vacuum.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_incremental_vacuum_skips_when_not_worthwhile(self, mock_db: AsyncMock):
+        """Bo'sh sahifalar ulushi chegaradan past bo'lsa incremental_vacuum bajarilmaydi."""
+        mock_db.get_storage_stats.return_value = {"auto_vacuum": "INCREMENTAL", "freelist_count": 3, "free_ratio": 0.01}
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: default
+
+        await incremental_vacuum_database(mock_db, config)
+
+        mock_db.incremental_vacuum.assert_not_awaited()
+
+
+class TestChunkedCleanup:
+    """Partiyalab, davom ettiriladigan tozalashni haqiqiy baza bilan test qilish."""
+
+    @pytest_asyncio.fixture
+    async def real_db(self, tmp_path, monkeypatch):
+        async def mock_do_nothing(*args, **kwargs):
+            pass
+
+        monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+        monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+        config = MagicMock(spec=ConfigManager)
+        config.get.side_effect = lambda key, default=None: default
+        cache = AsyncMock()
+        cache.get.return_value = None
+
+        db = AsyncDatabase(config_manager=config, cache_manager=cache)
+        db.configure(db_path=tmp_path / "cleanup.db")
+        await db.connect()
+        # Progress jadvali haqiqiy migratsiya faylidan yaratiladi
+        await db._conn.executescript((db.migrations_path / "V013_retention_progress.sql").read_text(encoding="utf-8"))
+        await db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, created DATETIME NOT NULL)")
+        old_rows = [("2000-01-01",)] * 25
+        new_rows = [("2999-01-01",)] * 5
+        await db.executemany("INSERT INTO events (created) VALUES (?)", old_rows + new_rows + old_rows)
+        db.register_cleanup_table("events", "created")
+        yield db
+        await db.close()
+
+    @staticmethod
+    def _config(batch_size: int) -> MagicMock:
+        config = MagicMock(spec=ConfigManager)
+        values = {"DB_CLEANUP_DAYS": 7, "DB_CLEANUP_BATCH_SIZE": batch_size, "DB_CLEANUP_BATCH_PAUSE_MS": 0}
+        config.get.side_effect = lambda key, default=None: values.get(key, default)
+        return config
+
+    @pytest.mark.asyncio
+    async def test_deletes_in_bounded_batches(self, real_db: AsyncDatabase):
+        statements = []
+        original_execute = real_db.execute
+
+        async def spy_execute(sql, params=()):
+            statements.append(sql)
+            return await original_execute(sql, params)
+
+        with patch.object(real_db, "execute", side_effect=spy_execute):
+            await cleanup_old_database_entries(real_db, self._config(batch_size=10))
+
+        assert await real_db.fetch_val("SELECT count(*) FROM events") == 5
+        assert sum(1 for sql in statements if sql.startswith("DELETE FROM events")) == 5
+        assert await real_db.fetch_val("SELECT count(*) FROM retention_progress") == 0
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_interruption(self, real_db: AsyncDatabase):
+        original_execute = real_db.execute
+        deletes = {"n": 0}
+
+        async def interrupting_execute(sql, params=()):
+            if sql.startswith("DELETE FROM events"):
+                deletes["n"] += 1
+                if deletes["n"] == 3:
+                    raise asyncio.CancelledError()
+            return await original_execute(sql, params)
+
+        with patch.object(real_db, "execute", side_effect=interrupting_execute):
+            with pytest.raises(asyncio.CancelledError):
+                await cleanup_old_database_entries(real_db, self._config(batch_size=10))
+
+        progress = await real_db.fetchone("SELECT last_rowid, deleted FROM retention_progress WHERE table_name = 'events'")
+        assert progress == {"last_rowid": 20, "deleted": 20}
+        assert await real_db.fetch_val("SELECT count(*) FROM events") == 35
+
+        with patch("core.tasks.logger.info") as mock_info:
+            await cleanup_old_database_entries(real_db, self._config(batch_size=10))
+
+        assert any("to'xtagan joyidan davom etmoqda (rowid > 20" in c.args[0] for c in mock_info.call_args_list)
+        assert await real_db.fetch_val("SELECT count(*) FROM events") == 5
+        assert await real_db.fetch_val("SELECT count(*) FROM retention_progress") == 0
+
+    @pytest.mark.asyncio
+    async def test_per_table_retention_days(self, real_db: AsyncDatabase):
+        await real_db.execute("INSERT INTO events (created) VALUES (date('now', '-3 days'))")
+        real_db.register_cleanup_table("events", "created", retention_days=2)
+
+        await cleanup_old_database_entries(real_db, self._config(batch_size=100))
+
+        assert await real_db.fetch_val("SELECT count(*) FROM events") == 5
+
+    @pytest.mark.asyncio
+    async def test_archived_tables_are_moved_instead_of_deleted(self, real_db: AsyncDatabase, tmp_path):
+        real_db.archive_dir = tmp_path / "archive"
+        real_db.register_cleanup_table("events", "created", archive=True)
+
+        config = self._config(batch_size=10)
+        config.get.side_effect = lambda key, default=None: {"DB_ARCHIVE_KEEP_MONTHS": 0, "DB_CLEANUP_BATCH_PAUSE_MS": 0}.get(key, default)
+        await cleanup_old_database_entries(real_db, config)
+
+        assert await real_db.fetch_val("SELECT count(*) FROM events") == 5
+        # Eski oy darhol yopiladi (siqiladi), retention_progress ishlatilmaydi
+        assert sorted(p.name for p in real_db.archive_dir.iterdir()) == ["cleanup.2000-01.db.gz"]
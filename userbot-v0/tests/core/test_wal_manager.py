@@ -0,0 +1,123 @@
+# tests/core/test_wal_manager.py
+
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+
+from core.cache import CacheManager
+from core.config_manager import ConfigManager
+from core.database import AsyncDatabase
+from core.wal_manager import STARVATION_WARN_RUNS
+
+pytestmark = pytest.mark.asyncio
+
+
+def _make_db(tmp_path: Path, monkeypatch, **settings) -> AsyncDatabase:
+    async def mock_do_nothing(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr("core.database._run_migrations_util", mock_do_nothing)
+    monkeypatch.setattr("core.database._run_initial_data_script_util", mock_do_nothing)
+
+    defaults = {"DB_WAL_CHECK_INTERVAL_SECONDS": 3600, "DB_WAL_IDLE_SECONDS": 0, **settings}
+    config = MagicMock(spec=ConfigManager)
+    config.get.side_effect = lambda key, default=None: defaults.get(key, default)
+    cache = AsyncMock(spec=CacheManager)
+    cache.get.return_value = None
+
+    database = AsyncDatabase(config_manager=config, cache_manager=cache)
+    database.configure(db_path=tmp_path / "wal.db")
+    return database
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path: Path, monkeypatch) -> AsyncGenerator[AsyncDatabase, None]:
+    database = _make_db(tmp_path, monkeypatch, DB_WAL_BUDGET_MB=1)
+    await database.connect()
+    await database.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+    yield database
+    await database.close()
+
+
+async def _fill(db: AsyncDatabase, rows: int, size: int = 4000) -> None:
+    await db.executemany("INSERT INTO items (payload) VALUES (?)", [("x" * size,) for _ in range(rows)])
+
+
+async def test_idle_passive_checkpoint_runs_once_per_write_burst(db: AsyncDatabase):
+    manager = db._wal_manager
+    await _fill(db, 10)
+
+    result = await manager.run_once()
+    assert result["mode"] == "PASSIVE"
+    assert result["checkpointed_frames"] == result["log_frames"] > 0
+
+    # Yangi yozuv bo'lmaguncha qayta checkpoint qilinmaydi
+    assert await manager.run_once() is None
+    await _fill(db, 1)
+    assert (await manager.run_once())["mode"] == "PASSIVE"
+    assert db.get_wal_stats()["checkpoints"]["passive"] == 2
+
+
+async def test_over_budget_restarts_and_journal_size_limit_shrinks_wal(db: AsyncDatabase):
+    manager = db._wal_manager
+    manager.idle_seconds = 3600
+    await _fill(db, 400)
+    assert manager.wal_size() > manager.budget_bytes
+
+    result = await manager.run_once()
+    assert result["mode"] == "RESTART" and not result["busy"]
+
+    # RESTART dan keyingi yozuv WAL ni boshidan yozadi va journal_size_limit gacha qisqartiradi
+    await _fill(db, 1)
+    assert manager.wal_size() <= manager.budget_bytes
+    assert await manager.run_once() is None
+
+
+async def test_long_reader_starves_checkpoint_and_escalates(db: AsyncDatabase):
+    manager = db._wal_manager
+    manager.idle_seconds = 3600
+    manager.busy_timeout_ms = 0
+    await _fill(db, 10)
+
+    cursor_rows = db.iterate("SELECT id FROM items", chunk_size=1)
+    await cursor_rows.__anext__()  # o'qish tranzaksiyasi ochiq qoladi
+    try:
+        await _fill(db, 400)
+        assert db.longest_active_read_seconds() > 0
+
+        modes = [(await manager.run_once())["mode"] for _ in range(STARVATION_WARN_RUNS)]
+        assert modes == ["RESTART", "TRUNCATE", "TRUNCATE"]
+        stats = db.get_wal_stats()
+        assert stats["starved_runs"] == STARVATION_WARN_RUNS
+        assert stats["consecutive_starved"] == STARVATION_WARN_RUNS
+        assert stats["busy"] == STARVATION_WARN_RUNS
+    finally:
+        await cursor_rows.aclose()
+
+    result = await manager.run_once()
+    assert result["mode"] == "TRUNCATE" and not result["busy"]
+    assert manager.wal_size() == 0
+    assert db.get_wal_stats()["consecutive_starved"] == 0
+
+
+async def test_checkpoint_rejects_unknown_mode(db: AsyncDatabase):
+    with pytest.raises(ValueError):
+        await db.checkpoint("NOW")
+    busy, log_frames, checkpointed = await db.checkpoint("truncate")
+    assert (busy, log_frames, checkpointed) == (0, 0, 0)
+
+
+async def test_manager_starts_with_connection_and_reports_in_db_stats(tmp_path: Path, monkeypatch):
+    database = _make_db(tmp_path, monkeypatch)
+    await database.connect()
+    try:
+        assert database.get_wal_stats()["running"]
+        assert await database.fetch_val("PRAGMA journal_size_limit") == 64 * 1024 * 1024
+        stats = await database.db_stats()
+        assert stats["wal"]["budget_bytes"] == 64 * 1024 * 1024
+    finally:
+        await database.close()
+    assert not database.get_wal_stats()["running"]